@@ -0,0 +1,162 @@
+import json
+from datetime import datetime
+from hashlib import sha1
+
+from flask import Blueprint, abort, current_app, request
+
+from queries import (get_venue_detail, get_artist_detail, get_venue_fingerprint,
+                     get_artist_fingerprint, get_venue_areas, get_artists_page,
+                     get_shows_page, get_venue_areas_fingerprint,
+                     get_artists_page_fingerprint, get_shows_page_fingerprint)
+from pagination import page_args
+
+
+#----------------------------------------------------------------------------#
+# Read-only JSON API, version 1.
+#
+# Detail endpoints answer conditional GETs from a fingerprint of the row
+# versions involved (one aggregate query), so a client revalidating an
+# unchanged venue or artist costs neither loading nor serializing it.
+# Listings do the same from the keys and versions of the rows on the page.
+# ?fields=a,b keeps only those keys of each object. The query layer's show ids and row versions key the page
+# fragment caches; they aren't part of the API and are left out.
+#----------------------------------------------------------------------------#
+
+
+api_v1 = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+# Keys the query layer returns for the templates only.
+INTERNAL_FIELDS = {'show_id', 'version', 'venue_version', 'artist_version'}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _dumps(payload):
+    return json.dumps(payload, sort_keys=True, default=_json_default)
+
+
+def _fields():
+    """
+    Returns the field names asked for with ?fields=, or None for all of them.
+    """
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(',') if field.strip()]
+
+
+def _public(value):
+    """
+    Returns value without INTERNAL_FIELDS, down through nested shows and venues.
+    """
+    if isinstance(value, dict):
+        return {key: _public(item) for key, item in value.items()
+                if key not in INTERNAL_FIELDS}
+    if isinstance(value, list):
+        return [_public(item) for item in value]
+    return value
+
+
+def _select(item, fields):
+    item = _public(item)
+    if fields is None:
+        return item
+    unknown = [field for field in fields if field not in item]
+    if unknown:
+        abort(400, description=f"Unknown fields: {', '.join(unknown)}")
+    return {field: item[field] for field in fields}
+
+
+def _respond(etag, build):
+    """
+    Answers 304 when the request's If-None-Match has etag, otherwise sends
+    the JSON of what build() returns, tagged with it. Clients and proxies
+    may store the response but must revalidate it before reuse.
+    """
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(_dumps(build()), mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _detail(kind, owner_id, fingerprint, load):
+    now = datetime.now()
+    version = fingerprint(owner_id, now)
+    if version is None:
+        abort(404)
+    fields = _fields()
+    etag = sha1(repr((kind, owner_id, version, fields)).encode()).hexdigest()
+    return _respond(etag, lambda: _select(load(owner_id, now), fields))
+
+
+def _listing(kind, fingerprint, load, **args):
+    args.update(page_args())
+    fields = _fields()
+    etag = sha1(repr((kind, fingerprint(**args), fields)).encode()).hexdigest()
+
+    def build():
+        page = load(**args)
+        return {
+            'items': [_select(item, fields) for item in page['items']],
+            'per_page': page['per_page'],
+            'next': page['next'],
+            'prev': page['prev']
+        }
+    return _respond(etag, build)
+
+
+@api_v1.route('/venues')
+def venues():
+    """
+    Venues grouped by city and state, a page at a time, optionally ?genre=.
+    """
+    return _listing('venues', get_venue_areas_fingerprint, get_venue_areas,
+                    genre=request.args.get('genre'))
+
+
+@api_v1.route('/venues/<int:venue_id>')
+def venue(venue_id):
+    """
+    @param: venue_id
+    """
+    return _detail('venue', venue_id, get_venue_fingerprint, get_venue_detail)
+
+
+@api_v1.route('/artists')
+def artists():
+    """
+    Artists ordered by name, a page at a time, optionally ?genre=.
+    """
+    return _listing('artists', get_artists_page_fingerprint, get_artists_page,
+                    genre=request.args.get('genre'))
+
+
+@api_v1.route('/artists/<int:artist_id>')
+def artist(artist_id):
+    """
+    @param: artist_id
+    """
+    return _detail('artist', artist_id, get_artist_fingerprint, get_artist_detail)
+
+
+@api_v1.route('/shows')
+def shows():
+    """
+    Shows ordered by start time, a page at a time.
+    """
+    return _listing('shows', get_shows_page_fingerprint, get_shows_page)
+
+
+@api_v1.errorhandler(400)
+@api_v1.errorhandler(404)
+def error(error):
+    return current_app.response_class(
+        _dumps({'error': error.name, 'description': error.description}),
+        status=error.code, mimetype='application/json')
@@ -2,458 +2,89 @@
 # Imports
 #----------------------------------------------------------------------------#
 
-from flask import render_template, request, flash, redirect, url_for
+from flask import Flask, render_template, jsonify
 import logging
 from logging import Formatter, FileHandler
-from forms import *
-from datetime import datetime
-from sys import exc_info
+from importlib import import_module
 
+import click
 
-from models import *
+from models import db
 from filters import format_datetime
+from pagination import page_url
+from cache import cache, init_fragment_cache
+from instrumentation import QueryInspector
+from templating import init_bytecode_cache
 
 
 #----------------------------------------------------------------------------#
-# Filters.
+# Commands.
+#
+# Each command group is imported the first time it is listed or invoked,
+# so `flask jobs worker` doesn't load the importer, the exporter and the
+# rest of the CLI along with it.
 #----------------------------------------------------------------------------#
 
 
-app.jinja_env.filters['datetime'] = format_datetime
+class LazyGroup(click.MultiCommand):
+    """
+    A command group standing in for the AppGroup at import_name
+    ('module:attribute'), which is only imported when it is used.
+    """
 
+    def __init__(self, name, import_name, **kwargs):
+        super().__init__(name, **kwargs)
+        self.import_name = import_name
 
-#----------------------------------------------------------------------------#
-# Controllers.
-#----------------------------------------------------------------------------#
+    def _group(self):
+        module, attribute = self.import_name.split(':')
+        return getattr(import_module(module), attribute)
 
+    def list_commands(self, ctx):
+        return self._group().list_commands(ctx)
 
-@app.route('/')
-def index():
-    return render_template('pages/home.html')
+    def get_command(self, ctx, name):
+        return self._group().get_command(ctx, name)
 
 
-#  Venues
-#  ----------------------------------------------------------------
+def _running_db_command():
+    # Flask-Migrate's `db` group comes from its own flask.commands entry
+    # point, which takes precedence over app.cli, so it can't be a LazyGroup.
+    # The root context knows which group was invoked, however the program
+    # was called (`flask db` or `python -m flask db`).
+    ctx = click.get_current_context(silent=True)
+    if ctx is None:
+        return False
+    return ctx.find_root().invoked_subcommand == 'db'
 
-@app.route('/venues')
-def venues():
-    """
-    Renders venues page with appropriate data and data structure. Venues are grouped
-    by city.
-    """
-    data = []
-    try:
-        venues = db.session.query(Venue).order_by(Venue.city).all()
-        locations = {(venue.city, venue.state) for venue in venues}
-        data = [{
-            'city': location[0],
-            'state': location[1],
-            'venues': [{
-                'id': local_venue.id,
-                'name': local_venue.name,
-                'num_upcoming_shows': db.session.query(Show).join(Venue).filter(Show.start_time <= datetime.now(), Venue.id == local_venue.id).count()
-            } for local_venue in Venue.query.filter_by(city=location[0]).all()]
-        } for location in locations]
-    except:
-        print(exc_info())
-    return render_template('pages/venues.html', areas=data)
-
-
-@app.route('/venues/search', methods=['POST'])
-def search_venues():
-    """
-    Implements search for venues, supporting partial, case-insensitive searches.
-    """
-    search_term = request.form.get('search_term', '')
-    results = db.session.query(Venue).filter(
-        Venue.name.ilike(f'%{search_term}%')).all()
-    response = {
-        "count": len(results),
-        "data": [{
-            "id": result.id,
-            "name": result.name,
-            "num_upcoming_shows": db.session.query(Show).filter(result.id == Show.venue_id and Show.start_time > datetime.now()).count(),
-        }for result in results]
-    }
-    return render_template('pages/search_venues.html', results=response, search_term=search_term)
-
-
-@app.route('/venues/<int:venue_id>')
-def show_venue(venue_id):
-    """
-    @param: venue_id
-    Shows a specific venue by venue_id. The data structure given was considered in implementation.
-    """
-    venues = Venue.query.all()
-    past_shows = db.session.query(Show).join(Venue).filter(
-        Show.start_time <= datetime.now(), Venue.id == venue_id).all()
-    upcoming_shows = db.session.query(Show).join(Venue).filter(
-        Show.start_time > datetime.now(), Venue.id == venue_id).all()
-    unfiltered_data = [{
-        'id': venue.id,
-        'name': venue.name,
-        'genres': venue.genres[1:-1].split(','),
-        'address': venue.address,
-        'city': venue.city,
-        'state': venue.state,
-        'phone': venue.phone,
-        'website': venue.website,
-        'facebook_link': venue.facebook_link,
-        'seeking_talent': venue.seeking_talent,
-        'seeking_description': venue.seeking_description,
-        'image_link': venue.image_link,
-        'past_shows': [{
-            'artist_id': show.artist_id,
-            'artist_name': Artist.query.get(show.artist_id).name,
-            'artist_image_link': Artist.query.get(show.artist_id).image_link,
-            'start_time': show.start_time.strftime("%d/%m/%Y, %H:%M")
-        } for show in past_shows],
-        'upcoming_shows': [{
-            'artist_id': show.artist_id,
-            'artist_name': Artist.query.get(show.artist_id).name,
-            'artist_image_link': Artist.query.get(show.artist_id).image_link,
-            'start_time': show.start_time.strftime("%d/%m/%Y, %H:%M")
-        } for show in upcoming_shows],
-        'past_shows_count': len(past_shows),
-        'upcoming_shows_count': len(upcoming_shows)
-    } for venue in venues]
-    # debug from starter code if there's a bug.
-    data = list(filter(lambda d: d['id'] ==
-                       venue_id, unfiltered_data))[0]
-    return render_template('pages/show_venue.html', venue=data)
-
-#  Create Venue
-#  ----------------------------------------------------------------
-
-
-@app.route('/venues/create', methods=['GET'])
-def create_venue_form():
-    form = VenueForm()
-    return render_template('forms/new_venue.html', form=form)
-
-
-@app.route('/venues/create', methods=['POST'])
-def create_venue_submission():
-    """
-    Handles the creation of a new venue.
-    """
-    form = VenueForm(request.form)
-    # A dict that holds form data
-    data = {
-        'name': form.name.data,
-        'genres': form.genres.data,
-        'address': form.address.data,
-        'city': form.city.data,
-        'state': form.state.data,
-        'phone': form.phone.data,
-        'image_link': form.image_link.data,
-        'facebook_link': form.facebook_link.data,
-        'seeking_talent': form.seeking_talent.data,
-        'seeking_description': form.seeking_description.data,
-        'website': form.website.data
-    }
-    # Venue creation and addition to the db, with any exceptions handled.
-    try:
-        venue = Venue(
-            name=data['name'],
-            genres=data['genres'],
-            address=data['address'],
-            city=data['city'],
-            state=data['state'],
-            phone=data['phone'],
-            image_link=data['image_link'],
-            facebook_link=data['facebook_link'],
-            seeking_talent=data['seeking_talent'],
-            seeking_description=data['seeking_description'],
-            website=data['website']
-        )
-        venues = [ven[0] for ven in db.session.query(
-            Venue.name).filter_by(city=venue.city).all()]
-        if venue.name not in venues:
-            db.session.add(venue)
-            db.session.commit()
-            # on successful db insert, flash success
-            flash('Venue ' + data['name'] + ' was successfully listed!')
-        else:
-            flash('Venue ' + data['name'] + ' already exists')
-    except:
-        flash('An error occurred. Venue ' +
-              data['name'] + ' could not be listed.')
-        db.session.rollback()
-        print(exc_info())
-    finally:
-        db.session.close()
-    return redirect(url_for('index'))
-
-
-@app.route('/venues/<venue_id>', methods=['DELETE'])
-def delete_venue(venue_id):
-    """
-    @param: venue_id
-    Handles the deletion of any venue. AJAX UI support was implemented in the appropriate 
-    show_venue template
-    """
-    try:
-        Show.query.filter_by(venue_id=venue_id).delete()
-        Venue.query.filter_by(id=venue_id).delete()
-        db.session.commit()
-    except:
-        db.session.rollback()
-        print(exc_info())
-    finally:
-        db.session.close()
-    return render_template('pages/home.html')
 
-#  Artists
-#  ----------------------------------------------------------------
+COMMANDS = [
+    ('counters', 'counters:counters_cli', 'Maintain the show counters.'),
+    ('import', 'importer:import_cli', 'Bulk import venues, artists and shows.'),
+    ('export', 'exports:export_cli', 'Export the show calendar.'),
+    ('schedule', 'schedule:schedule_cli', 'Check show bookings.'),
+    ('venues', 'duplicates:venues_cli', 'Venue maintenance.'),
+    ('purge', 'purge:purge_cli', 'Remove deleted venues and artists for good.'),
+    ('jobs', 'jobs:jobs_cli', 'Run and inspect background jobs.'),
+    ('assets', 'assets:assets_cli', 'Build the static asset bundles.'),
+    ('templates', 'templating:templates_cli', 'Compile the Jinja templates.'),
+]
 
 
-@app.route('/artists')
-def artists():
-    """
-    Shows all artists.
-    """
-    artists = Artist.query.all()
-    data = [{
-        'id': artist.id,
-        'name': artist.name
-    } for artist in artists]
-    return render_template('pages/artists.html', artists=data)
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
 
 
-@app.route('/artists/search', methods=['POST'])
-def search_artists():
-    """
-    Implements search for artists, supporting partial, case-insensitive searches.
-    """
-    search_term = request.form.get('search_term', '')
-    results = Artist.query.filter(Artist.name.ilike(f'%{search_term}%')).all()
-    response = {
-        "count": len(results),
-        "data": [{
-            "id": result.id,
-            "name": result.name,
-            "num_upcoming_shows": Show.query.filter(Show.artist_id == result.id and Show.start_time > datetime.now()),
-        } for result in results]
-    }
-    return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
-
-
-@app.route('/artists/<int:artist_id>')
-def show_artist(artist_id):
-    """
-    @param: artist_id
-    Shows a specific artist by artist_id. The data structure given was considered in implementation.
-    """
-    artists = Artist.query.all()
-    past_shows = db.session.query(Show).join(Artist).filter(
-        Show.start_time <= datetime.now(), Artist.id == artist_id).all()
-    upcoming_shows = db.session.query(Show).join(Artist).filter(
-        Show.start_time > datetime.now(), Artist.id == artist_id).all()
-    unfiltered_data = [{
-        'id': artist.id,
-        'name': artist.name,
-        'genres': artist.genres[1:-1].split(','),
-        'city': artist.city,
-        'state': artist.state,
-        'phone': artist.phone,
-        'website': artist.website,
-        'facebook_link': artist.facebook_link,
-        'seeking_venue': artist.seeking_venue,
-        'seeking_description': artist.seeking_description,
-        'image_link': artist.image_link,
-        'past_shows': [{
-            'venue_id': show.venue_id,
-            'venue_name': Venue.query.get(show.venue_id).name,
-            'venue_image_link': Venue.query.get(show.venue_id).image_link,
-            'start_time': show.start_time.strftime("%d/%m/%Y, %H:%M")
-        } for show in past_shows],
-        'upcoming_shows': [{
-            'venue_id': show.venue_id,
-            'venue_name': Venue.query.get(show.venue_id).name,
-            'venue_image_link': Venue.query.get(show.venue_id).image_link,
-            'start_time': show.start_time.strftime("%d/%m/%Y, %H:%M")
-        } for show in upcoming_shows],
-        'past_shows_count': len(past_shows),
-        'upcoming_shows_count': len(upcoming_shows)
-    } for artist in artists]
-
-    data = list(filter(lambda d: d['id'] ==
-                       artist_id, unfiltered_data))[0]
-    return render_template('pages/show_artist.html', artist=data)
-
-#  Update
-#  ----------------------------------------------------------------
-
-
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
-def edit_artist(artist_id):
-    artist = Artist.query.get(artist_id)
-    # Creating a form instance pre-populated with the artist fields.
-    form = ArtistForm(obj=artist)
-    return render_template('forms/edit_artist.html', form=form, artist=artist)
-
-
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
-def edit_artist_submission(artist_id):
+def index():
+    return render_template('pages/home.html')
+
+
+def cache_stats():
     """
-    Handles updates to an existing artist
+    Reports response cache hits, misses and evictions, for sizing the cache.
     """
-    try:
-        form = ArtistForm(request.form)
-        artist = Artist.query.get(artist_id)
-        artist.name = form.name.data
-        artist.city = form.city.data
-        artist.state = form.state.data
-        artist.phone = form.phone.data
-        artist.genres = form.genres.data
-        artist.image_link = form.image_link.data
-        artist.facebook_link = form.facebook_link.data
-        artist.website = form.website.data
-        artist.seeking_venue = form.seeking_venue.data
-        artist.seeking_description = form.seeking_description.data
-        db.session.commit()
-    except:
-        db.session.rollback()
-        print(exc_info())
-    finally:
-        db.session.close()
-    return redirect(url_for('show_artist', artist_id=artist_id))
-
-
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
-def edit_venue(venue_id):
-    venue = Venue.query.get(venue_id)
-    form = VenueForm(obj=venue)
-
-    return render_template('forms/edit_venue.html', form=form, venue=venue)
-
-
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
-def edit_venue_submission(venue_id):
-    try:
-        form = VenueForm(request.form)
-        venue = Venue.query.get(venue_id)
-        venue.name = form.name.data
-        venue.city = form.city.data
-        venue.state = form.state.data
-        venue.address = form.address.data
-        venue.genres = form.genres.data
-        venue.phone = form.phone.data
-        venue.image_link = form.image_link.data
-        venue.facebook_link = form.facebook_link.data
-        venue.website = form.website.data
-        venue.seeking_talent = form.seeking_talent.data
-        venue.seeking_description = form.seeking_description.data
-        db.session.commit()
-    except:
-        db.session.rollback()
-        print(exc_info())
-    finally:
-        db.session.close()
-    return redirect(url_for('show_venue', venue_id=venue_id))
-
-#  Create Artist
-#  ----------------------------------------------------------------
-
-
-@app.route('/artists/create', methods=['GET'])
-def create_artist_form():
-    form = ArtistForm()
-    return render_template('forms/new_artist.html', form=form)
-
-
-@app.route('/artists/create', methods=['POST'])
-def create_artist_submission():
-    form = ArtistForm(request.form)
-    data = {
-        'name': form.name.data,
-        'genres': form.genres.data,
-        'city': form.city.data,
-        'state': form.state.data,
-        'phone': form.phone.data,
-        'image_link': form.image_link.data,
-        'facebook_link': form.facebook_link.data,
-        'seeking_talent': form.seeking_venue.data,
-        'seeking_description': form.seeking_description.data,
-        'website': form.website.data
-    }
-    try:
-        artist = Artist(
-            name=data['name'],
-            genres=data['genres'],
-            city=data['city'],
-            state=data['state'],
-            phone=data['phone'],
-            image_link=data['image_link'],
-            facebook_link=data['facebook_link'],
-            seeking_venue=data['seeking_talent'],
-            seeking_description=data['seeking_description'],
-            website=data['website']
-        )
-        db.session.add(artist)
-        db.session.commit()
-        # on successful db insert, flash success
-        flash('Artist ' + data['name'] + ' was successfully listed!')
-    except:
-        flash('An error occurred. Artist ' +
-              data['name'] + ' could not be listed.')
-        db.session.rollback()
-        print(exc_info())
-    finally:
-        db.session.close()
-    return redirect(url_for('index'))
-
-
-#  Shows
-#  ----------------------------------------------------------------
-
-@app.route('/shows')
-def shows():
-    shows = Show.query.all()
-    data = [{
-        'venue_id': show.venue_id,
-        'venue_name': Venue.query.get(show.venue_id).name,
-        'artist_id': show.artist_id,
-        'artist_name': Artist.query.get(show.artist_id).name,
-        'artist_image_link': Artist.query.get(show.artist_id).image_link,
-        'start_time': show.start_time.strftime("%d/%m/%Y, %H:%M")
-    }for show in shows]
-    return render_template('pages/shows.html', shows=data)
-
-
-@app.route('/shows/create')
-def create_shows():
-    # renders form. do not touch.
-    form = ShowForm()
-    return render_template('forms/new_show.html', form=form)
-
-
-@app.route('/shows/create', methods=['POST'])
-def create_show_submission():
-    form = ShowForm(request.form)
-    data = {
-        'artist_id': form.artist_id.data,
-        'venue_id': form.venue_id.data,
-        'start_time': form.start_time.data
-    }
-    try:
-        show = Show(
-            artist_id=data['artist_id'],
-            venue_id=data['venue_id'],
-            start_time=data['start_time']
-        )
-        db.session.add(show)
-        db.session.commit()
-        # on successful db insert, flash success
-        flash(f'Show by {Artist.query.get(show.artist_id).name} on {show.start_time.strftime("%d/%m/%Y, %H:%M")} at {Venue.query.get(show.venue_id).name} has been listed successfully!')
-    except:
-        flash('An error occurred. Show could not be listed.')
-        db.session.rollback()
-        print(exc_info())
-    finally:
-        db.session.close()
-    return redirect(url_for('index'))
+    return jsonify(cache.stats())
 
 
 #----------------------------------------------------------------------------#
@@ -461,17 +92,15 @@ def create_show_submission():
 #----------------------------------------------------------------------------#
 
 
-@app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
 
-@app.errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
 
 
-if not app.debug:
+def init_logging(app):
     file_handler = FileHandler('error.log')
     file_handler.setFormatter(
         Formatter(
@@ -481,6 +110,76 @@ if not app.debug:
     file_handler.setLevel(logging.INFO)
     app.logger.addHandler(file_handler)
     app.logger.info('errors')
+    # Per request query counts and N+1 warnings, one JSON object per line.
+    query_logger = logging.getLogger('fyyur.queries')
+    query_logger.setLevel(logging.INFO)
+    query_logger.addHandler(file_handler)
+
+
+#----------------------------------------------------------------------------#
+# App Config.
+#----------------------------------------------------------------------------#
+
+
+def create_app(config='config', **settings):
+    """
+    @param: config, settings
+    Builds the app from the config object or module config (its import
+    name), then settings, e.g. create_app(SQLALCHEMY_DATABASE_URI=url).
+    """
+    # The blueprints pull in the query layer, the API, thumbnails and assets,
+    # which the CLI only needs once it builds an app.
+    from api import api_v1
+    from images import images
+    from assets import assets
+    from venues import venue_pages
+    from artists import artist_pages
+    from shows import show_pages
+    import jobs
+
+    app = Flask(__name__)
+    app.config.from_object(config)
+    app.config.update(settings)
+    db.init_app(app)
+    # Only `flask db` needs Flask-Migrate, which loads all of Alembic, so
+    # the web server, workers and other commands go without it.
+    if _running_db_command():
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    # Filters.
+    app.jinja_env.filters['datetime'] = format_datetime
+    init_fragment_cache(app)
+    app.jinja_env.globals['page_url'] = page_url
+    init_bytecode_cache(app)
+
+    # Commands.
+    for name, import_name, help in COMMANDS:
+        app.cli.add_command(LazyGroup(name, import_name, help=help))
+
+    # Caching, instrumentation and jobs.
+    cache.init_app(app)
+    QueryInspector(app)
+    jobs.JobRunner(app)
+
+    # API, thumbnails and static assets.
+    app.register_blueprint(api_v1)
+    app.register_blueprint(images)
+    app.register_blueprint(assets)
+
+    # Pages.
+    app.add_url_rule('/', 'index', index)
+    app.register_blueprint(venue_pages)
+    app.register_blueprint(artist_pages)
+    app.register_blueprint(show_pages)
+    app.add_url_rule('/cache/stats', 'cache_stats', cache_stats)
+
+    app.register_error_handler(404, not_found_error)
+    app.register_error_handler(500, server_error)
+    if not app.debug:
+        init_logging(app)
+    return app
+
 
 #----------------------------------------------------------------------------#
 # Launch.
@@ -488,11 +187,11 @@ if not app.debug:
 
 # Default port:
 if __name__ == '__main__':
-    app.run()
+    create_app().run()
 
 # Or specify port manually:
 '''
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
 '''
@@ -0,0 +1,177 @@
+from sys import exc_info
+
+from flask import Blueprint, render_template, request, flash, redirect, url_for, abort
+
+from models import db, Artist, Genre
+from queries import get_artist_detail, get_artists_page, get_artist_last_modified
+from pagination import page_args
+from cache import cache, last_modified
+import counters
+import jobs
+import search
+
+
+artist_pages = Blueprint('artists', __name__)
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+
+@artist_pages.route('/artists')
+@cache.cached(tags=['artists'])
+def artists():
+    """
+    Shows all artists a page at a time, optionally filtered by ?genre=.
+    """
+    page = get_artists_page(genre=request.args.get('genre'), **page_args())
+    return render_template('pages/artists.html', artists=page['items'], page=page)
+
+
+@artist_pages.route('/artists/search', methods=['POST'])
+def search_artists():
+    """
+    Implements search for artists, supporting partial, case-insensitive searches.
+    Results are ranked and capped at SEARCH_RESULT_LIMIT.
+    """
+    search_term = request.form.get('search_term', '')
+    response = search.search_artists(search_term)
+    return render_template('pages/search_artists.html', results=response, search_term=search_term)
+
+
+@artist_pages.route('/artists/<int:artist_id>')
+@last_modified(get_artist_last_modified)
+@cache.cached(tags=lambda artist_id: ['artist', f'artist:{artist_id}'])
+def show_artist(artist_id):
+    """
+    @param: artist_id
+    Shows a specific artist by artist_id. The data structure given was considered in implementation.
+    """
+    data = get_artist_detail(artist_id)
+    if data is None:
+        abort(404)
+    return render_template('pages/show_artist.html', artist=data)
+
+
+@artist_pages.route('/artists/<artist_id>', methods=['DELETE'])
+def delete_artist(artist_id):
+    """
+    @param: artist_id
+    Handles the deletion of any artist, from the show_artist template. Like
+    venues, the artist is marked deleted and purged in the background.
+    """
+    artist = Artist.get_listed(artist_id)
+    if artist is None:
+        abort(404)
+    try:
+        counters.artist_shows_removed(artist.id)
+        artist.soft_delete()
+        jobs.enqueue('purge')
+        db.session.commit()
+        # The artist's shows were listed on /shows and on its venues' pages.
+        cache.invalidate('artists', f'artist:{artist_id}', 'shows', 'venues', 'venue')
+    except:
+        db.session.rollback()
+        print(exc_info())
+    finally:
+        db.session.close()
+    return render_template('pages/home.html')
+
+#  Update
+#  ----------------------------------------------------------------
+
+
+@artist_pages.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+    # Forms pull in WTForms, which the CLI and the read only pages never need.
+    from forms import ArtistForm
+    artist = Artist.get_listed(artist_id)
+    if artist is None:
+        abort(404)
+    # Creating a form instance pre-populated with the artist fields.
+    form = ArtistForm(obj=artist)
+    form.genres.data = artist.genre_names
+    return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+
+@artist_pages.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+    """
+    Handles updates to an existing artist
+    """
+    from forms import ArtistForm
+    try:
+        form = ArtistForm(request.form)
+        artist = Artist.get_listed(artist_id)
+        artist.name = form.name.data
+        artist.city = form.city.data
+        artist.state = form.state.data
+        artist.phone = form.phone.data
+        artist.genres = Genre.resolve(form.genres.data)
+        artist.image_link = form.image_link.data
+        artist.facebook_link = form.facebook_link.data
+        artist.website = form.website.data
+        artist.seeking_venue = form.seeking_venue.data
+        artist.seeking_description = form.seeking_description.data
+        db.session.commit()
+        cache.invalidate('artists', f'artist:{artist_id}', 'shows', 'venue')
+    except:
+        db.session.rollback()
+        print(exc_info())
+    finally:
+        db.session.close()
+    return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+
+@artist_pages.route('/artists/create', methods=['GET'])
+def create_artist_form():
+    from forms import ArtistForm
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@artist_pages.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+    from forms import ArtistForm
+    form = ArtistForm(request.form)
+    data = {
+        'name': form.name.data,
+        'genres': form.genres.data,
+        'city': form.city.data,
+        'state': form.state.data,
+        'phone': form.phone.data,
+        'image_link': form.image_link.data,
+        'facebook_link': form.facebook_link.data,
+        'seeking_talent': form.seeking_venue.data,
+        'seeking_description': form.seeking_description.data,
+        'website': form.website.data
+    }
+    try:
+        artist = Artist(
+            name=data['name'],
+            genres=Genre.resolve(data['genres']),
+            city=data['city'],
+            state=data['state'],
+            phone=data['phone'],
+            image_link=data['image_link'],
+            facebook_link=data['facebook_link'],
+            seeking_venue=data['seeking_talent'],
+            seeking_description=data['seeking_description'],
+            website=data['website']
+        )
+        db.session.add(artist)
+        db.session.commit()
+        cache.invalidate('artists')
+        # on successful db insert, flash success
+        flash('Artist ' + data['name'] + ' was successfully listed!')
+    except:
+        flash('An error occurred. Artist ' +
+              data['name'] + ' could not be listed.')
+        db.session.rollback()
+        print(exc_info())
+    finally:
+        db.session.close()
+    return redirect(url_for('index'))
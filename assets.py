@@ -0,0 +1,201 @@
+import gzip
+import json
+import mimetypes
+import os
+import posixpath
+import re
+from hashlib import sha256
+from threading import Lock
+
+import click
+from flask import (Blueprint, abort, current_app, request, safe_join, send_from_directory,
+                   url_for)
+from flask.cli import AppGroup
+
+
+#----------------------------------------------------------------------------#
+# Static asset bundles.
+#
+# The layout used to load five stylesheets and five scripts one by one,
+# under names that never change, so browsers had to revalidate them all
+# the time. `flask assets build` concatenates and minifies them into the
+# BUNDLES below, names each after a hash of its content, precompresses it
+# to brotli and gzip and records the names in static/dist/manifest.json.
+# asset_url() in templates looks the names up and /assets/ serves the best
+# encoding the browser accepts, cached for good.
+#----------------------------------------------------------------------------#
+
+
+# Bundle name: files under static/, in load order.
+BUNDLES = {
+    'main.css': ['css/bootstrap.min.css', 'css/layout.main.css', 'css/main.css',
+                 'css/main.responsive.css', 'css/main.quickfix.css'],
+    # Loaded in <head>, before the page renders.
+    'head.js': ['js/libs/modernizr-2.8.2.min.js', 'js/libs/moment.min.js'],
+    # Deferred, after jQuery.
+    'site.js': ['js/script.js', 'js/libs/bootstrap-3.1.1.min.js', 'js/plugins.js'],
+}
+
+DIRECTORY = 'dist'
+MANIFEST = 'manifest.json'
+
+assets = Blueprint('assets', __name__)
+_lock = Lock()
+
+
+def minify_css(css):
+    """
+    Drops comments (but /*! license notes) and the whitespace that doesn't
+    separate anything.
+    """
+    css = re.sub(r'/\*(?!!).*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+def minify_js(js):
+    """
+    Drops comment lines, indentation and blank lines; line breaks stay, as
+    statements may rely on them. Files already named .min.js are kept as is.
+    """
+    lines = (line.strip() for line in js.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+def _absolute_urls(css, source_url):
+    """
+    Rewrites the relative url()s of a stylesheet served at source_url to
+    absolute paths, so they still resolve from the bundle's location.
+    """
+    base = posixpath.dirname(source_url)
+
+    def absolute(match):
+        quote, url = match.group(1), match.group(2)
+        if re.match(r'^(/|#|data:|[a-z]+:)', url):
+            return match.group(0)
+        return f'url({quote}{posixpath.normpath(posixpath.join(base, url))}{quote})'
+    return re.sub(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''', absolute, css)
+
+
+def bundle(name, sources, static_folder, static_url_path):
+    """
+    @param: name, sources, static_folder, static_url_path
+    Returns the minified concatenation of sources.
+    """
+    parts = []
+    for source in sources:
+        with open(os.path.join(static_folder, source), encoding='utf-8') as file:
+            content = file.read()
+        if name.endswith('.css'):
+            parts.append(minify_css(_absolute_urls(content, f'{static_url_path}/{source}')))
+        else:
+            parts.append(content.strip() if source.endswith('.min.js') else minify_js(content))
+    # A statement ending a file without a semicolon must not run into the next.
+    return ('\n' if name.endswith('.css') else '\n;\n').join(parts) + '\n'
+
+
+def _write(path, data):
+    with open(path + '.tmp', 'wb') as file:
+        file.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def build(app):
+    """
+    @param: app
+    Writes every bundle, fingerprinted and precompressed, and the manifest
+    under static/dist. Returns the manifest, bundle name to file name.
+    """
+    import brotli
+    directory = os.path.join(app.static_folder, DIRECTORY)
+    os.makedirs(directory, exist_ok=True)
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        data = bundle(name, sources, app.static_folder, app.static_url_path).encode()
+        stem, extension = os.path.splitext(name)
+        filename = f'{stem}.{sha256(data).hexdigest()[:12]}{extension}'
+        path = os.path.join(directory, filename)
+        _write(path, data)
+        _write(path + '.br', brotli.compress(data))
+        _write(path + '.gz', gzip.compress(data, 9, mtime=0))
+        manifest[name] = filename
+    _write(os.path.join(directory, MANIFEST), json.dumps(manifest, indent=2).encode())
+    return manifest
+
+
+def _stale(app, manifest_path):
+    if not os.path.exists(manifest_path):
+        return True
+    if not app.debug:
+        return False
+    built = os.path.getmtime(manifest_path)
+    return any(os.path.getmtime(os.path.join(app.static_folder, source)) > built
+               for sources in BUNDLES.values() for source in sources)
+
+
+def _manifest():
+    """
+    Returns the manifest, read once per process. Bundles missing from the
+    deployment, or in debug mode older than their sources, are built first.
+    """
+    app = current_app._get_current_object()
+    manifest = app.extensions.get('assets')
+    if manifest is None or app.debug:
+        with _lock:
+            path = os.path.join(app.static_folder, DIRECTORY, MANIFEST)
+            if _stale(app, path):
+                manifest = build(app)
+            elif manifest is None:
+                with open(path) as file:
+                    manifest = json.load(file)
+            app.extensions['assets'] = manifest
+    return manifest
+
+
+@assets.app_template_global()
+def asset_url(name):
+    """
+    URL of the current build of bundle name, e.g. asset_url('main.css').
+    """
+    return url_for('assets.send_asset', filename=_manifest()[name])
+
+
+@assets.route('/assets/<path:filename>')
+def send_asset(filename):
+    """
+    @param: filename
+    Serves a bundle brotli or gzip encoded when the browser accepts that.
+    Bundle names change with their content, so they are cached for good;
+    anything not named in the current manifest is a 404.
+    """
+    if filename not in _manifest().values():
+        abort(404)
+    directory = os.path.join(current_app.static_folder, DIRECTORY)
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[encoding] and os.path.isfile(
+                safe_join(directory, filename + suffix)):
+            response = send_from_directory(directory, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(directory, filename, mimetype=mimetype)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+
+assets_cli = AppGroup('assets', help='Build the static asset bundles.')
+
+
+@assets_cli.command('build')
+def build_command():
+    """Bundle, minify, fingerprint and precompress the CSS and JS."""
+    for name, filename in build(current_app).items():
+        click.echo(f'{name} -> {DIRECTORY}/{filename}')
@@ -0,0 +1,25 @@
+"""
+Reproducible benchmarks for the Fyyur views.
+
+    python -m benchmarks run --venues 2000 --artists 5000 --shows 50000 -o before.json
+    python -m benchmarks compare before.json after.json
+    python -m benchmarks load --serve --seed-catalog --users 1,4,16,64
+    python -m benchmarks startup --runs 10
+
+`run` seeds a synthetic catalog into a local database (SQLite by default,
+or any --database-url, which is wiped first), times every read route
+through the Flask test client and writes p50/p95/p99 latency, query count
+and peak memory per route to JSON, so runs can be compared across commits.
+
+`load` drives a running instance (--url) or one it serves itself on a
+local database (--serve) with increasing numbers of concurrent virtual
+users replaying browse/search/detail/booking sessions, and reports
+throughput, tail latency and error rate per stage to find the saturation
+point.
+
+`startup` starts fresh processes and times importing and building the
+app and the first request of each main page, with and without the
+template bytecode cache, plus a short `flask` command end to end, and
+reports the modules loaded and peak memory of each, to catch regressions
+in cold start.
+"""
@@ -0,0 +1,252 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import datetime
+
+
+DEFAULT_DATABASE_URL = 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'fyyur-bench.db')
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'peak_kib')
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    from app import create_app
+    from cache import cache
+    from benchmarks.catalog import seed_catalog
+    from benchmarks.routes import time_routes
+
+    app = create_app(SQLALCHEMY_DATABASE_URI=args.database_url)
+    if not args.cache:
+        cache.backend = None
+        app.jinja_env.fragment_cache = None
+
+    if not args.no_seed:
+        print(f'Seeding {args.venues} venues, {args.artists} artists and '
+              f'{args.shows} shows into {args.database_url}', file=sys.stderr)
+        with app.app_context():
+            seed_catalog(args.venues, args.artists, args.shows,
+                         past_ratio=args.past_ratio, seed=args.seed)
+
+    routes = time_routes(app, args.venues, args.artists, requests=args.requests,
+                         warmup=args.warmup, seed=args.seed, only=args.route)
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'database': args.database_url.split(':', 1)[0],
+            'catalog': {'venues': args.venues, 'artists': args.artists,
+                        'shows': args.shows, 'past_ratio': args.past_ratio,
+                        'seed': args.seed},
+            'cache': args.cache
+        },
+        'routes': routes
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output if not args.output else _table(routes))
+
+
+def _table(routes):
+    lines = [f"{'route':<20}" + ''.join(f'{metric:>12}' for metric in METRICS)]
+    for name, result in routes.items():
+        lines.append(f'{name:<20}' + ''.join(f'{result[metric]:>12}' for metric in METRICS))
+    return '\n'.join(lines)
+
+
+def load(args):
+    from benchmarks.load import run_stage, find_saturation
+
+    server = None
+    base_url = args.url
+    if args.serve:
+        from werkzeug.serving import make_server
+        from app import create_app
+        from benchmarks.catalog import seed_catalog
+
+        from cache import cache
+
+        app = create_app(SQLALCHEMY_DATABASE_URI=args.database_url)
+        if not args.cache:
+            cache.backend = None
+            app.jinja_env.fragment_cache = None
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        if args.seed_catalog:
+            with app.app_context():
+                seed_catalog(args.venues, args.artists, args.shows)
+        server = make_server('127.0.0.1', args.port, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        print(f'Serving {args.database_url} at {base_url}', file=sys.stderr)
+
+    stages = []
+    try:
+        for users in args.users:
+            stage = run_stage(base_url, users, args.duration,
+                              write_ratio=args.write_ratio, seed=args.seed)
+            stages.append(stage)
+            print(f"{users:>5} users {stage['throughput_rps']:>9} req/s  "
+                  f"p50 {stage['p50_ms']:>8} ms  p95 {stage['p95_ms']:>8} ms  "
+                  f"p99 {stage['p99_ms']:>8} ms  errors {stage['error_rate']:.2%}",
+                  file=sys.stderr)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    saturation = find_saturation(stages)
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'url': base_url,
+            'duration': args.duration,
+            'write_ratio': args.write_ratio,
+            'cache': args.cache if args.serve else None
+        },
+        'saturation_users': saturation,
+        'stages': stages
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(json.dumps(report, indent=2) + '\n')
+    print(f'Throughput stops scaling after {saturation} users.' if saturation
+          else 'Throughput kept scaling with every stage.')
+
+
+def startup(args):
+    from benchmarks.startup import time_startup, DEFAULT_PATHS, DEFAULT_COMMAND
+
+    results = time_startup(args.database_url, runs=args.runs, paths=args.path or DEFAULT_PATHS,
+                           command=args.cli_command.split() if args.cli_command else DEFAULT_COMMAND)
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'runs': args.runs
+        },
+        'startup': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(json.dumps(report, indent=2) + '\n')
+    cold, warm = results['no_bytecode_cache'], results['bytecode_cache']
+    print(f"{'':<20}{'no cache':>12}{'bytecode':>12}")
+    for metric, label in (('import_ms', 'import'), ('create_app_ms', 'create_app')):
+        print(f"{label:<20}{cold[metric]:>12}{warm[metric]:>12}")
+    for path in cold['first_request_ms']:
+        print(f"{path:<20}{cold['first_request_ms'][path]:>12}{warm['first_request_ms'][path]:>12}")
+    print(f"{'first requests':<20}{cold['first_requests_total_ms']:>12}"
+          f"{warm['first_requests_total_ms']:>12}")
+    for metric, label in (('modules', 'modules'), ('max_rss_kib', 'peak RSS (KiB)')):
+        print(f"{label:<20}{cold[metric]:>12}{warm[metric]:>12}")
+    cli = results['cli']
+    print(f"flask {cli['command']}: {cli['wall_ms']} ms, {cli['modules']} modules, "
+          f"peak RSS {cli['max_rss_kib']} KiB")
+
+
+def compare(args):
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    print(f"{before['meta'].get('commit')} -> {after['meta'].get('commit')}")
+    print(f"{'route':<20}" + ''.join(f'{metric:>20}' for metric in METRICS))
+    for name, result in after['routes'].items():
+        old = before['routes'].get(name)
+        cells = []
+        for metric in METRICS:
+            if old is None or not old[metric]:
+                cells.append(f'{result[metric]:>20}')
+            else:
+                change = (result[metric] - old[metric]) / old[metric] * 100
+                cells.append(f'{result[metric]:>11} ({change:+.0f}%)'.rjust(20))
+        print(f'{name:<20}' + ''.join(cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='seed a catalog and time every route')
+    run_parser.add_argument('--database-url', default=DEFAULT_DATABASE_URL,
+                            help='database to seed; it is wiped first (default: %(default)s)')
+    run_parser.add_argument('--venues', type=int, default=1000)
+    run_parser.add_argument('--artists', type=int, default=2000)
+    run_parser.add_argument('--shows', type=int, default=20000)
+    run_parser.add_argument('--past-ratio', type=float, default=0.5,
+                            help='share of shows that already happened')
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--requests', type=int, default=50, help='timed requests per route')
+    run_parser.add_argument('--warmup', type=int, default=3)
+    run_parser.add_argument('--route', action='append',
+                            help='only time this route (repeatable)')
+    run_parser.add_argument('--cache', action='store_true',
+                            help='keep the response and fragment caches enabled')
+    run_parser.add_argument('--no-seed', action='store_true',
+                            help='reuse the catalog already in the database')
+    run_parser.add_argument('-o', '--output', help='write the JSON report to this file')
+    run_parser.set_defaults(func=run)
+
+    load_parser = commands.add_parser(
+        'load', help='drive a running instance with concurrent virtual users')
+    target = load_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='base URL of a running instance')
+    target.add_argument('--serve', action='store_true',
+                        help='serve the app locally on --database-url for the run')
+    load_parser.add_argument('--database-url', default=DEFAULT_DATABASE_URL)
+    load_parser.add_argument('--port', type=int, default=0, help='port for --serve')
+    load_parser.add_argument('--seed-catalog', action='store_true',
+                             help='with --serve, seed a fresh catalog first')
+    load_parser.add_argument('--cache', action='store_true',
+                             help='with --serve, keep the response and fragment caches enabled')
+    load_parser.add_argument('--venues', type=int, default=1000)
+    load_parser.add_argument('--artists', type=int, default=2000)
+    load_parser.add_argument('--shows', type=int, default=20000)
+    load_parser.add_argument('--users', type=lambda value: [int(n) for n in value.split(',')],
+                             default=[1, 2, 4, 8, 16, 32],
+                             help='comma separated concurrency stages (default: 1,2,4,8,16,32)')
+    load_parser.add_argument('--duration', type=float, default=20, help='seconds per stage')
+    load_parser.add_argument('--write-ratio', type=float, default=0.05,
+                             help='share of sessions that book a show')
+    load_parser.add_argument('--seed', type=int, default=42)
+    load_parser.add_argument('-o', '--output', help='write the JSON report to this file')
+    load_parser.set_defaults(func=load)
+
+    startup_parser = commands.add_parser(
+        'startup', help='time app startup, first requests and a CLI command in fresh processes')
+    startup_parser.add_argument('--database-url', default=DEFAULT_DATABASE_URL)
+    startup_parser.add_argument('--runs', type=int, default=5, help='processes per variant')
+    startup_parser.add_argument('--path', action='append',
+                                help='request this path (repeatable; default: the main pages)')
+    startup_parser.add_argument('--cli-command',
+                                help='flask command to time (default: "jobs list --limit 1")')
+    startup_parser.add_argument('-o', '--output', help='write the JSON report to this file')
+    startup_parser.set_defaults(func=startup)
+
+    compare_parser = commands.add_parser('compare', help='compare two JSON reports')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
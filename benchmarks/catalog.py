@@ -0,0 +1,95 @@
+import random
+from datetime import datetime, timedelta
+
+from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres
+import counters
+
+
+GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk',
+          'Funk', 'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz',
+          'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll',
+          'Soul', 'Other']
+
+CITIES = [('San Francisco', 'CA'), ('Los Angeles', 'CA'), ('New York', 'NY'),
+          ('Brooklyn', 'NY'), ('Austin', 'TX'), ('Houston', 'TX'),
+          ('Seattle', 'WA'), ('Chicago', 'IL'), ('Nashville', 'TN'),
+          ('New Orleans', 'LA'), ('Portland', 'OR'), ('Denver', 'CO')]
+
+ADJECTIVES = ['Blue', 'Velvet', 'Golden', 'Electric', 'Midnight', 'Silver',
+              'Wild', 'Crimson', 'Hollow', 'Neon', 'Quiet', 'Savage']
+
+NOUNS = ['Room', 'Hall', 'Lounge', 'Garage', 'Cellar', 'Tavern', 'Owl',
+         'Wolves', 'Echo', 'Pines', 'Harbor', 'Saints']
+
+BATCH_SIZE = 5000
+
+
+def _batched(rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        yield rows[start:start + BATCH_SIZE]
+
+
+def _name(rng, index, suffix):
+    return f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {suffix} {index}'
+
+
+def seed_catalog(venues, artists, shows, past_ratio=0.5, seed=42, now=None):
+    """
+    Wipes the configured database and fills it with venues, artists and shows
+    drawn from a seeded RNG, so the same arguments give the same catalog.
+    Shows start within a year either side of now, past_ratio of them before.
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    db.drop_all()
+    db.create_all()
+
+    db.session.bulk_insert_mappings(Genre, [{'id': i + 1, 'name': name}
+                                            for i, name in enumerate(GENRES)])
+    for model, count, suffix in ((Venue, venues, 'Venue'), (Artist, artists, 'Band')):
+        rows = []
+        for index in range(1, count + 1):
+            city, state = rng.choice(CITIES)
+            row = {
+                'id': index,
+                'name': _name(rng, index, suffix),
+                'city': city,
+                'state': state,
+                'phone': f'{rng.randint(200, 999)}-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}',
+                'image_link': f'https://images.example.com/{suffix.lower()}/{index}.jpg',
+                'facebook_link': f'https://www.facebook.com/{suffix.lower()}{index}',
+                'seeking_description': 'Looking for great music.'
+            }
+            if model is Venue:
+                row['address'] = f'{rng.randint(1, 9999)} Main Street'
+            rows.append(row)
+        for batch in _batched(rows):
+            db.session.bulk_insert_mappings(model, batch)
+
+    for table, column, count in ((venue_genres, 'venue_id', venues),
+                                 (artist_genres, 'artist_id', artists)):
+        links = [{column: owner_id, 'genre_id': genre_id}
+                 for owner_id in range(1, count + 1)
+                 for genre_id in rng.sample(range(1, len(GENRES) + 1), rng.randint(1, 3))]
+        for batch in _batched(links):
+            db.session.execute(table.insert(), batch)
+
+    rows = []
+    for index in range(1, shows + 1):
+        offset = timedelta(minutes=rng.randint(60, 365 * 24 * 60))
+        start_time = now - offset if rng.random() < past_ratio else now + offset
+        rows.append({
+            'id': index,
+            'start_time': start_time.replace(second=0, microsecond=0),
+            'venue_id': rng.randint(1, venues),
+            'artist_id': rng.randint(1, artists)
+        })
+    for batch in _batched(rows):
+        db.session.bulk_insert_mappings(Show, batch)
+    if db.engine.dialect.name == 'postgresql':
+        # Ids were given explicitly, so move the serial sequences past them.
+        for table in ('genres', 'venues', 'artists', 'shows'):
+            db.session.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                               f"(SELECT coalesce(max(id), 1) FROM {table}))")
+    db.session.commit()
+    counters.repair(now)
@@ -0,0 +1,158 @@
+import random
+import re
+import threading
+from datetime import datetime, timedelta
+from time import perf_counter
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode, urlparse
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+
+from benchmarks.routes import percentile
+
+
+SEARCH_TERMS = ['hall', 'blue', 'echo', 'room', 'wolves', 'neon', 'saints', 'band', 'ga']
+
+# Flashed by the create forms when nothing was written.
+REJECTED = 'could not be listed'
+
+
+class Recorder:
+    """
+    Thread safe collector of (step, latency, ok) samples for one stage.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = []
+
+    def add(self, step, latency, ok):
+        with self.lock:
+            self.samples.append((step, latency, ok))
+
+
+class VirtualUser:
+    """
+    One simulated visitor replaying a browsing session: list venues, open a
+    venue, follow one of its artists, search venues or artists, and now and
+    then book a show through /shows/create. Like a browser it keeps its
+    session cookie, so the page a form redirects to shows what was flashed.
+    """
+
+    def __init__(self, base_url, recorder, rng, write_ratio, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.rng = rng
+        self.write_ratio = write_ratio
+        self.timeout = timeout
+        self.venue_ids = []
+        self.artist_ids = []
+        self.opener = build_opener(HTTPCookieProcessor())
+
+    def request(self, step, path, data=None, landing=None):
+        """
+        @param: step, path, data, landing
+        Requests path (a POST of data, if given) and records it under step.
+        Forms answer a rejected write with a redirect and a flash message
+        rather than an error status, so when landing is given the request
+        only counts as ok if it ended up there without REJECTED on the page.
+        """
+        body = urlencode(data, doseq=True).encode() if data is not None else None
+        started = perf_counter()
+        try:
+            with self.opener.open(Request(self.base_url + path, data=body),
+                                  timeout=self.timeout) as response:
+                page = response.read().decode('utf-8', 'replace')
+                ok = response.status < 400
+                if landing is not None:
+                    ok = (ok and urlparse(response.geturl()).path == landing
+                          and REJECTED not in page)
+        except HTTPError as error:
+            page, ok = '', False
+            error.close()
+        except (URLError, OSError):
+            page, ok = '', False
+        self.recorder.add(step, (perf_counter() - started) * 1000, ok)
+        return page
+
+    def _remember(self, page):
+        self.venue_ids.extend(int(i) for i in re.findall(r'href="/venues/(\d+)"', page))
+        self.artist_ids.extend(int(i) for i in re.findall(r'href="/artists/(\d+)"', page))
+        del self.venue_ids[:-200], self.artist_ids[:-200]
+
+    def session(self):
+        rng = self.rng
+        self._remember(self.request('venues', '/venues'))
+        if self.venue_ids:
+            page = self.request('venue_detail', f'/venues/{rng.choice(self.venue_ids)}')
+            self._remember(page)
+        if self.artist_ids:
+            self.request('artist_detail', f'/artists/{rng.choice(self.artist_ids)}')
+        if rng.random() < 0.5:
+            self._remember(self.request('venue_search', '/venues/search',
+                                        {'search_term': rng.choice(SEARCH_TERMS)}))
+        else:
+            self._remember(self.request('artist_search', '/artists/search',
+                                        {'search_term': rng.choice(SEARCH_TERMS)}))
+        if rng.random() < 0.3:
+            self._remember(self.request('artists', '/artists'))
+            self.request('shows', '/shows')
+        if rng.random() < self.write_ratio and self.venue_ids and self.artist_ids:
+            start_time = datetime.now() + timedelta(days=rng.randint(1, 180))
+            self.request('create_show', '/shows/create', {
+                'venue_id': rng.choice(self.venue_ids),
+                'artist_id': rng.choice(self.artist_ids),
+                'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S')
+            }, landing='/')
+
+
+def run_stage(base_url, users, duration, write_ratio=0.05, timeout=30, seed=42):
+    """
+    Runs users virtual users for duration seconds and returns the stage's
+    throughput, latency percentiles and error rate, overall and per step.
+    """
+    recorder = Recorder()
+    deadline = perf_counter() + duration
+
+    def loop(index):
+        user = VirtualUser(base_url, recorder, random.Random(seed * 1000 + index),
+                           write_ratio, timeout)
+        while perf_counter() < deadline:
+            user.session()
+
+    threads = [threading.Thread(target=loop, args=(index,), daemon=True)
+               for index in range(users)]
+    started = perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = perf_counter() - started
+
+    def summarize(samples):
+        latencies = sorted(latency for step, latency, ok in samples)
+        errors = sum(1 for step, latency, ok in samples if not ok)
+        return {
+            'requests': len(samples),
+            'throughput_rps': round(len(samples) / elapsed, 2),
+            'p50_ms': round(percentile(latencies, 50) or 0, 2),
+            'p95_ms': round(percentile(latencies, 95) or 0, 2),
+            'p99_ms': round(percentile(latencies, 99) or 0, 2),
+            'error_rate': round(errors / len(samples), 4) if samples else 0
+        }
+
+    steps = sorted({step for step, latency, ok in recorder.samples})
+    return dict(summarize(recorder.samples), users=users, seconds=round(elapsed, 2), steps={
+        step: summarize([sample for sample in recorder.samples if sample[0] == step])
+        for step in steps
+    })
+
+
+def find_saturation(stages, min_gain=0.05):
+    """
+    Returns the user count after which adding users stopped buying at least
+    min_gain more throughput, or None if throughput kept scaling.
+    """
+    for previous, stage in zip(stages, stages[1:]):
+        if stage['throughput_rps'] < previous['throughput_rps'] * (1 + min_gain):
+            return previous['users']
+    return None
@@ -0,0 +1,114 @@
+import math
+import random
+import tracemalloc
+from contextlib import contextmanager
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from models import db, Show
+from pagination import encode_cursor
+
+
+def percentile(samples, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not samples:
+        return None
+    return samples[max(0, math.ceil(pct / 100 * len(samples)) - 1)]
+
+
+@contextmanager
+def count_queries():
+    """
+    Counts the statements sent to any engine while the block runs.
+    """
+    counter = {'queries': 0}
+
+    def after_cursor_execute(*args):
+        counter['queries'] += 1
+
+    event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(Engine, 'after_cursor_execute', after_cursor_execute)
+
+
+def build_routes(venues, artists, rng):
+    """
+    Returns (name, method, path factory, form data) for every read route.
+    Detail routes pick a random id on each request.
+    """
+    middle = db.session.query(Show.start_time, Show.id).order_by(
+        Show.start_time, Show.id).offset(db.session.query(Show).count() // 2).first()
+    deep_cursor = encode_cursor(list(middle)) if middle else ''
+    return [
+        ('home', 'GET', lambda: '/', None),
+        ('venues', 'GET', lambda: '/venues', None),
+        ('venues_by_genre', 'GET', lambda: '/venues?genre=Jazz', None),
+        ('venue_detail', 'GET', lambda: f'/venues/{rng.randint(1, venues)}', None),
+        ('venue_search', 'POST', lambda: '/venues/search', {'search_term': 'hall'}),
+        ('artists', 'GET', lambda: '/artists', None),
+        ('artists_by_genre', 'GET', lambda: '/artists?genre=Jazz', None),
+        ('artist_detail', 'GET', lambda: f'/artists/{rng.randint(1, artists)}', None),
+        ('artist_search', 'POST', lambda: '/artists/search', {'search_term': 'wolves'}),
+        ('shows', 'GET', lambda: '/shows', None),
+        ('shows_deep_page', 'GET', lambda: f'/shows?after={deep_cursor}', None),
+        ('new_venue_form', 'GET', lambda: '/venues/create', None),
+        ('new_show_form', 'GET', lambda: '/shows/create', None),
+    ]
+
+
+def _request(client, method, path, data):
+    if method == 'POST':
+        return client.post(path, data=data)
+    return client.get(path)
+
+
+def time_routes(app, venues, artists, requests=50, warmup=3, seed=42, only=None):
+    """
+    Times each route through the Flask test client. Returns a dict of route
+    name to latency percentiles (ms), mean query count and peak traced memory.
+    Peak memory is measured in a separate request so tracemalloc's overhead
+    does not skew the timings.
+    """
+    rng = random.Random(seed)
+    client = app.test_client()
+    results = {}
+    with app.app_context():
+        routes = build_routes(venues, artists, rng)
+    for name, method, path, data in routes:
+        if only and name not in only:
+            continue
+        for _ in range(warmup):
+            _request(client, method, path(), data)
+        samples = []
+        statuses = set()
+        with count_queries() as counter:
+            for _ in range(requests):
+                url = path()
+                started = perf_counter()
+                response = _request(client, method, url, data)
+                samples.append((perf_counter() - started) * 1000)
+                statuses.add(response.status_code)
+        tracemalloc.start()
+        _request(client, method, path(), data)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        samples.sort()
+        results[name] = {
+            'method': method,
+            'path': path(),
+            'statuses': sorted(statuses),
+            'requests': requests,
+            'p50_ms': round(percentile(samples, 50), 3),
+            'p95_ms': round(percentile(samples, 95), 3),
+            'p99_ms': round(percentile(samples, 99), 3),
+            'mean_ms': round(sum(samples) / len(samples), 3),
+            'queries': round(counter['queries'] / requests, 2),
+            'peak_kib': round(peak / 1024, 1)
+        }
+    return results
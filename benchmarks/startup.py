@@ -0,0 +1,107 @@
+import json
+import os
+import subprocess
+import sys
+from statistics import median
+from time import perf_counter
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_PATHS = ('/', '/venues', '/artists', '/shows', '/venues/create', '/shows/create')
+
+# A short-lived command, timed end to end like a cron job or deploy step.
+DEFAULT_COMMAND = ('jobs', 'list', '--limit', '1')
+
+# Run in a fresh interpreter, so nothing is imported or compiled yet.
+CHILD = '''
+import json, resource, sys
+from time import perf_counter
+start = perf_counter()
+from app import create_app
+imported = perf_counter()
+database_url, bytecode_cache, paths = sys.argv[1], sys.argv[2] == '1', sys.argv[3:]
+app = create_app(SQLALCHEMY_DATABASE_URI=database_url)
+created = perf_counter()
+if not bytecode_cache:
+    app.jinja_env.bytecode_cache = None
+if not paths:
+    from models import db
+    with app.app_context():
+        db.create_all()
+client = app.test_client()
+first = {}
+for path in paths:
+    began = perf_counter()
+    client.get(path)
+    first[path] = (perf_counter() - began) * 1000
+print(json.dumps({'import_ms': (imported - start) * 1000,
+                  'create_app_ms': (created - imported) * 1000,
+                  'first_request_ms': first,
+                  'modules': len(sys.modules),
+                  'max_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+'''
+
+# What `flask <command>` does, with the app pointed at the benchmark database.
+CLI_CHILD = '''
+import json, resource, sys
+from flask.cli import FlaskGroup
+from app import create_app
+database_url, command = sys.argv[1], sys.argv[2:]
+cli = FlaskGroup(create_app=lambda: create_app(SQLALCHEMY_DATABASE_URI=database_url))
+cli.main(command, prog_name='flask', standalone_mode=False)
+print(json.dumps({'modules': len(sys.modules),
+                  'max_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+'''
+
+
+def _child(database_url, bytecode_cache, paths):
+    output = subprocess.check_output(
+        [sys.executable, '-c', CHILD, database_url, '1' if bytecode_cache else '0', *paths],
+        cwd=ROOT, stderr=subprocess.DEVNULL)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def _cli_child(database_url, command):
+    started = perf_counter()
+    output = subprocess.check_output(
+        [sys.executable, '-c', CLI_CHILD, database_url, *command],
+        cwd=ROOT, stderr=subprocess.DEVNULL)
+    sample = json.loads(output.decode().strip().splitlines()[-1])
+    sample['wall_ms'] = (perf_counter() - started) * 1000
+    return sample
+
+
+def time_startup(database_url, runs=5, paths=DEFAULT_PATHS, command=DEFAULT_COMMAND):
+    """
+    Starts runs fresh processes with the template bytecode cache and runs
+    without it, each building the app and requesting paths once, and
+    returns the median import, create_app and first request times (ms),
+    modules loaded and peak RSS (KiB) of both, keyed 'bytecode_cache' and
+    'no_bytecode_cache'. 'cli' has the wall time, modules and peak RSS of
+    runs `flask command` processes.
+    """
+    # Creates the tables and fills the bytecode cache.
+    _child(database_url, True, [])
+    _child(database_url, True, paths)
+    results = {}
+    for key, bytecode_cache in (('no_bytecode_cache', False), ('bytecode_cache', True)):
+        samples = [_child(database_url, bytecode_cache, paths) for _ in range(runs)]
+        first = {path: round(median(sample['first_request_ms'][path] for sample in samples), 2)
+                 for path in paths}
+        results[key] = {
+            'import_ms': round(median(sample['import_ms'] for sample in samples), 2),
+            'create_app_ms': round(median(sample['create_app_ms'] for sample in samples), 2),
+            'first_request_ms': first,
+            'first_requests_total_ms': round(sum(first.values()), 2),
+            'modules': median(sample['modules'] for sample in samples),
+            'max_rss_kib': median(sample['max_rss_kib'] for sample in samples)
+        }
+    samples = [_cli_child(database_url, command) for _ in range(runs)]
+    results['cli'] = {
+        'command': ' '.join(command),
+        'wall_ms': round(median(sample['wall_ms'] for sample in samples), 2),
+        'modules': median(sample['modules'] for sample in samples),
+        'max_rss_kib': median(sample['max_rss_kib'] for sample in samples)
+    }
+    return results
@@ -0,0 +1,356 @@
+import pickle
+from collections import OrderedDict
+from functools import wraps
+from math import ceil
+from threading import Lock
+from time import monotonic
+from urllib.parse import urlencode
+
+from flask import current_app, request, session
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+
+#----------------------------------------------------------------------------#
+# Backends.
+#----------------------------------------------------------------------------#
+
+
+class LRUBackend:
+    """
+    In-process cache bounded to max_entries, evicting the least recently used
+    entry first. Entries also expire after their TTL. Each worker process has
+    its own copy, so invalidations only reach the worker that made them; keep
+    TTLs short or use the Redis backend when running several workers.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.tags = {}
+        self.evictions = 0
+        self.lock = Lock()
+
+    def _drop(self, key):
+        value, expires_at, tags = self.entries.pop(key)
+        for tag in tags:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= monotonic():
+                self._drop(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl, tags=()):
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = (value, monotonic() + ttl, tuple(tags))
+            for tag in tags:
+                self.tags.setdefault(tag, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self._drop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def invalidate(self, tags):
+        with self.lock:
+            for tag in tags:
+                for key in list(self.tags.get(tag, ())):
+                    self._drop(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.tags.clear()
+
+    def stats(self):
+        return {
+            'backend': 'lru',
+            'size': len(self.entries),
+            'max_entries': self.max_entries,
+            'evictions': self.evictions
+        }
+
+
+class RedisBackend:
+    """
+    Cache shared by all workers through a Redis compatible server. Tags are
+    kept as sets of cache keys so invalidation deletes exactly the tagged
+    entries; a set expires with the longest lived entry added to it, so the
+    sets of tags that stop being written don't outlive their entries. Needs
+    the optional redis package, see requirements.txt.
+    """
+
+    # KEYS are tag sets, ARGV the cache key and its TTL. EXPIRE only ever
+    # extends a set's TTL; TTL is -1 for sets kept from before they expired.
+    TAG_SCRIPT = """
+    for _, tag in ipairs(KEYS) do
+        redis.call('SADD', tag, ARGV[1])
+        if redis.call('TTL', tag) < tonumber(ARGV[2]) then
+            redis.call('EXPIRE', tag, ARGV[2])
+        end
+    end
+    """
+
+    def __init__(self, url, prefix='fyyur:cache:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError(
+                'CACHE_BACKEND = "redis" requires the redis package (pip install redis==3.5.3)')
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.tag = self.client.register_script(self.TAG_SCRIPT)
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl, tags=()):
+        ttl = int(ceil(ttl))
+        pipeline = self.client.pipeline()
+        pipeline.setex(self.prefix + key, ttl, pickle.dumps(value))
+        if tags:
+            self.tag(keys=[self.prefix + 'tag:' + tag for tag in tags],
+                     args=[self.prefix + key, ttl], client=pipeline)
+        pipeline.execute()
+
+    def invalidate(self, tags):
+        for tag in tags:
+            tag_key = self.prefix + 'tag:' + tag
+            keys = self.client.smembers(tag_key)
+            self.client.delete(tag_key, *keys)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self):
+        return {
+            'backend': 'redis',
+            'evictions': self.client.info('stats').get('evicted_keys', 0)
+        }
+
+
+#----------------------------------------------------------------------------#
+# Response cache.
+#----------------------------------------------------------------------------#
+
+
+class ResponseCache:
+    """
+    Caches whole GET responses of Flask views, keyed on the endpoint, its view
+    arguments and the query string, and tagged so that writes can invalidate
+    every page that shows the data they changed.
+
+    Configured through CACHE_BACKEND ('lru', 'redis' or None to disable),
+    CACHE_DEFAULT_TTL, CACHE_MAX_ENTRIES and CACHE_REDIS_URL.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.hits = 0
+        self.misses = 0
+        # Views run on several threads; += on the counters isn't atomic.
+        self.lock = Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('CACHE_BACKEND', 'lru')
+        if backend == 'lru':
+            self.backend = LRUBackend(app.config.get('CACHE_MAX_ENTRIES', 1024))
+        elif backend == 'redis':
+            self.backend = RedisBackend(app.config['CACHE_REDIS_URL'])
+        elif backend is None:
+            # `cache` is shared by every app built in this process.
+            self.backend = None
+        else:
+            raise ValueError(f'Unknown CACHE_BACKEND {backend!r}')
+        app.extensions['response_cache'] = self
+
+    @staticmethod
+    def make_key():
+        """
+        Builds the cache key of the current request from its route and arguments.
+        """
+        view_args = sorted((request.view_args or {}).items())
+        query = urlencode(sorted(request.args.items(multi=True)))
+        return f'{request.endpoint}:{urlencode(view_args)}?{query}'
+
+    def cached(self, tags=(), ttl=None):
+        """
+        @param: tags, ttl
+        Decorates a view so its successful GET responses are cached. tags is a
+        list of tag names, or a callable receiving the view arguments and
+        returning one.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**view_args):
+                # Pending flash messages are rendered into (and consumed by)
+                # the page, so those responses are neither served nor stored.
+                if self.backend is None or request.method != 'GET' or session.get('_flashes'):
+                    return view(**view_args)
+                key = self.make_key()
+                entry = self.backend.get(key)
+                if entry is not None:
+                    with self.lock:
+                        self.hits += 1
+                    body, status, headers = entry
+                    return current_app.response_class(body, status, headers)
+                with self.lock:
+                    self.misses += 1
+                response = current_app.make_response(view(**view_args))
+                if response.status_code == 200 and not response.direct_passthrough:
+                    entry_tags = tags(**view_args) if callable(tags) else tags
+                    headers = [(name, value) for name, value in response.headers
+                               if name.lower() != 'set-cookie']
+                    self.backend.set(
+                        key, (response.get_data(), response.status_code, headers),
+                        ttl or current_app.config.get('CACHE_DEFAULT_TTL', 60),
+                        entry_tags)
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        """
+        Drops every cached response carrying any of the given tags.
+        """
+        if self.backend is not None and tags:
+            self.backend.invalidate(tags)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        """
+        Returns hit/miss counters of this process plus the backend's own stats.
+        """
+        with self.lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        stats = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups, 4) if lookups else None
+        }
+        if self.backend is not None:
+            stats.update(self.backend.stats())
+        fragments = getattr(current_app.jinja_env, 'fragment_cache', None)
+        if fragments is not None:
+            stats['fragments'] = fragments.stats()
+        return stats
+
+
+cache = ResponseCache()
+
+
+#----------------------------------------------------------------------------#
+# HTTP validation.
+#----------------------------------------------------------------------------#
+
+
+def last_modified(getter, max_age=None):
+    """
+    @param: getter, max_age
+    Decorates a view with Last-Modified validation. getter receives the view
+    arguments and returns when the page last changed (naive UTC), or None to
+    let the view run as usual (e.g. to 404). Requests with an
+    If-Modified-Since at or after that get a 304 without running the view,
+    so wrap it outside of cache.cached. Other 200 responses are marked
+    public for max_age seconds (DETAIL_CACHE_MAX_AGE by default), so proxies
+    and CDNs can serve repeats. Pages with pending flash messages are
+    personal and left alone.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**view_args):
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(**view_args)
+            modified = getter(**view_args)
+            if modified is None:
+                return view(**view_args)
+            modified = modified.replace(microsecond=0)
+            since = request.if_modified_since
+            if since is not None and modified <= since.replace(tzinfo=None):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(**view_args))
+                if response.status_code != 200:
+                    return response
+            response.last_modified = modified
+            response.cache_control.public = True
+            response.cache_control.max_age = max_age if max_age is not None else \
+                current_app.config.get('DETAIL_CACHE_MAX_AGE', 60)
+            return response
+        return wrapper
+    return decorator
+
+
+#----------------------------------------------------------------------------#
+# Template fragments.
+#----------------------------------------------------------------------------#
+
+
+class FragmentCacheExtension(Extension):
+    """
+    Adds a {% cache key, ttl %}...{% endcache %} tag caching the rendered
+    body. key is any expression, usually a list of a fragment name, an entity
+    id and the version of every row the fragment shows, e.g.
+    {% cache ['artist-tile', show.show_id, show.artist_version] %}. Since a
+    changed row changes the key, entries never need invalidating; stale
+    versions simply age out of the LRU. ttl defaults to FRAGMENT_CACHE_TTL.
+    """
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None, fragment_cache_ttl=3600)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render_cached', args),
+                               [], [], body).set_lineno(lineno)
+
+    def _render_cached(self, key, ttl, caller):
+        backend = self.environment.fragment_cache
+        if backend is None:
+            return caller()
+        if isinstance(key, (list, tuple)):
+            key = ':'.join(str(part) for part in key)
+        fragment = backend.get(key)
+        if fragment is None:
+            fragment = caller()
+            backend.set(key, fragment, ttl or self.environment.fragment_cache_ttl)
+        return fragment
+
+
+def init_fragment_cache(app):
+    """
+    Registers the {% cache %} tag on app.jinja_env, backed by an in-process
+    LRU sized by FRAGMENT_CACHE_MAX_ENTRIES (0 disables fragment caching).
+    """
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    max_entries = app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', 4096)
+    app.jinja_env.fragment_cache = LRUBackend(max_entries) if max_entries else None
+    app.jinja_env.fragment_cache_ttl = app.config.get('FRAGMENT_CACHE_TTL', 3600)
@@ -21,4 +21,81 @@ db_uri = {
 SQLALCHEMY_DATABASE_URI = URL(**db_uri)
 
 # Modification tracking
-SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Maximum number of hits returned by the venue and artist search pages
+SEARCH_RESULT_LIMIT = 50
+# Seconds between checks that the in-process search index (SQLite) still
+# matches the database, which other processes write to as well
+SEARCH_INDEX_CHECK_INTERVAL = 5
+
+# Keyset pagination of the venue, artist and show listings
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Response cache: 'lru' (per process), 'redis' (shared, needs the optional redis
+# package) or None to disable
+CACHE_BACKEND = 'lru'
+CACHE_DEFAULT_TTL = 60
+CACHE_MAX_ENTRIES = 1024
+CACHE_REDIS_URL = 'redis://localhost:6379/0'
+
+# Template fragment cache ({% cache %}), 0 entries disables it
+FRAGMENT_CACHE_TTL = 3600
+FRAGMENT_CACHE_MAX_ENTRIES = 4096
+
+# Per request SQL query counting; a statement repeated this many times in one
+# request is reported as an N+1 pattern
+QUERY_INSPECTOR_ENABLED = True
+N_PLUS_ONE_THRESHOLD = 5
+
+# Rows inserted (and committed) per batch by the `flask import` commands
+IMPORT_BATCH_SIZE = 2000
+
+# Rows fetched per round trip when streaming the show export
+EXPORT_BATCH_SIZE = 1000
+
+# Seconds proxies may serve venue and artist pages before revalidating them
+# with If-Modified-Since
+DETAIL_CACHE_MAX_AGE = 60
+
+# Locale of dates rendered with the |datetime filter
+DATETIME_LOCALE = 'en_US'
+
+# Rows hard deleted per transaction, and seconds between runs, by the purge of
+# deleted venues and artists (`flask purge worker`)
+PURGE_BATCH_SIZE = 500
+PURGE_INTERVAL = 30
+
+# Background jobs (jobs.py). Web processes run the jobs they queue on threads
+# of their own unless JOBS_IN_PROCESS is off; `flask jobs worker` runs any
+JOBS_IN_PROCESS = True
+JOB_THREADS = 4
+# Processes for CPU-heavy tasks, 0 runs them on the threads too
+JOB_PROCESSES = 0
+JOB_POLL_INTERVAL = 5
+# Attempts per job; retries wait JOB_RETRY_DELAY seconds, doubling up to
+# JOB_RETRY_MAX
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 10
+JOB_RETRY_MAX = 3600
+# Seconds after which a job still running is assumed lost and run again
+JOB_LOCK_TIMEOUT = 600
+# Seconds finished jobs are kept for `flask jobs list`
+JOB_RETENTION = 86400
+
+# Thumbnails of venue and artist images served by /img/<kind>/<id>, made with
+# Pillow: where they are kept, the total size kept, and how long browsers keep
+# one requested without the owner's version
+IMAGE_CACHE_DIR = os.path.join(basedir, 'cache', 'thumbnails')
+IMAGE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+IMAGE_CACHE_MAX_AGE = 3600
+# Limits on fetching the original pictures; private and loopback hosts are
+# refused unless allowed (development only)
+IMAGE_FETCH_TIMEOUT = 5
+IMAGE_MAX_SOURCE_BYTES = 10 * 1024 * 1024
+IMAGE_ALLOW_PRIVATE_HOSTS = False
+
+# Compiled templates, shared by workers and kept across restarts; fill it at
+# build time with `flask templates precompile`. None compiles in memory only
+JINJA_BYTECODE_CACHE_DIR = os.path.join(basedir, 'cache', 'jinja')
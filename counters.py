@@ -0,0 +1,197 @@
+from collections import defaultdict
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import and_, bindparam, case, func, select
+from sqlalchemy.orm import aliased, join
+
+from models import db, Venue, Artist, Show, CounterWatermark, not_deleted
+
+
+#----------------------------------------------------------------------------#
+# Show counters.
+#
+# Venue and Artist carry upcoming_shows_count/past_shows_count so listings
+# and search read them for free. A show counts as upcoming while its
+# start_time is after the watermark; the rollover job moves shows whose
+# start_time has passed from the upcoming to the past counters and advances
+# the watermark, so the counters are exact as of the last rollover.
+# Counter updates set updated_at to itself so they don't count as edits.
+# Deleting a venue or an artist takes its shows off the other side's
+# counters right away; from then on they are left out of every count.
+# That does change the other side's pages, so it moves their updated_at:
+# once the purge removes the deleted row and its shows, nothing else would
+# keep their Last-Modified past the deletion.
+#----------------------------------------------------------------------------#
+
+
+def _watermark():
+    """
+    Returns the current rollover watermark. The row is share locked so a
+    concurrent rollover cannot move shows this transaction is still counting.
+    """
+    marker = CounterWatermark.query.with_for_update(read=True).first()
+    return marker.rolled_over_at if marker else datetime.min
+
+
+def _adjust(model, owner_id, upcoming=0, past=0, touch=False):
+    changes = {model.updated_at: datetime.utcnow() if touch else model.updated_at}
+    if upcoming:
+        changes[model.upcoming_shows_count] = model.upcoming_shows_count + upcoming
+    if past:
+        changes[model.past_shows_count] = model.past_shows_count + past
+    if upcoming or past:
+        db.session.query(model).filter(model.id == owner_id).update(
+            changes, synchronize_session=False)
+
+
+def show_added(show):
+    """
+    @param: show
+    Counts a new show against its venue and artist, in the caller's transaction.
+    """
+    if show.start_time > _watermark():
+        _adjust(Venue, show.venue_id, upcoming=1)
+        _adjust(Artist, show.artist_id, upcoming=1)
+    else:
+        _adjust(Venue, show.venue_id, past=1)
+        _adjust(Artist, show.artist_id, past=1)
+
+
+def shows_added(shows):
+    """
+    @param: shows
+    Counts a batch of new shows, given as dicts with venue_id, artist_id and
+    start_time, with one executemany UPDATE per table instead of one UPDATE
+    per show. Used by the bulk importer, in the caller's transaction.
+    """
+    watermark = _watermark()
+    tallies = {Venue: defaultdict(lambda: [0, 0]), Artist: defaultdict(lambda: [0, 0])}
+    for show in shows:
+        slot = 0 if show['start_time'] > watermark else 1
+        tallies[Venue][show['venue_id']][slot] += 1
+        tallies[Artist][show['artist_id']][slot] += 1
+    for model, owners in tallies.items():
+        if not owners:
+            continue
+        table = model.__table__
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('owner_id')).values(
+                upcoming_shows_count=table.c.upcoming_shows_count + bindparam('upcoming'),
+                past_shows_count=table.c.past_shows_count + bindparam('past'),
+                updated_at=table.c.updated_at),
+            [{'owner_id': owner_id, 'upcoming': upcoming, 'past': past}
+             for owner_id, (upcoming, past) in owners.items()])
+
+
+def _shows_removed(owner_model, owner_column, show_filter):
+    """
+    Takes the shows matched by show_filter off the counters of owner_model,
+    one UPDATE per owner, which also marks the owners' pages as changed.
+    Must run before the shows are deleted.
+    """
+    watermark = _watermark()
+    upcoming = func.sum(case([(Show.start_time > watermark, 1)], else_=0))
+    rows = db.session.query(owner_column, upcoming, func.count(Show.id)).filter(
+        show_filter).group_by(owner_column).all()
+    for owner_id, upcoming_count, total in rows:
+        _adjust(owner_model, owner_id, upcoming=-upcoming_count,
+                past=upcoming_count - total, touch=True)
+
+
+def venue_shows_removed(venue_id):
+    """
+    @param: venue_id
+    Takes the shows of a venue that is being deleted off its artists' counters.
+    """
+    _shows_removed(Artist, Show.artist_id, Show.venue_id == venue_id)
+
+
+def artist_shows_removed(artist_id):
+    """
+    @param: artist_id
+    Takes the shows of an artist that is being deleted off its venues' counters.
+    """
+    _shows_removed(Venue, Show.venue_id, Show.artist_id == artist_id)
+
+
+def rollover(now=None):
+    """
+    Moves shows that started since the last rollover from the upcoming to the
+    past counters. Returns the number of shows moved on each table's
+    counters, e.g. {'venues': 3, 'artists': 3}. Meant to run periodically,
+    e.g. `flask counters rollover` from cron.
+    """
+    now = now or datetime.now()
+    moved = {Venue.__tablename__: 0, Artist.__tablename__: 0}
+    marker = CounterWatermark.query.with_for_update().first()
+    if marker is None:
+        repair(now)
+        return moved
+    if now <= marker.rolled_over_at:
+        db.session.rollback()
+        return moved
+    window = and_(Show.start_time > marker.rolled_over_at, Show.start_time <= now)
+    for model, column in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+        rows = db.session.query(column, func.count(Show.id)).join(
+            Venue, Venue.id == Show.venue_id).join(Artist, Artist.id == Show.artist_id).filter(
+            window, not_deleted(Venue, Artist)).group_by(column).all()
+        for owner_id, count in rows:
+            _adjust(model, owner_id, upcoming=-count, past=count)
+        moved[model.__tablename__] = sum(count for owner_id, count in rows)
+    marker.rolled_over_at = now
+    db.session.commit()
+    return moved
+
+
+def _count_shows(column, owner_id, condition):
+    # Aliased, or the subquery would correlate its venues or artists with
+    # the ones being updated.
+    venue, artist = aliased(Venue), aliased(Artist)
+    return select([func.count(Show.id)]).select_from(
+        join(Show, venue, venue.id == Show.venue_id).join(artist, artist.id == Show.artist_id)
+    ).where(and_(column == owner_id, condition, not_deleted(venue, artist))).as_scalar()
+
+
+def repair(now=None):
+    """
+    Recomputes every venue and artist counter from the shows table in two
+    bulk UPDATE statements and resets the watermark to now.
+    """
+    now = now or datetime.now()
+    marker = CounterWatermark.query.with_for_update().first()
+    if marker is None:
+        marker = CounterWatermark()
+        db.session.add(marker)
+    marker.rolled_over_at = now
+    for model, column in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+        db.session.query(model).update({
+            model.upcoming_shows_count: _count_shows(column, model.id, Show.start_time > now),
+            model.past_shows_count: _count_shows(column, model.id, Show.start_time <= now),
+            model.updated_at: model.updated_at
+        }, synchronize_session=False)
+    db.session.commit()
+
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+
+counters_cli = AppGroup('counters', help='Maintain the show counters.')
+
+
+@counters_cli.command('rollover')
+def rollover_command():
+    """Move started shows from the upcoming to the past counters."""
+    moved = rollover()
+    click.echo(f"Rolled over {moved['venues']} shows on the venue counters and "
+               f"{moved['artists']} on the artist counters.")
+
+
+@counters_cli.command('repair')
+def repair_command():
+    """Recompute all show counters from the shows table."""
+    repair()
+    click.echo('Show counters recomputed.')
@@ -0,0 +1,123 @@
+import re
+from collections import defaultdict
+
+import click
+from flask.cli import AppGroup
+
+from models import db, Venue, venue_key, not_deleted
+
+
+#----------------------------------------------------------------------------#
+# Near-duplicate venues.
+#
+# The unique index only stops venues whose trimmed, lower cased name, city
+# and state are identical. "The Musical Hop" and "Musical Hop", or "Park
+# Square Live Music & Coffee" and "Park Square Live Music and Coffee", still
+# get listed twice. This batch job compares the venues of each city by the
+# trigram similarity of their canonical names and reports likely pairs for
+# someone to merge.
+#----------------------------------------------------------------------------#
+
+
+STOPWORDS = {'the', 'a', 'an', 'and', 'at', 'of'}
+
+
+def canonical_name(name):
+    """
+    @param: name
+    Lower cases name, spells out '&', drops punctuation and filler words.
+    """
+    words = re.sub(r'[^\w\s]', ' ', (name or '').lower().replace('&', ' and ')).split()
+    return ' '.join(word for word in words if word not in STOPWORDS)
+
+
+def trigrams(text):
+    """
+    Trigrams of every word padded like pg_trgm does ('  w', ' wo', ..., 'rd '),
+    so short names and word starts weigh in.
+    """
+    grams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _block_pairs(venues, threshold):
+    """
+    Yields (score, first, second) for the venues of one city whose canonical
+    names have a trigram similarity (shared / all trigrams) of at least
+    threshold. Only pairs sharing a trigram are ever compared.
+    """
+    grams = [trigrams(venue['canonical']) for venue in venues]
+    postings = defaultdict(list)
+    for index, venue_grams in enumerate(grams):
+        shared = defaultdict(int)
+        for gram in venue_grams:
+            for other in postings[gram]:
+                shared[other] += 1
+            postings[gram].append(index)
+        for other, count in shared.items():
+            if venues[index]['canonical'] == venues[other]['canonical']:
+                score = 1.0
+            else:
+                score = count / (len(venue_grams) + len(grams[other]) - count)
+            if score >= threshold:
+                yield score, venues[other], venues[index]
+
+
+def find_duplicates(threshold=0.6, exact=False):
+    """
+    @param: threshold, exact
+    Returns merge candidates over the whole catalog, best first, as dicts
+    with a similarity 'score' and the two 'venues'. Venues are only compared
+    within their (city, state). exact=True reports only the venues the
+    unique index would treat as the same, deleted ones included: they
+    still collide in it until purged. That mode also runs before the
+    deleted_at column exists, from the migration adding the index.
+    """
+    query = db.session.query(Venue.id, Venue.name, Venue.city, Venue.state)
+    if not exact:
+        query = query.filter(not_deleted(Venue))
+    blocks = defaultdict(list)
+    for venue_id, name, city, state in query.order_by(Venue.id):
+        key = venue_key(name, city, state)
+        blocks[key[1:]].append({'id': venue_id, 'name': name, 'city': city, 'state': state,
+                                'key': key, 'canonical': canonical_name(name)})
+    candidates = []
+    for venues in blocks.values():
+        if exact:
+            by_key = defaultdict(list)
+            for venue in venues:
+                by_key[venue['key']].append(venue)
+            pairs = ((1.0, listed[0], venue) for listed in by_key.values() for venue in listed[1:])
+        else:
+            pairs = _block_pairs(venues, threshold)
+        candidates.extend({'score': round(score, 3), 'venues': (first, second)}
+                          for score, first, second in pairs)
+    candidates.sort(key=lambda candidate: (-candidate['score'], candidate['venues'][0]['id']))
+    return candidates
+
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+
+venues_cli = AppGroup('venues', help='Venue maintenance.')
+
+
+@venues_cli.command('duplicates')
+@click.option('--threshold', type=float, default=0.6,
+              help='Minimum trigram similarity of two names (default 0.6).')
+@click.option('--exact', is_flag=True,
+              help='Only report venues with the same trimmed, lower cased name, city and state.')
+@click.option('--limit', type=int, default=100, help='Candidates to list (default 100).')
+def duplicates_command(threshold, exact, limit):
+    """Report venues that are probably listed twice."""
+    candidates = find_duplicates(threshold, exact)
+    for candidate in candidates[:limit]:
+        first, second = candidate['venues']
+        click.echo(f"{candidate['score']:.2f}  #{first['id']} {first['name']}  |  "
+                   f"#{second['id']} {second['name']}  ({first['city']}, {first['state']})")
+    click.echo(f'{len(candidates)} merge candidates.')
@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+import os
+import sys
+from time import perf_counter
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from models import db, Venue, Artist, Show, not_deleted
+
+
+FIELDS = ('id', 'start_time', 'duration', 'venue_id', 'venue_name', 'venue_city', 'venue_state',
+          'artist_id', 'artist_name')
+FORMATS = ('jsonl', 'csv')
+
+
+#----------------------------------------------------------------------------#
+# Show calendar.
+#----------------------------------------------------------------------------#
+
+
+def iter_shows(after_id=None, since=None, batch_size=None):
+    """
+    @param: after_id, since, batch_size
+    Yields every show as a dict of FIELDS in id order, with venue and artist
+    names joined in. Rows are fetched batch_size at a time through a server
+    side cursor (yield_per), so memory use does not grow with the table.
+    after_id skips shows up to and including that id, for incremental
+    exports; since skips shows starting before that datetime.
+    """
+    batch_size = batch_size or current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    query = db.session.query(
+        Show.id,
+        Show.start_time,
+        Show.duration,
+        Show.venue_id,
+        Venue.name.label('venue_name'),
+        Venue.city.label('venue_city'),
+        Venue.state.label('venue_state'),
+        Show.artist_id,
+        Artist.name.label('artist_name')
+    ).join(Venue, Venue.id == Show.venue_id).join(
+        Artist, Artist.id == Show.artist_id).filter(not_deleted(Venue, Artist))
+    if after_id is not None:
+        query = query.filter(Show.id > after_id)
+    if since is not None:
+        query = query.filter(Show.start_time >= since)
+    for show in query.order_by(Show.id).yield_per(batch_size):
+        row = show._asdict()
+        row['start_time'] = show.start_time.isoformat()
+        yield row
+
+
+def to_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
+def to_csv(rows):
+    """
+    Formats rows as CSV lines, header first, one yielded string per row.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_lines(export_format, rows):
+    """
+    @param: export_format, rows
+    Returns a generator of the text lines of rows in 'jsonl' or 'csv'.
+    """
+    return to_csv(rows) if export_format == 'csv' else to_jsonl(rows)
+
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+
+export_cli = AppGroup('export', help='Export the show calendar.')
+
+
+@export_cli.command('shows')
+@click.option('-o', '--output', type=click.Path(dir_okay=False),
+              help='Write to this file instead of stdout.')
+@click.option('--format', 'export_format', type=click.Choice(FORMATS),
+              help='Output format (default: from the file extension, else jsonl).')
+@click.option('--after-id', type=int, help='Only export shows with a greater id.')
+@click.option('--since', type=click.DateTime(), help='Only export shows starting at or after.')
+@click.option('--watermark-file', type=click.Path(dir_okay=False),
+              help='Read --after-id from and save the last exported id to this file, '
+                   'so each run only exports shows added since the previous one.')
+@click.option('--batch-size', type=int, help='Rows fetched per database round trip.')
+def export_shows_command(output, export_format, after_id, since, watermark_file, batch_size):
+    """Stream all shows with venue and artist names as JSONL or CSV."""
+    if export_format is None:
+        export_format = 'csv' if output and output.endswith('.csv') else 'jsonl'
+    if after_id is None and watermark_file and os.path.exists(watermark_file):
+        with open(watermark_file) as f:
+            after_id = int(f.read().strip() or 0)
+    last_id = after_id
+    count = 0
+
+    def tracked(rows):
+        nonlocal last_id, count
+        for row in rows:
+            last_id = row['id']
+            count += 1
+            yield row
+
+    started = perf_counter()
+    out = open(output, 'w', newline='', encoding='utf-8') if output else sys.stdout
+    try:
+        out.writelines(export_lines(export_format, tracked(
+            iter_shows(after_id, since, batch_size))))
+    finally:
+        if output:
+            out.close()
+    if watermark_file and last_id is not None:
+        with open(watermark_file, 'w') as f:
+            f.write(f'{last_id}\n')
+    elapsed = perf_counter() - started
+    click.echo(f'Exported {count} shows in {elapsed:.2f}s '
+               f'({count / elapsed if elapsed else 0:.0f} rows/s), last id {last_id}.',
+               err=True)
@@ -13,6 +13,11 @@ def test():
         abort("Aborted at user request.")
 
 
+def benchmark():
+    commit_id = local("git rev-parse --short HEAD", capture=True)
+    local("python -m benchmarks run -o benchmark-{}.json".format(commit_id))
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
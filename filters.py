@@ -1,12 +1,59 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+
 import dateutil.parser
-import babel
+from babel import Locale
+from babel.dates import parse_pattern
+from flask import current_app, has_app_context
+
+
+#----------------------------------------------------------------------------#
+# Date and time formatting.
+#
+# Babel compiles a pattern and loads locale data on every format_datetime
+# call, which adds up on pages listing hundreds of shows. The compiled
+# pattern of each (format, locale) and the formatted string of each
+# timestamp are cached instead; listings repeat the same start times a lot.
+#----------------------------------------------------------------------------#
+
+
+FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+    # What the show tiles have always shown, e.g. 17/02/2028, 20:00.
+    'short': "dd/MM/y, HH:mm"
+}
+
+
+@lru_cache(maxsize=None)
+def _compiled(format, locale):
+    """
+    Returns the Locale and the compiled pattern of a format name or pattern.
+    """
+    return Locale.parse(locale), parse_pattern(FORMATS.get(format, format))
+
 
-def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format)
+@lru_cache(maxsize=4096)
+def _format(value, format, locale):
+    babel_locale, pattern = _compiled(format, locale)
+    if value.tzinfo is None:
+        # Babel reads naive datetimes as UTC, keep it that way.
+        value = value.replace(tzinfo=timezone.utc)
+    return pattern.apply(value, babel_locale)
 
 
+def format_datetime(value, format='medium', locale=None):
+    """
+    @param: value, format, locale
+    Formats a datetime with one of the FORMATS names or a Babel pattern, in
+    locale (DATETIME_LOCALE by default). Strings are parsed first, for
+    callers that still pass them. Registered as the |datetime filter.
+    """
+    if value is None:
+        return ''
+    if not isinstance(value, datetime):
+        value = dateutil.parser.parse(value)
+    if locale is None:
+        locale = current_app.config.get('DATETIME_LOCALE', 'en_US') \
+            if has_app_context() else 'en_US'
+    return _format(value, format, locale)
@@ -0,0 +1,221 @@
+import ipaddress
+import os
+import socket
+from hashlib import sha256
+from io import BytesIO
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from urllib.error import URLError
+from urllib.parse import urlsplit
+from urllib.request import HTTPRedirectHandler, build_opener
+
+from flask import Blueprint, abort, current_app, redirect, request, send_file, url_for
+
+from models import Venue, Artist
+
+
+#----------------------------------------------------------------------------#
+# Thumbnails.
+#
+# Venue and artist images are links to full size pictures on other sites.
+# /img/<kind>/<id> fetches the linked picture once, crops and scales it to
+# one of the SIZES with Pillow and keeps the JPEG in an on-disk cache
+# capped at IMAGE_CACHE_MAX_BYTES, evicting the least recently served
+# files. When the picture can't be fetched or decoded, the route redirects
+# to the original link. tests/test_images.py runs it against a local origin.
+#----------------------------------------------------------------------------#
+
+
+SIZES = {
+    # Show tiles, see .tile img in main.css; twice that for dense screens.
+    'tile': (400, 400),
+    # The picture at the top of a venue or artist page.
+    'page': (800, 800)
+}
+
+OWNERS = {'venue': Venue, 'artist': Artist}
+
+# Bumped whenever the thumbnails come out differently, to re-key the cache.
+RENDERING = 1
+
+images = Blueprint('images', __name__)
+
+
+class DiskCache:
+    """
+    Files under directory named after the hash of their key, two levels
+    deep. Reads touch a file's mtime, so when the total size passes
+    max_bytes the files served least recently are removed first, down to
+    90% of max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = None
+        self.lock = Lock()
+
+    @staticmethod
+    def digest(key):
+        return sha256(key.encode()).hexdigest()
+
+    def path(self, key):
+        digest = self.digest(key)
+        return os.path.join(self.directory, digest[:2], f'{digest}.jpg')
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def set(self, key, content):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written aside and renamed, so readers never see half a file.
+        with NamedTemporaryFile(dir=os.path.dirname(path), suffix='.tmp', delete=False) as file:
+            file.write(content)
+        os.replace(file.name, path)
+        with self.lock:
+            if self.size is None:
+                self.size = sum(size for path, size, mtime in self._files())
+            else:
+                self.size += len(content)
+            if self.size > self.max_bytes:
+                self._evict()
+        return path
+
+    def _files(self):
+        for root, dirs, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.jpg'):
+                    try:
+                        stat = os.stat(os.path.join(root, name))
+                    except FileNotFoundError:
+                        continue
+                    yield os.path.join(root, name), stat.st_size, stat.st_mtime
+
+    def _evict(self):
+        # Rescanned, other workers share the directory.
+        files = sorted(self._files(), key=lambda file: file[2])
+        self.size = sum(size for path, size, mtime in files)
+        for path, size, mtime in files:
+            if self.size <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
+
+
+def _check_host(url):
+    """
+    Image links are user input: only fetch http(s) URLs of public hosts,
+    unless IMAGE_ALLOW_PRIVATE_HOSTS is set (for development).
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise URLError(f'Not an http(s) URL: {url}')
+    if current_app.config.get('IMAGE_ALLOW_PRIVATE_HOSTS', False):
+        return
+    for family, type, proto, canonname, address in socket.getaddrinfo(parts.hostname, parts.port or 80):
+        if not ipaddress.ip_address(address[0]).is_global:
+            raise URLError(f'{parts.hostname} is not a public host')
+
+
+class _CheckedRedirectHandler(HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        _check_host(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def fetch(url):
+    """
+    @param: url
+    Downloads url, up to IMAGE_MAX_SOURCE_BYTES, in IMAGE_FETCH_TIMEOUT
+    seconds. Raises URLError (or OSError) when that fails.
+    """
+    _check_host(url)
+    limit = current_app.config.get('IMAGE_MAX_SOURCE_BYTES', 10 * 1024 * 1024)
+    opener = build_opener(_CheckedRedirectHandler)
+    opener.addheaders = [('User-Agent', 'Fyyur thumbnailer')]
+    with opener.open(url, timeout=current_app.config.get('IMAGE_FETCH_TIMEOUT', 5)) as response:
+        content = response.read(limit + 1)
+    if len(content) > limit:
+        raise URLError(f'{url} is larger than {limit} bytes')
+    return content
+
+
+def thumbnail(content, size):
+    """
+    @param: content, size
+    Returns a JPEG of the picture in content, cropped to the aspect ratio of
+    size around its center and scaled to it.
+    """
+    from PIL import Image, ImageOps
+    with Image.open(BytesIO(content)) as image:
+        # Lets JPEGs decode at a fraction of their size.
+        image.draft('RGB', (size[0] * 2, size[1] * 2))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        image = ImageOps.fit(image, size, Image.LANCZOS)
+    output = BytesIO()
+    image.save(output, 'JPEG', quality=85, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def _cache():
+    cache = current_app.extensions.get('thumbnails')
+    if cache is None:
+        cache = current_app.extensions['thumbnails'] = DiskCache(
+            current_app.config.get('IMAGE_CACHE_DIR', 'thumbnails'),
+            current_app.config.get('IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+    return cache
+
+
+@images.app_template_global()
+def thumbnail_url(kind, owner_id, version=None, size='tile'):
+    """
+    URL of the thumbnail of a venue or artist image. Passing the owner's
+    version lets browsers keep it for good; it changes whenever the image
+    link does.
+    """
+    return url_for('images.show_thumbnail', kind=kind, owner_id=owner_id, size=size, v=version)
+
+
+@images.route('/img/<kind>/<int:owner_id>')
+def show_thumbnail(kind, owner_id):
+    """
+    @param: kind, owner_id
+    Serves the ?size= thumbnail (tile by default) of a venue or artist image.
+    """
+    model = OWNERS.get(kind)
+    size = SIZES.get(request.args.get('size', 'tile'))
+    if model is None or size is None:
+        abort(404)
+    owner = model.get_listed(owner_id)
+    if owner is None or not owner.image_link:
+        abort(404)
+    key = f'{RENDERING}:{size[0]}x{size[1]}:{owner.image_link}'
+    cache = _cache()
+    path = cache.get(key)
+    if path is None:
+        try:
+            path = cache.set(key, thumbnail(fetch(owner.image_link), size))
+        except Exception as error:
+            current_app.logger.warning(f'No thumbnail of {owner.image_link}: {error!r}')
+            return redirect(owner.image_link)
+    # The file's mtime moves on every hit, so neither it nor send_file's
+    # ETag (built from it) can validate; the cache key's hash can.
+    response = send_file(path, mimetype='image/jpeg', add_etags=False)
+    del response.headers['Last-Modified']
+    response.set_etag(cache.digest(key))
+    response.make_conditional(request)
+    if request.args.get('v') == str(owner.version):
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = \
+            f"public, max-age={current_app.config.get('IMAGE_CACHE_MAX_AGE', 3600)}"
+    return response
@@ -0,0 +1,497 @@
+import csv
+import io
+import json
+import os
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from datetime import datetime
+from time import perf_counter
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func, text
+from werkzeug.datastructures import MultiDict
+
+from models import (db, Venue, Artist, Show, Genre, venue_genres, artist_genres, normalized,
+                    venue_key, not_deleted)
+from forms import VenueForm, ArtistForm, ShowForm
+from cache import cache, LRUBackend
+import counters
+import schedule
+
+
+#----------------------------------------------------------------------------#
+# Reading.
+#----------------------------------------------------------------------------#
+
+
+BOOLEAN_FIELDS = ('seeking_talent', 'seeking_venue')
+FALSE_VALUES = ('', '0', 'false', 'f', 'no', 'n')
+
+
+def read_rows(path):
+    """
+    @param: path
+    Streams the records of a .csv file (with a header line) or of a .jsonl
+    file (one JSON object per line) as (number, row, error) tuples, numbered
+    from 1. Records that cannot be parsed come with a None row and an error.
+    """
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            for number, row in enumerate(csv.DictReader(f), 1):
+                yield number, row, None
+        return
+    with open(path, encoding='utf-8') as f:
+        number = 0
+        for line in f:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                yield number, None, f'invalid JSON: {error}'
+                continue
+            if isinstance(row, dict):
+                yield number, row, None
+            else:
+                yield number, None, 'not a JSON object'
+
+
+def _formdata(row):
+    """
+    Turns a CSV or JSON record into the form data a browser would post, so
+    the rows can be checked by the very forms the web pages use. CSV genres
+    are comma separated.
+    """
+    data = MultiDict()
+    for key, value in row.items():
+        if value is None or key is None:
+            continue
+        if key in BOOLEAN_FIELDS:
+            if isinstance(value, bool) and value or \
+                    isinstance(value, str) and value.strip().lower() not in FALSE_VALUES:
+                data.add(key, 'y')
+        elif key == 'genres':
+            names = value.split(',') if isinstance(value, str) else value
+            for name in names:
+                if str(name).strip():
+                    data.add(key, str(name).strip())
+        else:
+            data.add(key, str(value).strip())
+    return data
+
+
+#----------------------------------------------------------------------------#
+# Importers.
+#----------------------------------------------------------------------------#
+
+
+class Importer(ABC):
+    """
+    Validates rows of one kind with its web form and inserts the valid ones
+    a batch at a time. insert() gets the batch as (number, data) pairs and
+    returns the (number, errors) pairs of the rows it had to reject.
+    """
+    form_class = None
+    # Tags of the cached pages showing the imported rows.
+    cache_tags = ()
+
+    def validate(self, row):
+        form = self.form_class(_formdata(row), meta={'csrf': False})
+        if not form.validate():
+            return None, form.errors
+        return form.data, None
+
+    @abstractmethod
+    def insert(self, batch):
+        pass
+
+
+def _reserve_ids(model, count):
+    """
+    Returns count fresh primary keys for model, so rows and the rows linked
+    to them can be inserted with executemany instead of one INSERT each.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        result = db.session.execute(
+            text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) "
+                 "FROM generate_series(1, :count)"),
+            {'table': model.__tablename__, 'count': count})
+        return [row[0] for row in result]
+    start = (db.session.query(func.max(model.id)).scalar() or 0) + 1
+    return list(range(start, start + count))
+
+
+class _CatalogImporter(Importer):
+    """
+    Inserts venues or artists together with their genre links.
+    """
+    model = None
+    genre_table = None
+    owner_column = None
+    columns = ()
+
+    def __init__(self):
+        self.genre_ids = {}
+
+    def _genre_ids(self, names):
+        missing = [name for name in names if name not in self.genre_ids]
+        if missing:
+            genres = Genre.resolve(missing)
+            db.session.add_all(genres)
+            db.session.flush()
+            self.genre_ids.update((genre.name, genre.id) for genre in genres)
+        return [self.genre_ids[name] for name in names]
+
+    def accept(self, batch):
+        return batch, []
+
+    def insert(self, batch):
+        batch, rejected = self.accept(batch)
+        if not batch:
+            return rejected
+        ids = _reserve_ids(self.model, len(batch))
+        rows, links = [], []
+        for owner_id, (number, data) in zip(ids, batch):
+            rows.append(dict({column: data.get(column) for column in self.columns}, id=owner_id))
+            links.extend({self.owner_column: owner_id, 'genre_id': genre_id}
+                         for genre_id in self._genre_ids(data['genres']))
+        db.session.execute(self.model.__table__.insert(), rows)
+        db.session.execute(self.genre_table.insert(), links)
+        return rejected
+
+
+class VenueImporter(_CatalogImporter):
+    form_class = VenueForm
+    cache_tags = ('venues',)
+    model = Venue
+    genre_table = venue_genres
+    owner_column = 'venue_id'
+    columns = ('name', 'city', 'state', 'address', 'phone', 'image_link',
+               'facebook_link', 'website', 'seeking_talent', 'seeking_description')
+
+    def accept(self, batch):
+        """
+        Rejects venues already listed under the same name, city and state,
+        like the venue form does, looked up through the unique index.
+        """
+        names = {venue_key(data['name'], data['city'], data['state'])[0] for number, data in batch}
+        listed = {venue_key(*row) for row in db.session.query(
+            Venue.name, Venue.city, Venue.state).filter(normalized(Venue.name).in_(names))}
+        accepted, rejected = [], []
+        for number, data in batch:
+            key = venue_key(data['name'], data['city'], data['state'])
+            if key in listed:
+                rejected.append((number, {'name': [f"Venue {data['name']} already exists"]}))
+            else:
+                listed.add(key)
+                accepted.append((number, data))
+        return accepted, rejected
+
+
+class ArtistImporter(_CatalogImporter):
+    form_class = ArtistForm
+    cache_tags = ('artists',)
+    model = Artist
+    genre_table = artist_genres
+    owner_column = 'artist_id'
+    columns = ('name', 'city', 'state', 'phone', 'image_link',
+               'facebook_link', 'website', 'seeking_venue', 'seeking_description')
+
+
+class ShowImporter(Importer):
+    """
+    Inserts shows, resolving their artist and venue from artist_id/venue_id
+    or, failing those, from artist_name/venue_name. Shows overlapping a
+    booking of their venue or artist are rejected. The rest are loaded with
+    COPY on Postgres and executemany elsewhere, and counted against their
+    venue and artist in the same transaction.
+    """
+    form_class = ShowForm
+    # The listings, and every venue and artist page, like create_show_submission.
+    cache_tags = ('shows', 'venues', 'venue', 'artist')
+
+    def __init__(self):
+        self.known = {Artist: {}, Venue: {}}
+
+    def validate(self, row):
+        data, errors = super().validate(row)
+        if data is not None:
+            data['artist_name'] = str(row.get('artist_name') or '').strip()
+            data['venue_name'] = str(row.get('venue_name') or '').strip()
+        return data, errors
+
+    def _resolve(self, model, batch, id_field, name_field):
+        """
+        Looks up the ids and names the batch refers to that were not seen in
+        an earlier batch, with one query for each.
+        """
+        known = self.known[model]
+        ids, names = set(), set()
+        for number, data in batch:
+            if data[id_field]:
+                if data[id_field].isdigit():
+                    ids.add(int(data[id_field]))
+            elif data[name_field]:
+                names.add(data[name_field])
+        ids = [owner_id for owner_id in ids if owner_id not in known]
+        names = [name for name in names if name not in known]
+        if ids:
+            found = {owner_id for owner_id, in db.session.query(model.id).filter(
+                model.id.in_(ids), not_deleted(model))}
+            known.update((owner_id, [owner_id] if owner_id in found else []) for owner_id in ids)
+        if names:
+            for name in names:
+                known[name] = []
+            for name, owner_id in db.session.query(model.name, model.id).filter(
+                    model.name.in_(names), not_deleted(model)):
+                known[name].append(owner_id)
+
+    def _reference(self, model, data, id_field, name_field):
+        label = model.__name__.lower()
+        value = data[id_field]
+        if value:
+            matches = self.known[model].get(int(value)) if value.isdigit() else None
+            if not matches:
+                return None, f'no {label} with id {value}'
+            return matches[0], None
+        if not data[name_field]:
+            return None, f'{id_field} or {name_field} is required'
+        matches = self.known[model][data[name_field]]
+        if len(matches) != 1:
+            problem = 'no' if not matches else f'{len(matches)}'
+            return None, f'{problem} {label}s named {data[name_field]}, use {id_field}'
+        return matches[0], None
+
+    def insert(self, batch):
+        self._resolve(Artist, batch, 'artist_id', 'artist_name')
+        self._resolve(Venue, batch, 'venue_id', 'venue_name')
+        rows, rejected = [], []
+        for number, data in batch:
+            artist_id, artist_error = self._reference(Artist, data, 'artist_id', 'artist_name')
+            venue_id, venue_error = self._reference(Venue, data, 'venue_id', 'venue_name')
+            if artist_error or venue_error:
+                errors = {}
+                if artist_error:
+                    errors['artist_id'] = [artist_error]
+                if venue_error:
+                    errors['venue_id'] = [venue_error]
+                rejected.append((number, errors))
+                continue
+            rows.append({'artist_id': artist_id, 'venue_id': venue_id,
+                         'start_time': data['start_time'],
+                         'duration': data['duration'] or Show.DEFAULT_DURATION,
+                         'number': number})
+        rows, conflicts = self._without_conflicts(rows)
+        rejected.extend(conflicts)
+        if rows:
+            self._copy(rows)
+            counters.shows_added(rows)
+        return rejected
+
+    @staticmethod
+    def _without_conflicts(rows):
+        """
+        Splits rows into the ones that can be booked and (number, errors) for
+        the ones overlapping a show already listed or an earlier row of the
+        import, found with one schedule sweep over the batch and the shows
+        around it.
+        """
+        if not rows:
+            return rows, []
+        existing = schedule.existing_bookings(
+            {row['venue_id'] for row in rows}, {row['artist_id'] for row in rows},
+            min(row['start_time'] for row in rows),
+            max(schedule.end_of(row['start_time'], row['duration']) for row in rows))
+        clashes = defaultdict(list)
+        for kind, owner_id, first, second in schedule.validate_schedule(existing + rows):
+            clashes[id(first)].append((kind, second))
+            clashes[id(second)].append((kind, first))
+        accepted, rejected, booked = [], [], set()
+        for row in rows:
+            clash = next(((kind, other) for kind, other in clashes[id(row)]
+                          if 'number' not in other or id(other) in booked), None)
+            if clash is None:
+                booked.add(id(row))
+                accepted.append(row)
+                continue
+            kind, other = clash
+            other = f"show {other['id']}" if 'number' not in other else f"record {other['number']}"
+            rejected.append((row['number'], {'start_time': [f'{kind} is already booked by {other}']}))
+        return accepted, rejected
+
+    @staticmethod
+    def _copy(rows):
+        if db.engine.dialect.name != 'postgresql':
+            db.session.execute(Show.__table__.insert(), [
+                {key: value for key, value in row.items() if key != 'number'} for row in rows])
+            return
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        now = datetime.utcnow().isoformat(sep=' ')
+        for row in rows:
+            writer.writerow((row['start_time'].isoformat(sep=' '), row['artist_id'],
+                             row['venue_id'], row['duration'], now, now))
+        buffer.seek(0)
+        cursor = db.session.connection().connection.cursor()
+        cursor.copy_expert(
+            'COPY shows (start_time, artist_id, venue_id, duration, created_at, updated_at) '
+            'FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+#----------------------------------------------------------------------------#
+# Checkpoints.
+#----------------------------------------------------------------------------#
+
+
+def _source_stamp(path):
+    info = os.stat(path)
+    return {'source': os.path.abspath(path), 'size': info.st_size, 'mtime': info.st_mtime}
+
+
+def load_checkpoint(checkpoint_path, path):
+    """
+    Returns the progress saved for path, None if there is none. A checkpoint
+    written for another file, or for this file before it changed, raises a
+    click.ClickException rather than skipping the wrong rows.
+    """
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path) as f:
+        checkpoint = json.load(f)
+    stamp = _source_stamp(path)
+    if any(checkpoint.get(key) != value for key, value in stamp.items()):
+        raise click.ClickException(
+            f'{checkpoint_path} was written for another version of {path}; '
+            'pass --restart to import it from the start.')
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_path, path, progress):
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(dict(_source_stamp(path), **progress), f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+#----------------------------------------------------------------------------#
+# Import loop.
+#----------------------------------------------------------------------------#
+
+
+def run_import(importer, path, batch_size=None, checkpoint_path=None,
+               restart=False, rejects_path=None, echo=click.echo):
+    """
+    Streams path through importer, committing every batch_size valid rows
+    and recording after each commit how many records are done in
+    checkpoint_path (default: path + '.checkpoint'), so an interrupted import
+    resumes after its last committed batch. Rejected rows are appended to
+    rejects_path as JSON lines when given. Returns the throughput report.
+    """
+    batch_size = batch_size or current_app.config.get('IMPORT_BATCH_SIZE', 2000)
+    checkpoint_path = checkpoint_path or path + '.checkpoint'
+    progress = {'rows': 0, 'inserted': 0, 'rejected': 0}
+    if not restart:
+        checkpoint = load_checkpoint(checkpoint_path, path)
+        if checkpoint:
+            progress = {key: checkpoint[key] for key in progress}
+            echo(f"Resuming {path} after record {progress['rows']}.")
+    skip = progress['rows']
+    rejects = open(rejects_path, 'a', encoding='utf-8') if rejects_path else None
+    started = perf_counter()
+    processed = 0
+    batch = []
+
+    def reject(number, errors, row=None):
+        progress['rejected'] += 1
+        if rejects is not None:
+            rejects.write(json.dumps({'record': number, 'errors': errors, 'row': row},
+                                     default=str) + '\n')
+
+    def commit(last_number):
+        try:
+            rejected = importer.insert(batch)
+            db.session.commit()
+        except:
+            db.session.rollback()
+            raise
+        for number, errors in rejected:
+            reject(number, errors)
+        progress['inserted'] += len(batch) - len(rejected)
+        progress['rows'] = last_number
+        save_checkpoint(checkpoint_path, path, progress)
+        echo(f"{progress['rows']} records, {progress['inserted']} inserted, "
+             f"{progress['rejected']} rejected "
+             f"({processed / (perf_counter() - started):.0f} records/s)")
+        batch.clear()
+
+    try:
+        for number, row, error in read_rows(path):
+            if number <= skip:
+                continue
+            processed += 1
+            if error:
+                reject(number, {'record': [error]})
+                continue
+            data, errors = importer.validate(row)
+            if errors:
+                reject(number, errors, row)
+                continue
+            batch.append((number, data))
+            if len(batch) >= batch_size:
+                commit(number)
+        if batch:
+            commit(batch[-1][0])
+    finally:
+        if rejects is not None:
+            rejects.close()
+        db.session.close()
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    # Reaches every worker with the Redis backend; LRU caches are per
+    # process, see the import commands.
+    cache.invalidate(*importer.cache_tags)
+    elapsed = perf_counter() - started
+    return dict(progress, processed=processed, seconds=round(elapsed, 2),
+                records_per_second=round(processed / elapsed, 1) if elapsed else None)
+
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+
+import_cli = AppGroup('import', help='Bulk import venues, artists and shows.')
+
+
+def _import_command(name, importer_class, help):
+    @import_cli.command(name, help=help)
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--batch-size', type=int, help='Rows per INSERT batch and commit.')
+    @click.option('--checkpoint', 'checkpoint_path', type=click.Path(dir_okay=False),
+                  help='Progress file (default: PATH.checkpoint).')
+    @click.option('--restart', is_flag=True, help='Ignore any checkpoint and start over.')
+    @click.option('--rejects', 'rejects_path', type=click.Path(dir_okay=False),
+                  help='Append rejected rows and their errors to this JSONL file.')
+    def command(path, batch_size, checkpoint_path, restart, rejects_path):
+        report = run_import(importer_class(), path, batch_size, checkpoint_path,
+                            restart, rejects_path)
+        click.echo(f"Imported {report['inserted']} {name}, rejected {report['rejected']}, "
+                   f"{report['processed']} records in {report['seconds']}s "
+                   f"({report['records_per_second']} records/s).")
+        if isinstance(cache.backend, LRUBackend):
+            click.echo('CACHE_BACKEND is "lru": running web workers keep serving cached '
+                       'pages for up to CACHE_DEFAULT_TTL seconds, or until restarted.')
+    return command
+
+
+_import_command('venues', VenueImporter,
+                'Import venues from a CSV or JSONL file, validated like the venue form.')
+_import_command('artists', ArtistImporter,
+                'Import artists from a CSV or JSONL file, validated like the artist form.')
+_import_command('shows', ShowImporter,
+                'Import shows from a CSV or JSONL file. Rows name their artist and venue '
+                'by artist_id/venue_id or artist_name/venue_name.')
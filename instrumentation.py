@@ -0,0 +1,107 @@
+import json
+import logging
+from collections import Counter
+from time import perf_counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryStats:
+    """
+    Queries issued while serving one request: how many, how long they took
+    and how often each statement shape (the SQL with bound parameters left
+    as placeholders) was repeated.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement] += 1
+
+    def repeated(self, threshold):
+        """
+        Returns (statement, count) pairs run at least threshold times, the
+        usual sign of a query issued once per row (N+1).
+        """
+        return [(statement, count) for statement, count in self.shapes.most_common()
+                if count >= threshold]
+
+
+class QueryInspector:
+    """
+    Counts the SQL queries and database time of every request through
+    SQLAlchemy engine events and flags N+1 patterns. In debug mode the
+    results are sent back as X-Query-* and Server-Timing response headers;
+    otherwise one JSON line per request goes to the 'fyyur.queries' logger,
+    at WARNING level when an N+1 pattern was seen.
+
+    Configured through QUERY_INSPECTOR_ENABLED and N_PLUS_ONE_THRESHOLD.
+    """
+
+    def __init__(self, app=None):
+        self.logger = logging.getLogger('fyyur.queries')
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get('QUERY_INSPECTOR_ENABLED', True):
+            return
+        self.threshold = app.config.get('N_PLUS_ONE_THRESHOLD', 5)
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        app.before_request(self._start)
+        app.after_request(self._report)
+        app.extensions['query_inspector'] = self
+
+    @staticmethod
+    def _start():
+        g.query_stats = QueryStats()
+
+    def _report(self, response):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+        repeated = stats.repeated(self.threshold)
+        duration_ms = round(stats.duration * 1000, 2)
+        if current_app.debug:
+            response.headers['X-Query-Count'] = str(stats.count)
+            response.headers['X-Query-Time-Ms'] = str(duration_ms)
+            response.headers['Server-Timing'] = f'db;dur={duration_ms};desc="{stats.count} queries"'
+            if repeated:
+                response.headers['X-N-Plus-One'] = '; '.join(
+                    f'{count}x {" ".join(statement.split())[:120]}'
+                    for statement, count in repeated)
+        else:
+            record = {
+                'endpoint': request.endpoint,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': stats.count,
+                'db_ms': duration_ms,
+                'n_plus_one': [{'statement': " ".join(statement.split()), 'count': count}
+                               for statement, count in repeated]
+            }
+            level = logging.WARNING if repeated else logging.INFO
+            self.logger.log(level, json.dumps(record))
+        return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_start_time'] = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('query_start_time', None)
+    if started is not None and has_request_context():
+        stats = g.get('query_stats')
+        if stats is not None:
+            stats.record(statement, perf_counter() - started)
@@ -0,0 +1,346 @@
+import json
+import logging
+import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from importlib import import_module
+from os import getpid
+from socket import gethostname
+from sys import exc_info
+from threading import Event, Lock, Thread
+from traceback import format_exception
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import case, event
+from sqlalchemy.orm import Session
+
+from models import db, Job
+
+
+#----------------------------------------------------------------------------#
+# Background jobs.
+#
+# Work a request doesn't have to wait for is queued as a row of the jobs
+# table, in the request's own transaction, and run after the commit by a
+# JobRunner: a thread pool in the web process itself (JOBS_IN_PROCESS) or
+# in `flask jobs worker`, plus an optional process pool for CPU-heavy
+# tasks. Queued jobs survive restarts; failed ones are retried with
+# exponential backoff up to max_attempts times.
+#----------------------------------------------------------------------------#
+
+
+Task = namedtuple('Task', 'function cpu max_attempts')
+
+TASKS = {}
+
+# Modules defining tasks. They are imported when a job is first queued or
+# run, rather than with the app, so short-lived commands skip them.
+TASK_MODULES = ('purge',)
+
+
+def task(name=None, cpu=False, max_attempts=None):
+    """
+    @param: name, cpu, max_attempts
+    Registers the decorated function as a task, under name or its module and
+    function name. Jobs call it with their payload as keyword arguments,
+    inside an app context. cpu=True tasks run in the process pool, when
+    JOB_PROCESSES is set, without an app context, so they must not use the
+    database.
+    """
+    def register(function):
+        TASKS[name or f'{function.__module__}.{function.__name__}'] = Task(
+            function, cpu, max_attempts)
+        return function
+    return register
+
+
+def _load_tasks():
+    for module in TASK_MODULES:
+        import_module(module)
+
+
+def enqueue(name, delay=0, max_attempts=None, **payload):
+    """
+    @param: name, delay, max_attempts, payload
+    Queues a run of task name with the JSON serializable payload, delay
+    seconds from now. The job is added to the caller's session, so it is
+    only queued if the caller commits. Returns the Job.
+    """
+    if name not in TASKS:
+        _load_tasks()
+    if name not in TASKS:
+        raise KeyError(f'Unknown task {name}')
+    job = Job(
+        name=name,
+        payload=json.dumps(payload),
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+        max_attempts=max_attempts or TASKS[name].max_attempts
+        or current_app.config.get('JOB_MAX_ATTEMPTS', 5))
+    db.session.add(job)
+    db.session.info['jobs_queued'] = current_app.extensions.get('jobs')
+    return job
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_runner(session):
+    runner = session.info.pop('jobs_queued', None)
+    if runner is not None:
+        runner.wake()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_queued(session):
+    session.info.pop('jobs_queued', None)
+
+
+def _call(name, payload):
+    # Runs in a pool process, forked from the runner's with TASKS filled in.
+    return TASKS[name].function(**payload)
+
+
+class JobRunner:
+    """
+    Claims due jobs and runs them on JOB_THREADS threads. A dispatcher
+    thread polls every JOB_POLL_INTERVAL seconds, or as soon as a job queued
+    in this process is committed. Claims use SELECT ... FOR UPDATE SKIP
+    LOCKED on Postgres, so several runners can share the table.
+
+    In the web process the runner starts with the first job queued there,
+    unless JOBS_IN_PROCESS is off; `flask jobs worker` runs one in the
+    foreground.
+    """
+
+    def __init__(self, app=None):
+        self.logger = logging.getLogger('fyyur.jobs')
+        self.worker_id = f'{gethostname()}:{getpid()}'
+        self.running = 0
+        self.started = False
+        self._lock = Lock()
+        self._wake = Event()
+        self._stop = Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.in_process = app.config.get('JOBS_IN_PROCESS', True)
+        self.threads = app.config.get('JOB_THREADS', 4)
+        self.processes = app.config.get('JOB_PROCESSES', 0)
+        self.poll_interval = app.config.get('JOB_POLL_INTERVAL', 5)
+        self.retry_delay = app.config.get('JOB_RETRY_DELAY', 10)
+        self.retry_max = app.config.get('JOB_RETRY_MAX', 3600)
+        self.lock_timeout = app.config.get('JOB_LOCK_TIMEOUT', 600)
+        self.retention = app.config.get('JOB_RETENTION', 86400)
+        app.extensions['jobs'] = self
+
+    def start(self):
+        with self._lock:
+            if self.started:
+                return
+            self.started = True
+        # Before the process pool forks, so its processes have them too.
+        _load_tasks()
+        self._threads = ThreadPoolExecutor(self.threads, thread_name_prefix='job')
+        self._processes = ProcessPoolExecutor(self.processes) if self.processes else None
+        self._dispatcher = Thread(target=self._dispatch, name='job-dispatcher', daemon=True)
+        self._dispatcher.start()
+
+    def wake(self):
+        if not self.started and self.in_process:
+            self.start()
+        self._wake.set()
+
+    def stop(self):
+        """
+        Stops claiming jobs and waits for the running ones to finish.
+        """
+        self._stop.set()
+        self._wake.set()
+        if self.started:
+            self._dispatcher.join()
+            self._threads.shutdown(wait=True)
+            if self._processes is not None:
+                self._processes.shutdown(wait=True)
+
+    def run(self):
+        """
+        Runs jobs in the foreground until interrupted.
+        """
+        self.start()
+        try:
+            while not self._stop.wait(1):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def backoff(self, attempts):
+        """
+        Seconds to wait before retrying a job that failed attempts times:
+        doubling from JOB_RETRY_DELAY up to JOB_RETRY_MAX, jittered so jobs
+        that failed together don't all retry together.
+        """
+        delay = min(self.retry_max, self.retry_delay * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1)
+
+    def _dispatch(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            with self.app.app_context():
+                try:
+                    self._housekeeping()
+                    with self._lock:
+                        free = self.threads - self.running
+                    for job in self._claim(free):
+                        with self._lock:
+                            self.running += 1
+                        self._threads.submit(self._execute, *job)
+                except Exception:
+                    db.session.rollback()
+                    self.logger.exception('Claiming jobs failed')
+                finally:
+                    db.session.remove()
+            self._wake.wait(self.poll_interval)
+
+    def _housekeeping(self):
+        """
+        Requeues the jobs of runners that went away mid-job, or fails them
+        if they used up their attempts, and drops old finished jobs.
+        """
+        now = datetime.utcnow()
+        Job.query.filter(
+            Job.status == 'running',
+            Job.locked_at < now - timedelta(seconds=self.lock_timeout)
+        ).update({
+            Job.status: case([(Job.attempts >= Job.max_attempts, 'failed')], else_='queued'),
+            Job.last_error: 'Timed out',
+            Job.locked_at: None,
+            Job.locked_by: None
+        }, synchronize_session=False)
+        Job.query.filter(
+            Job.status.in_(['done', 'failed']),
+            Job.updated_at < now - timedelta(seconds=self.retention)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+
+    def _claim(self, limit):
+        """
+        Marks up to limit due jobs as running in this runner and returns
+        them as (id, name, payload) tuples.
+        """
+        if limit <= 0:
+            return []
+        now = datetime.utcnow()
+        due = db.session.query(Job.id, Job.name, Job.payload).filter(
+            Job.status == 'queued', Job.run_at <= now
+        ).order_by(Job.run_at, Job.id).limit(limit).with_for_update(skip_locked=True).all()
+        claimed = []
+        for job_id, name, payload in due:
+            # The status check keeps two runners on SQLite, which has no
+            # row locks, from claiming the same job.
+            if Job.query.filter(Job.id == job_id, Job.status == 'queued').update({
+                Job.status: 'running',
+                Job.attempts: Job.attempts + 1,
+                Job.locked_at: now,
+                Job.locked_by: self.worker_id
+            }, synchronize_session=False):
+                claimed.append((job_id, name, json.loads(payload)))
+        db.session.commit()
+        return claimed
+
+    def _execute(self, job_id, name, payload):
+        with self.app.app_context():
+            try:
+                task = TASKS[name]
+                if task.cpu and self._processes is not None:
+                    self._processes.submit(_call, name, payload).result()
+                else:
+                    task.function(**payload)
+                    db.session.commit()
+            except Exception:
+                db.session.rollback()
+                error = ''.join(format_exception(*exc_info()))
+                self.logger.warning(f'Job {job_id} ({name}) failed:\n{error}')
+                self._finish(job_id, error)
+            else:
+                self._finish(job_id)
+            finally:
+                db.session.remove()
+                with self._lock:
+                    self.running -= 1
+                self._wake.set()
+
+    def _finish(self, job_id, error=None):
+        try:
+            job = Job.query.get(job_id)
+            if job is None or job.locked_by != self.worker_id:
+                # Timed out and handed to another runner meanwhile.
+                return
+            if error is None:
+                job.status = 'done'
+            elif job.attempts >= job.max_attempts:
+                job.status = 'failed'
+            else:
+                job.status = 'queued'
+                job.run_at = datetime.utcnow() + timedelta(seconds=self.backoff(job.attempts))
+            job.last_error = error
+            job.locked_at = job.locked_by = None
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            self.logger.exception(f'Recording the outcome of job {job_id} failed')
+
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+
+jobs_cli = AppGroup('jobs', help='Run and inspect background jobs.')
+
+
+@jobs_cli.command('worker')
+@click.option('--threads', type=int, default=None, help='Jobs run at once (default JOB_THREADS).')
+@click.option('--processes', type=int, default=None,
+              help='Processes for CPU-heavy tasks (default JOB_PROCESSES).')
+def worker_command(threads, processes):
+    """Run queued jobs until interrupted."""
+    runner = current_app.extensions['jobs']
+    if threads:
+        runner.threads = threads
+    if processes is not None:
+        runner.processes = processes
+    click.echo(f'Running jobs on {runner.threads} threads and {runner.processes} processes.')
+    runner.run()
+
+
+@jobs_cli.command('list')
+@click.option('--status', type=click.Choice(['queued', 'running', 'done', 'failed']), default=None)
+@click.option('--limit', type=int, default=50, help='Jobs to list (default 50).')
+def list_command(status, limit):
+    """List the latest jobs."""
+    query = Job.query
+    if status:
+        query = query.filter(Job.status == status)
+    for job in query.order_by(Job.id.desc()).limit(limit):
+        error = (job.last_error or '').strip().splitlines()[-1:]
+        click.echo(f"#{job.id} {job.name} {job.status}, attempt {job.attempts}/{job.max_attempts}, "
+                   f"run at {job.run_at:%Y-%m-%d %H:%M:%S}" + (f': {error[0]}' if error else ''))
+
+
+@jobs_cli.command('retry')
+@click.argument('job_id', type=int)
+def retry_command(job_id):
+    """Queue a failed job again, with a fresh set of attempts."""
+    job = Job.query.get(job_id)
+    if job is None or job.status != 'failed':
+        raise click.ClickException(f'No failed job #{job_id}.')
+    job.status = 'queued'
+    job.attempts = 0
+    job.run_at = datetime.utcnow()
+    db.session.commit()
+    click.echo(f'Job #{job_id} queued.')
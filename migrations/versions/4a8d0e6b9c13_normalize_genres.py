@@ -0,0 +1,135 @@
+"""normalize genres
+
+Revision ID: 4a8d0e6b9c13
+Revises: e91a4c7f3b52
+Create Date: 2021-03-10 20:13:09.285544
+
+"""
+import csv
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a8d0e6b9c13'
+down_revision = 'e91a4c7f3b52'
+branch_labels = None
+depends_on = None
+
+
+BATCH_SIZE = 1000
+
+genres = sa.table('genres', sa.column('id', sa.Integer), sa.column('name', sa.String))
+
+
+def parse_genres(value):
+    """
+    Parses the stringified Postgres array ({Jazz,"Rock n Roll"}) the genres
+    columns used to hold, honouring quoted names containing commas.
+    """
+    if not value or len(value) < 2:
+        return []
+    reader = csv.reader([value[1:-1]], escapechar='\\', doublequote=False)
+    return [name.strip() for name in next(reader, []) if name.strip()]
+
+
+def format_genres(names):
+    return '{' + ','.join('"{}"'.format(name.replace('\\', '\\\\').replace('"', '\\"'))
+                          for name in names) + '}'
+
+
+def genre_ids(bind, names, known):
+    """
+    Maps names to genre ids, inserting genres not seen yet. known caches ids.
+    """
+    missing = sorted(set(names) - set(known))
+    if missing:
+        bind.execute(genres.insert(), [{'name': name} for name in missing])
+        known.update((name, genre_id) for name, genre_id in bind.execute(
+            sa.select([genres.c.name, genres.c.id]).where(genres.c.name.in_(missing))))
+    return [known[name] for name in names]
+
+
+def copy_to_association(bind, table, owner_column, association, known):
+    """
+    Moves the genres of table into association, BATCH_SIZE rows at a time.
+    """
+    source = sa.table(table, sa.column('id', sa.Integer), sa.column('genres', sa.String))
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.select([source.c.id, source.c.genres]).where(
+            source.c.id > last_id).order_by(source.c.id).limit(BATCH_SIZE)).fetchall()
+        if not rows:
+            break
+        links = []
+        for owner_id, value in rows:
+            names = list(dict.fromkeys(parse_genres(value)))
+            links.extend({owner_column: owner_id, 'genre_id': genre_id}
+                         for genre_id in genre_ids(bind, names, known))
+        if links:
+            bind.execute(association.insert(), links)
+        last_id = rows[-1][0]
+
+
+def copy_from_association(bind, table, owner_column, association):
+    source = sa.table(table, sa.column('id', sa.Integer), sa.column('genres', sa.String))
+    rows = bind.execute(sa.select([association.c[owner_column], genres.c.name]).select_from(
+        association.join(genres, genres.c.id == association.c.genre_id)).order_by(
+        association.c[owner_column], genres.c.name)).fetchall()
+    names = {}
+    for owner_id, name in rows:
+        names.setdefault(owner_id, []).append(name)
+    for owner_id, owner_names in names.items():
+        bind.execute(source.update().where(source.c.id == owner_id).values(
+            genres=format_genres(owner_names)))
+
+
+def upgrade():
+    op.create_table('genres',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    venue_genres = op.create_table('venue_genres',
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['genre_id'], ['genres.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['venues.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('venue_id', 'genre_id')
+    )
+    op.create_index('ix_venue_genres_genre_id', 'venue_genres', ['genre_id', 'venue_id'], unique=False)
+    artist_genres = op.create_table('artist_genres',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['artists.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['genre_id'], ['genres.id'], ),
+    sa.PrimaryKeyConstraint('artist_id', 'genre_id')
+    )
+    op.create_index('ix_artist_genres_genre_id', 'artist_genres', ['genre_id', 'artist_id'], unique=False)
+
+    bind = op.get_bind()
+    known = {}
+    copy_to_association(bind, 'venues', 'venue_id', venue_genres, known)
+    copy_to_association(bind, 'artists', 'artist_id', artist_genres, known)
+
+    op.drop_column('venues', 'genres')
+    op.drop_column('artists', 'genres')
+
+
+def downgrade():
+    op.add_column('artists', sa.Column('genres', sa.VARCHAR(length=120), nullable=True))
+    op.add_column('venues', sa.Column('genres', sa.VARCHAR(), nullable=True))
+
+    bind = op.get_bind()
+    venue_genres = sa.table('venue_genres', sa.column('venue_id'), sa.column('genre_id'))
+    artist_genres = sa.table('artist_genres', sa.column('artist_id'), sa.column('genre_id'))
+    copy_from_association(bind, 'venues', 'venue_id', venue_genres)
+    copy_from_association(bind, 'artists', 'artist_id', artist_genres)
+
+    op.drop_index('ix_artist_genres_genre_id', table_name='artist_genres')
+    op.drop_table('artist_genres')
+    op.drop_index('ix_venue_genres_genre_id', table_name='venue_genres')
+    op.drop_table('venue_genres')
+    op.drop_table('genres')
@@ -0,0 +1,54 @@
+"""add show counters
+
+Revision ID: 7d2e5b8c1f40
+Revises: c3f1a9d2e4b7
+Create Date: 2021-03-05 11:20:47.918204
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2e5b8c1f40'
+down_revision = 'c3f1a9d2e4b7'
+branch_labels = None
+depends_on = None
+
+
+COUNT_SHOWS = (
+    'UPDATE {table} SET '
+    'upcoming_shows_count = (SELECT count(*) FROM shows '
+    'WHERE shows.{column} = {table}.id AND shows.start_time > :now), '
+    'past_shows_count = (SELECT count(*) FROM shows '
+    'WHERE shows.{column} = {table}.id AND shows.start_time <= :now)'
+)
+
+
+def upgrade():
+    for table in ('venues', 'artists'):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(),
+                                       server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(),
+                                       server_default='0', nullable=False))
+    watermarks = op.create_table('counter_watermarks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('rolled_over_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # Backfill the counters as of now and start rolling over from there.
+    now = datetime.now()
+    for table, column in (('venues', 'venue_id'), ('artists', 'artist_id')):
+        op.get_bind().execute(
+            sa.text(COUNT_SHOWS.format(table=table, column=column)), now=now)
+    op.bulk_insert(watermarks, [{'id': 1, 'rolled_over_at': now}])
+
+
+def downgrade():
+    op.drop_table('counter_watermarks')
+    for table in ('artists', 'venues'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
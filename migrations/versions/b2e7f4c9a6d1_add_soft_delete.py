@@ -0,0 +1,49 @@
+"""add soft delete
+
+Revision ID: b2e7f4c9a6d1
+Revises: c8d2f6a4b1e3
+Create Date: 2021-03-23 09:41:17.204853
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2e7f4c9a6d1'
+down_revision = 'c8d2f6a4b1e3'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('venues', 'artists')
+
+
+def upgrade():
+    # Nullable without a default, so adding the column doesn't rewrite the tables.
+    for table in TABLES:
+        op.add_column(table, sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    for table in TABLES:
+        name = f'ix_{table}_deleted_at'
+        where = sa.text('deleted_at IS NOT NULL')
+        if op.get_bind().dialect.name == 'postgresql':
+            with op.get_context().autocommit_block():
+                op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+                op.create_index(name, table, ['deleted_at'], postgresql_where=where,
+                                postgresql_concurrently=True)
+        else:
+            op.create_index(name, table, ['deleted_at'], sqlite_where=where)
+
+
+def downgrade():
+    for table in TABLES:
+        pending = op.get_bind().execute(sa.text(
+            f'SELECT count(*) FROM {table} WHERE deleted_at IS NOT NULL')).scalar()
+        if pending:
+            raise RuntimeError(
+                f'{pending} deleted {table} have not been purged yet and would be '
+                'listed again. Run `flask purge run`, then the downgrade again.')
+    for table in reversed(TABLES):
+        op.drop_index(f'ix_{table}_deleted_at', table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('deleted_at')
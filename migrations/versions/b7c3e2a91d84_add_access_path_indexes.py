@@ -0,0 +1,56 @@
+"""add access path indexes
+
+Revision ID: b7c3e2a91d84
+Revises: 4a8d0e6b9c13
+Create Date: 2021-03-14 09:47:55.130672
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c3e2a91d84'
+down_revision = '4a8d0e6b9c13'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    # Detail pages and counters filter shows by venue/artist and start_time.
+    ('ix_shows_venue_id_start_time', 'shows', ['venue_id', 'start_time']),
+    ('ix_shows_artist_id_start_time', 'shows', ['artist_id', 'start_time']),
+    # Keyset pagination and the rollover window scan of /shows.
+    ('ix_shows_start_time_id', 'shows', ['start_time', 'id']),
+    # /venues groups and pages on (city, state, name, id).
+    ('ix_venues_city_state', 'venues', ['city', 'state', 'name', 'id']),
+    ('ix_artists_city_state', 'artists', ['city', 'state']),
+    # Keyset pagination of /artists.
+    ('ix_artists_name_id', 'artists', ['name', 'id']),
+    ('ix_venues_lower_name', 'venues', [sa.text('lower(name)')]),
+    ('ix_artists_lower_name', 'artists', [sa.text('lower(name)')]),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY does not block writes but can't run inside a
+    # transaction, so on Postgres the indexes are built in autocommit mode.
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                # A failed concurrent build leaves an invalid index behind.
+                op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+                op.create_index(name, table, columns, postgresql_concurrently=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, columns in reversed(INDEXES):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,36 @@
+"""add trigram search indexes
+
+Revision ID: c3f1a9d2e4b7
+Revises: 26d1a55b64d7
+Create Date: 2021-03-02 18:41:12.503117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f1a9d2e4b7'
+down_revision = '26d1a55b64d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pg_trgm is Postgres only, other backends search through the in-process index.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_venues_name_trgm', 'venues', ['name'],
+                    postgresql_using='gin',
+                    postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_artists_name_trgm', 'artists', ['name'],
+                    postgresql_using='gin',
+                    postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_artists_name_trgm', table_name='artists')
+    op.drop_index('ix_venues_name_trgm', table_name='venues')
@@ -0,0 +1,48 @@
+"""add unique venue index
+
+Revision ID: c8d2f6a4b1e3
+Revises: f9b1d4a8c6e2
+Create Date: 2021-03-21 10:12:08.551730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8d2f6a4b1e3'
+down_revision = 'f9b1d4a8c6e2'
+branch_labels = None
+depends_on = None
+
+
+NAME = 'uq_venues_name_city_state'
+COLUMNS = [sa.text('lower(trim(name))'), sa.text('lower(trim(city))'), 'state']
+
+
+def upgrade():
+    duplicates = op.get_bind().execute(sa.text("""
+        SELECT count(*) FROM (
+            SELECT 1 FROM venues
+            GROUP BY lower(trim(name)), lower(trim(city)), state
+            HAVING count(*) > 1) AS listed_twice""")).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f'{duplicates} venues are listed more than once in the same city. '
+            'List them with `flask venues duplicates --exact`, merge or rename '
+            'them, then run the upgrade again.')
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            # A failed concurrent build leaves an invalid index behind.
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {NAME}')
+            op.create_index(NAME, 'venues', COLUMNS, unique=True, postgresql_concurrently=True)
+    else:
+        op.create_index(NAME, 'venues', COLUMNS, unique=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index(NAME, table_name='venues', postgresql_concurrently=True)
+    else:
+        op.drop_index(NAME, table_name='venues')
@@ -0,0 +1,42 @@
+"""add timestamps
+
+Revision ID: d5f8a2c7e1b9
+Revises: b7c3e2a91d84
+Create Date: 2021-03-16 11:20:42.318406
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f8a2c7e1b9'
+down_revision = 'b7c3e2a91d84'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('venues', 'artists', 'shows')
+
+
+def upgrade():
+    # Added nullable, backfilled with the migration time (existing rows have
+    # no history to go by), then made NOT NULL.
+    now = datetime.utcnow()
+    for table in TABLES:
+        op.add_column(table, sa.Column('created_at', sa.DateTime(), nullable=True))
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.get_bind().execute(
+            sa.text(f'UPDATE {table} SET created_at = :now, updated_at = :now'), now=now)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('updated_at')
+            batch_op.drop_column('created_at')
@@ -0,0 +1,57 @@
+"""add show booking constraints
+
+Revision ID: f9b1d4a8c6e2
+Revises: a3e6c9f1d27b
+Create Date: 2021-03-18 16:31:47.260584
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f9b1d4a8c6e2'
+down_revision = 'a3e6c9f1d27b'
+branch_labels = None
+depends_on = None
+
+
+# start_time is a timestamp without time zone, so the booked period is a
+# tsrange (timestamp + interval is immutable, as index expressions must be).
+PERIOD = "tsrange(start_time, start_time + duration * interval '1 minute')"
+CONSTRAINTS = [
+    ('shows_venue_no_overlap', 'venue_id'),
+    ('shows_artist_no_overlap', 'artist_id'),
+]
+
+
+def upgrade():
+    # Exclusion constraints are Postgres only; other backends rely on the
+    # checks in schedule.py.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for name, column in CONSTRAINTS:
+        # A show overlaps an earlier one when it starts before the latest
+        # end among the shows of the same owner that started before it.
+        overlaps = op.get_bind().execute(sa.text(f"""
+            SELECT count(*) FROM (
+                SELECT start_time, max(start_time + duration * interval '1 minute') OVER (
+                    PARTITION BY {column} ORDER BY start_time, id
+                    ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING) AS booked_until
+                FROM shows) AS bookings
+            WHERE booked_until > start_time""")).scalar()
+        if overlaps:
+            raise RuntimeError(
+                f'{overlaps} shows overlap another show with the same {column}. '
+                'List them with `flask schedule validate`, move or delete them, '
+                'then run the upgrade again.')
+        op.execute(f'ALTER TABLE shows ADD CONSTRAINT {name} '
+                   f'EXCLUDE USING gist ({column} WITH =, {PERIOD} WITH &&)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, column in reversed(CONSTRAINTS):
+        op.drop_constraint(name, 'shows')
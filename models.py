@@ -1,17 +1,13 @@
-from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from flask_moment import Moment
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import event, inspect
+from sqlalchemy.orm.attributes import flag_modified
 #----------------------------------------------------------------------------#
-# App Config.
+# Database.
 #----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object('config')
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+# Bound to the app by create_app (see app.py).
+db = SQLAlchemy()
 
 
 #----------------------------------------------------------------------------#
@@ -19,44 +15,185 @@ migrate = Migrate(app, db)
 #----------------------------------------------------------------------------#
 
 
-class Venue(db.Model):
+class Genre(db.Model):
+    __tablename__ = 'genres'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    @classmethod
+    def resolve(cls, names):
+        """
+        @param: names
+        Returns the Genre rows for names, creating the ones that don't exist yet.
+        """
+        names = list(dict.fromkeys(name.strip() for name in names or [] if name.strip()))
+        if not names:
+            return []
+        existing = {genre.name: genre for genre in cls.query.filter(cls.name.in_(names))}
+        return [existing.get(name) or cls(name=name) for name in names]
+
+    def __repr__(self):
+        return f'<Genre no. {self.id} name: {self.name}>'
+
+
+venue_genres = db.Table(
+    'venue_genres',
+    db.Column('venue_id', db.Integer, db.ForeignKey(
+        'venues.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey(
+        'genres.id'), primary_key=True),
+    db.Index('ix_venue_genres_genre_id', 'genre_id', 'venue_id')
+)
+
+
+artist_genres = db.Table(
+    'artist_genres',
+    db.Column('artist_id', db.Integer, db.ForeignKey(
+        'artists.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey(
+        'genres.id'), primary_key=True),
+    db.Index('ix_artist_genres_genre_id', 'genre_id', 'artist_id')
+)
+
+
+class SoftDeletable:
+    """
+    Deleting a venue or an artist only sets deleted_at. Every read filters
+    such rows out (see not_deleted) and purge.py hard deletes them, with
+    their shows, in the background.
+    """
+    deleted_at = db.Column(db.DateTime)
+
+    @classmethod
+    def get_listed(cls, owner_id):
+        """
+        @param: owner_id
+        Returns the row with owner_id unless it doesn't exist or was deleted.
+        """
+        return cls.query.filter(cls.id == owner_id, not_deleted(cls)).first()
+
+    def soft_delete(self):
+        # An ORM update, so version and updated_at move and cached pages
+        # listing this row revalidate.
+        self.deleted_at = datetime.utcnow()
+
+
+class Venue(SoftDeletable, db.Model):
     __tablename__ = 'venues'
+    __table_args__ = (
+        db.Index('ix_venues_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_venues_city_state', 'city', 'state', 'name', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(120), nullable=False)
-    genres = db.Column(db.String)
+    genres = db.relationship('Genre', secondary=venue_genres,
+                             order_by='Genre.name', lazy=True)
     phone = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     website = db.Column(db.String(120))
     seeking_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String)
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
     shows = db.relationship('Show', backref='venue',
                             lazy=True, cascade='all,delete')
+    # Bumped by the ORM on every update, used to key cached fragments.
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+    # UTC. Counter updates leave updated_at alone, it tracks edits only (and
+    # the deletion of a venue or artist sharing shows, see counters.py).
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow)
+
+    __mapper_args__ = {'version_id_col': version}
+
+    @property
+    def genre_names(self):
+        return [genre.name for genre in self.genres]
+
+    @classmethod
+    def insert_unless_listed(cls, genres=(), **values):
+        """
+        @param: genres, values
+        Inserts a venue with the given column values and genre names unless
+        a venue with the same name, city and state (see venue_key) is
+        already listed. The unique index decides, in the INSERT itself
+        (ON CONFLICT DO NOTHING / INSERT OR IGNORE), so concurrent requests
+        cannot both list the same venue. Returns the new venue's id, or None
+        if it was already listed.
+        """
+        table = cls.__table__
+        if db.engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+            statement = insert(table).values(**values).on_conflict_do_nothing(
+                index_elements=[normalized(table.c.name), normalized(table.c.city),
+                                table.c.state]).returning(table.c.id)
+            venue_id = db.session.execute(statement).scalar()
+        else:
+            result = db.session.execute(table.insert().prefix_with('OR IGNORE').values(**values))
+            venue_id = result.lastrowid if result.rowcount else None
+        if venue_id is not None:
+            genres = Genre.resolve(genres)
+            db.session.add_all(genres)
+            db.session.flush()
+            if genres:
+                db.session.execute(venue_genres.insert(), [
+                    {'venue_id': venue_id, 'genre_id': genre.id} for genre in genres])
+        return venue_id
 
     def __repr__(self):
         return f'<Venue no. {self.id} name: {self.name}>'
     
 
-class Artist(db.Model):
+class Artist(SoftDeletable, db.Model):
     __tablename__ = 'artists'
+    __table_args__ = (
+        db.Index('ix_artists_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_artists_city_state', 'city', 'state'),
+        db.Index('ix_artists_name_id', 'name', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120), nullable=False)
+    genres = db.relationship('Genre', secondary=artist_genres,
+                             order_by='Genre.name', lazy=True)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     website = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String)
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
     shows = db.relationship('Show', backref='artist',
                             lazy=True, cascade='all,delete')
+    # Bumped by the ORM on every update, used to key cached fragments.
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+    # UTC. Counter updates leave updated_at alone, it tracks edits only (and
+    # the deletion of a venue or artist sharing shows, see counters.py).
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow)
+
+    __mapper_args__ = {'version_id_col': version}
+
+    @property
+    def genre_names(self):
+        return [genre.name for genre in self.genres]
 
     def __repr__(self):
         return f'<Artist no. {self.id} name: {self.name}>'
@@ -64,6 +201,16 @@ class Artist(db.Model):
 
 class Show(db.Model):
     __tablename__ = 'shows'
+    # Minutes. On Postgres, exclusion constraints (see the add show booking
+    # constraints migration) keep the shows of a venue or of an artist from
+    # overlapping.
+    DEFAULT_DURATION = 120
+    MAX_DURATION = 720
+    __table_args__ = (
+        db.Index('ix_shows_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_shows_start_time_id', 'start_time', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     start_time = db.Column(db.DateTime, nullable=False,
@@ -72,6 +219,110 @@ class Show(db.Model):
         'artists.id'), nullable=False)
     venue_id = db.Column(db.Integer, db.ForeignKey(
         'venues.id'), nullable=False)
+    duration = db.Column(db.Integer, nullable=False, default=DEFAULT_DURATION,
+                         server_default=str(DEFAULT_DURATION))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow)
+
+    @property
+    def end_time(self):
+        return self.start_time + timedelta(minutes=self.duration)
 
     def __repr__(self):
         return f'<Show no. {self.id}, Artist {self.artist_id}, Venue {self.venue_id}>'
+
+
+def _genres_changed(target, value, initiator):
+    """
+    Genre links live in another table, so changing them alone would not
+    bump the owner's version; marking a column modified makes the flush
+    issue the UPDATE that does.
+    """
+    if inspect(target).has_identity:
+        flag_modified(target, 'name')
+
+
+for genres in (Venue.genres, Artist.genres):
+    event.listen(genres, 'append', _genres_changed)
+    event.listen(genres, 'remove', _genres_changed)
+
+
+def normalized(column):
+    return db.func.lower(db.func.trim(column))
+
+
+def venue_key(name, city, state):
+    """
+    The Python side of uq_venues_name_city_state: venues are the same when
+    their trimmed, lower cased names and cities and their states match.
+    """
+    return ((name or '').strip(' ').lower(), (city or '').strip(' ').lower(), state)
+
+
+db.Index('uq_venues_name_city_state', normalized(Venue.name), normalized(Venue.city),
+         Venue.state, unique=True)
+db.Index('ix_venues_lower_name', db.func.lower(Venue.name))
+db.Index('ix_artists_lower_name', db.func.lower(Artist.name))
+
+
+def not_deleted(*models):
+    """
+    @param: models
+    The condition every read of venues and artists (or of shows joined to
+    them) filters on: none of the given models' rows is soft deleted.
+    """
+    return db.and_(*(model.deleted_at.is_(None) for model in models))
+
+
+# Partial, so only the rows waiting for the purge are indexed.
+db.Index('ix_venues_deleted_at', Venue.deleted_at,
+         postgresql_where=Venue.deleted_at.isnot(None),
+         sqlite_where=Venue.deleted_at.isnot(None))
+db.Index('ix_artists_deleted_at', Artist.deleted_at,
+         postgresql_where=Artist.deleted_at.isnot(None),
+         sqlite_where=Artist.deleted_at.isnot(None))
+
+
+class CounterWatermark(db.Model):
+    """
+    Single row table holding the time up to which shows have been rolled over
+    from the upcoming to the past counters of venues and artists.
+    """
+    __tablename__ = 'counter_watermarks'
+
+    id = db.Column(db.Integer, primary_key=True)
+    rolled_over_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<CounterWatermark rolled over at {self.rolled_over_at}>'
+
+
+class Job(db.Model):
+    """
+    A deferred call of a task registered with jobs.task, run by a JobRunner.
+    Times are UTC.
+    """
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    # JSON object of the task's keyword arguments.
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    # queued, running, done or failed.
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    locked_by = db.Column(db.String(120))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Job no. {self.id} {self.name} {self.status}>'
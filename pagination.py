@@ -0,0 +1,121 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from flask import abort, current_app, request, url_for
+from sqlalchemy import tuple_
+
+
+#----------------------------------------------------------------------------#
+# Cursors.
+#----------------------------------------------------------------------------#
+
+
+def encode_cursor(values):
+    """
+    @param: values
+    Encodes the sort key of a row into an opaque, URL safe cursor.
+    """
+    payload = [['dt', value.isoformat()] if isinstance(value, datetime) else value
+               for value in values]
+    return urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    @param: cursor
+    Decodes a cursor made by encode_cursor. Tampered cursors abort with a 400.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(urlsafe_b64decode(padded.encode()))
+        if not isinstance(payload, list):
+            abort(400)
+        return [datetime.fromisoformat(value[1]) if isinstance(value, list) else value
+                for value in payload]
+    except (ValueError, TypeError, IndexError):
+        abort(400)
+
+
+#----------------------------------------------------------------------------#
+# Keyset pagination.
+#----------------------------------------------------------------------------#
+
+
+def page_size(per_page=None):
+    """
+    Clamps a requested page size to the PAGE_SIZE/MAX_PAGE_SIZE settings.
+    """
+    default = current_app.config.get('PAGE_SIZE', 20)
+    maximum = current_app.config.get('MAX_PAGE_SIZE', 100)
+    if not per_page or per_page < 1:
+        return default
+    return min(per_page, maximum)
+
+
+def paginate(query, columns, after=None, before=None, per_page=None):
+    """
+    @param: query, columns, after, before, per_page
+    Returns one page of query ordered by columns, a unique sort key whose
+    column keys are also attributes of the result rows. Pages are found by
+    comparing against the cursor's key (WHERE (a, b) > (:a, :b)) rather
+    than OFFSET, so every page costs the same as the first one.
+    Returns a dict with the page 'items' and the 'next'/'prev' cursors.
+    """
+    per_page = page_size(per_page)
+    sort_key = tuple_(*columns)
+
+    def cursor_key(cursor):
+        values = decode_cursor(cursor)
+        if len(values) != len(columns):
+            abort(400)
+        return tuple_(*values)
+
+    def key_of(row):
+        return encode_cursor([getattr(row, column.key) for column in columns])
+
+    if before is not None:
+        rows = query.filter(sort_key < cursor_key(before)).order_by(
+            *[column.desc() for column in columns]).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        return {
+            'items': rows,
+            'per_page': per_page,
+            'prev': key_of(rows[0]) if has_more else None,
+            'next': key_of(rows[-1]) if rows else None
+        }
+
+    if after is not None:
+        query = query.filter(sort_key > cursor_key(after))
+    rows = query.order_by(*columns).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    return {
+        'items': rows,
+        'per_page': per_page,
+        'prev': key_of(rows[0]) if after is not None and rows else None,
+        'next': key_of(rows[-1]) if has_more else None
+    }
+
+
+def page_args():
+    """
+    Reads the after/before/per_page pagination arguments of the current request.
+    """
+    return {
+        'after': request.args.get('after'),
+        'before': request.args.get('before'),
+        'per_page': request.args.get('per_page', type=int)
+    }
+
+
+def page_url(**cursor):
+    """
+    Builds the URL of another page of the current listing, keeping any other
+    query arguments (per_page, filters) of the current request.
+    """
+    args = {key: value for key, value in request.args.items()
+            if key not in ('after', 'before')}
+    args.update(cursor)
+    return url_for(request.endpoint, **dict(request.view_args or {}, **args))
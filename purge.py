@@ -0,0 +1,128 @@
+import time
+from sys import exc_info
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from jobs import task
+from models import db, Venue, Artist, Show, venue_genres, artist_genres
+
+
+#----------------------------------------------------------------------------#
+# Purging deleted venues and artists.
+#
+# Deleting a venue or an artist only marks it deleted; reads skip it from
+# then on and its shows were already taken off the counters. The purge
+# removes such rows for good, shows first, a bounded batch per short
+# transaction, so deleting a venue with thousands of shows never holds
+# locks for long. Deletes queue a purge job; `flask purge run` and
+# `flask purge worker` purge without the job runner.
+#----------------------------------------------------------------------------#
+
+
+OWNERS = ((Venue, Show.venue_id, venue_genres.c.venue_id),
+          (Artist, Show.artist_id, artist_genres.c.artist_id))
+
+
+def _deleted_ids(model):
+    return db.session.query(model.id).filter(model.deleted_at.isnot(None))
+
+
+def _purge_shows(model, column, batch_size):
+    """
+    Deletes up to batch_size shows of deleted rows of model and commits.
+    Returns the number deleted.
+    """
+    ids = [show_id for show_id, in db.session.query(Show.id).filter(
+        column.in_(_deleted_ids(model).subquery())).limit(batch_size)]
+    if ids:
+        Show.query.filter(Show.id.in_(ids)).delete(synchronize_session=False)
+    db.session.commit()
+    return len(ids)
+
+
+def _purge_owners(model, column, genre_column, batch_size):
+    """
+    Deletes up to batch_size deleted rows of model, with their genre links
+    and any show booked on them since their shows were purged, and commits.
+    Returns the number deleted.
+    """
+    ids = [owner_id for owner_id, in _deleted_ids(model).limit(batch_size)]
+    if ids:
+        Show.query.filter(column.in_(ids)).delete(synchronize_session=False)
+        db.session.execute(genre_column.table.delete().where(genre_column.in_(ids)))
+        model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+    db.session.commit()
+    return len(ids)
+
+
+def purge(batch_size=None):
+    """
+    @param: batch_size
+    Hard deletes every deleted venue and artist and their shows, batch_size
+    rows per transaction. Returns the number of shows, venues and artists
+    removed, as a dict.
+    """
+    batch_size = batch_size or current_app.config.get('PURGE_BATCH_SIZE', 500)
+    removed = {'shows': 0, 'venues': 0, 'artists': 0}
+    for model, column, genre_column in OWNERS:
+        while True:
+            purged = _purge_shows(model, column, batch_size)
+            removed['shows'] += purged
+            if purged < batch_size:
+                break
+    for model, column, genre_column in OWNERS:
+        while True:
+            purged = _purge_owners(model, column, genre_column, batch_size)
+            removed[model.__tablename__] += purged
+            if purged < batch_size:
+                break
+    return removed
+
+
+@task('purge')
+def purge_task(batch_size=None):
+    purge(batch_size)
+
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+
+purge_cli = AppGroup('purge', help='Remove deleted venues and artists for good.')
+
+
+def _report(removed):
+    click.echo(f"Purged {removed['shows']} shows, {removed['venues']} venues "
+               f"and {removed['artists']} artists.")
+
+
+@purge_cli.command('run')
+@click.option('--batch-size', type=int, default=None,
+              help='Rows deleted per transaction (default PURGE_BATCH_SIZE).')
+def run_command(batch_size):
+    """Purge everything deleted so far, then exit."""
+    _report(purge(batch_size))
+
+
+@purge_cli.command('worker')
+@click.option('--batch-size', type=int, default=None,
+              help='Rows deleted per transaction (default PURGE_BATCH_SIZE).')
+@click.option('--interval', type=float, default=None,
+              help='Seconds between purges (default PURGE_INTERVAL).')
+def worker_command(batch_size, interval):
+    """Purge deleted venues and artists every few seconds until stopped."""
+    interval = interval or current_app.config.get('PURGE_INTERVAL', 30)
+    while True:
+        try:
+            removed = purge(batch_size)
+        except Exception:
+            db.session.rollback()
+            click.echo(f'Purge failed: {exc_info()[1]!r}', err=True)
+        else:
+            if any(removed.values()):
+                _report(removed)
+        db.session.remove()
+        time.sleep(interval)
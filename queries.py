@@ -0,0 +1,350 @@
+from datetime import datetime, timezone
+from itertools import groupby
+
+from sqlalchemy import case, func
+
+from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres, not_deleted
+from pagination import paginate
+
+
+#----------------------------------------------------------------------------#
+# Helpers.
+#----------------------------------------------------------------------------#
+
+
+def _partition_shows(rows, now=None):
+    """
+    Splits show rows, ordered by start_time, into (past, upcoming) lists.
+    """
+    now = now or datetime.now()
+    past_shows = [row for row in rows if row.start_time <= now]
+    upcoming_shows = [row for row in rows if row.start_time > now]
+    return past_shows, upcoming_shows
+
+
+#----------------------------------------------------------------------------#
+# Detail pages.
+#----------------------------------------------------------------------------#
+
+
+def get_venue_detail(venue_id, now=None):
+    """
+    @param: venue_id, now
+    Loads a single venue and its shows, with the artist name and image joined in.
+    Returns the data structure expected by pages/show_venue.html, or None when
+    the venue does not exist or was deleted.
+    """
+    venue = Venue.get_listed(venue_id)
+    if venue is None:
+        return None
+    rows = db.session.query(
+        Show.id,
+        Show.start_time,
+        Show.artist_id,
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link'),
+        Artist.version.label('artist_version')
+    ).join(Artist, Artist.id == Show.artist_id).filter(
+        Show.venue_id == venue_id, not_deleted(Artist)).order_by(Show.start_time).all()
+    past_shows, upcoming_shows = _partition_shows(rows, now)
+    return {
+        'id': venue.id,
+        'name': venue.name,
+        'genres': venue.genre_names,
+        'address': venue.address,
+        'city': venue.city,
+        'state': venue.state,
+        'phone': venue.phone,
+        'website': venue.website,
+        'facebook_link': venue.facebook_link,
+        'seeking_talent': venue.seeking_talent,
+        'seeking_description': venue.seeking_description,
+        'image_link': venue.image_link,
+        'past_shows': [{
+            'show_id': show.id,
+            'artist_id': show.artist_id,
+            'artist_version': show.artist_version,
+            'artist_name': show.artist_name,
+            'artist_image_link': show.artist_image_link,
+            'start_time': show.start_time
+        } for show in past_shows],
+        'upcoming_shows': [{
+            'show_id': show.id,
+            'artist_id': show.artist_id,
+            'artist_version': show.artist_version,
+            'artist_name': show.artist_name,
+            'artist_image_link': show.artist_image_link,
+            'start_time': show.start_time
+        } for show in upcoming_shows],
+        'past_shows_count': len(past_shows),
+        'upcoming_shows_count': len(upcoming_shows)
+    }
+
+
+def get_artist_detail(artist_id, now=None):
+    """
+    @param: artist_id, now
+    Loads a single artist and its shows, with the venue name and image joined in.
+    Returns the data structure expected by pages/show_artist.html, or None when
+    the artist does not exist or was deleted.
+    """
+    artist = Artist.get_listed(artist_id)
+    if artist is None:
+        return None
+    rows = db.session.query(
+        Show.id,
+        Show.start_time,
+        Show.venue_id,
+        Venue.name.label('venue_name'),
+        Venue.image_link.label('venue_image_link'),
+        Venue.version.label('venue_version')
+    ).join(Venue, Venue.id == Show.venue_id).filter(
+        Show.artist_id == artist_id, not_deleted(Venue)).order_by(Show.start_time).all()
+    past_shows, upcoming_shows = _partition_shows(rows, now)
+    return {
+        'id': artist.id,
+        'name': artist.name,
+        'genres': artist.genre_names,
+        'city': artist.city,
+        'state': artist.state,
+        'phone': artist.phone,
+        'website': artist.website,
+        'facebook_link': artist.facebook_link,
+        'seeking_venue': artist.seeking_venue,
+        'seeking_description': artist.seeking_description,
+        'image_link': artist.image_link,
+        'past_shows': [{
+            'show_id': show.id,
+            'venue_id': show.venue_id,
+            'venue_version': show.venue_version,
+            'venue_name': show.venue_name,
+            'venue_image_link': show.venue_image_link,
+            'start_time': show.start_time
+        } for show in past_shows],
+        'upcoming_shows': [{
+            'show_id': show.id,
+            'venue_id': show.venue_id,
+            'venue_version': show.venue_version,
+            'venue_name': show.venue_name,
+            'venue_image_link': show.venue_image_link,
+            'start_time': show.start_time
+        } for show in upcoming_shows],
+        'past_shows_count': len(past_shows),
+        'upcoming_shows_count': len(upcoming_shows)
+    }
+
+
+def _detail_fingerprint(model, owner_column, other_model, other_column, owner_id, now):
+    now = now or datetime.now()
+    row = db.session.query(
+        model.version,
+        func.count(Show.id),
+        func.max(Show.id),
+        func.sum(case([(Show.start_time <= now, 1)], else_=0)),
+        func.sum(other_model.version)
+    ).outerjoin(Show, owner_column == model.id).outerjoin(
+        other_model, other_model.id == other_column).filter(
+        model.id == owner_id, not_deleted(model)).group_by(model.id, model.version).first()
+    return tuple(row) if row is not None else None
+
+
+def get_venue_fingerprint(venue_id, now=None):
+    """
+    @param: venue_id, now
+    Summarizes everything get_venue_detail would show in one aggregate row:
+    the venue's version, the number and highest id of its shows, how many
+    of them are past at now, and the sum of their artists' versions. Since
+    versions only go up (deleting an artist bumps it too) and shows are only
+    added or deleted, the tuple changes whenever the detail does. Returns
+    None for unknown or deleted venues.
+    """
+    return _detail_fingerprint(Venue, Show.venue_id, Artist, Show.artist_id, venue_id, now)
+
+
+def get_artist_fingerprint(artist_id, now=None):
+    """
+    @param: artist_id, now
+    The get_artist_detail counterpart of get_venue_fingerprint.
+    """
+    return _detail_fingerprint(Artist, Show.artist_id, Venue, Show.venue_id, artist_id, now)
+
+
+def _detail_last_modified(model, owner_column, other_model, other_column, owner_id, now):
+    now = now or datetime.now()
+    row = db.session.query(
+        model.updated_at,
+        func.max(Show.updated_at),
+        func.max(other_model.updated_at),
+        func.max(case([(Show.start_time <= now, Show.start_time)]))
+    ).outerjoin(Show, owner_column == model.id).outerjoin(
+        other_model, other_model.id == other_column).filter(
+        model.id == owner_id, not_deleted(model)).group_by(model.id, model.updated_at).first()
+    if row is None:
+        return None
+    updated_at, show_updated_at, other_updated_at, last_started = row
+    if last_started is not None:
+        # start_time is local time; the moment that show moved from upcoming
+        # to past changed the page too. Converted with the UTC offset in
+        # effect at that moment, which daylight saving time may have changed.
+        last_started = last_started.astimezone(timezone.utc).replace(tzinfo=None)
+    return max(stamp for stamp in (updated_at, show_updated_at, other_updated_at, last_started)
+               if stamp is not None)
+
+
+def get_venue_last_modified(venue_id, now=None):
+    """
+    @param: venue_id, now
+    Returns when the page of a venue last changed, in UTC: the latest edit of
+    the venue, its shows or their artists, or the start of its latest past
+    show, whichever came last. Returns None for unknown or deleted venues.
+    """
+    return _detail_last_modified(Venue, Show.venue_id, Artist, Show.artist_id, venue_id, now)
+
+
+def get_artist_last_modified(artist_id, now=None):
+    """
+    @param: artist_id, now
+    The get_artist_detail counterpart of get_venue_last_modified.
+    """
+    return _detail_last_modified(Artist, Show.artist_id, Venue, Show.venue_id, artist_id, now)
+
+
+#----------------------------------------------------------------------------#
+# Listings.
+#----------------------------------------------------------------------------#
+
+
+VENUE_ORDER = [Venue.city, Venue.state, Venue.name, Venue.id]
+ARTIST_ORDER = [Artist.name, Artist.id]
+SHOW_ORDER = [Show.start_time, Show.id]
+
+
+def _venues_query(genre, *columns):
+    query = db.session.query(*columns).filter(not_deleted(Venue))
+    if genre:
+        query = query.join(venue_genres, venue_genres.c.venue_id == Venue.id).join(
+            Genre, Genre.id == venue_genres.c.genre_id).filter(Genre.name == genre)
+    return query
+
+
+def _artists_query(genre, *columns):
+    query = db.session.query(*columns).filter(not_deleted(Artist))
+    if genre:
+        query = query.join(artist_genres, artist_genres.c.artist_id == Artist.id).join(
+            Genre, Genre.id == artist_genres.c.genre_id).filter(Genre.name == genre)
+    return query
+
+
+def _shows_query(*columns):
+    return db.session.query(*columns).join(Venue, Venue.id == Show.venue_id).join(
+        Artist, Artist.id == Show.artist_id).filter(not_deleted(Venue, Artist))
+
+
+def _listing_fingerprint(query, columns, after, before, per_page):
+    """
+    Pages through query like the listing it stands for and returns the page
+    size, the cursors and the selected columns of each row.
+    """
+    page = paginate(query, columns, after=after, before=before, per_page=per_page)
+    return (page['per_page'], page['next'], page['prev'],
+            tuple(tuple(row) for row in page['items']))
+
+
+def get_venue_areas(genre=None, after=None, before=None, per_page=None):
+    """
+    Groups one page of venues by (city, state) with their upcoming show counts,
+    read from the venue counters. The page, keyed on (city, state, name, id),
+    is folded into the areas structure expected by pages/venues.html. genre
+    limits the page to venues tagged with that genre.
+    """
+    query = _venues_query(
+        genre,
+        Venue.id,
+        Venue.name,
+        Venue.city,
+        Venue.state,
+        Venue.upcoming_shows_count.label('num_upcoming_shows'))
+    page = paginate(query, VENUE_ORDER, after=after, before=before, per_page=per_page)
+    page['items'] = [{
+        'city': city,
+        'state': state,
+        'venues': [{
+            'id': venue.id,
+            'name': venue.name,
+            'num_upcoming_shows': venue.num_upcoming_shows
+        } for venue in local_venues]
+    } for (city, state), local_venues in groupby(page['items'], key=lambda row: (row.city, row.state))]
+    return page
+
+
+def get_venue_areas_fingerprint(genre=None, after=None, before=None, per_page=None):
+    """
+    Summarizes the page get_venue_areas would return by the version and the
+    upcoming show counter of each of its venues (counter updates leave the
+    version alone), without loading or grouping it.
+    """
+    query = _venues_query(genre, *VENUE_ORDER, Venue.version, Venue.upcoming_shows_count)
+    return _listing_fingerprint(query, VENUE_ORDER, after, before, per_page)
+
+
+def get_artists_page(genre=None, after=None, before=None, per_page=None):
+    """
+    Loads one page of artists keyed on (name, id), shaped for pages/artists.html.
+    genre limits the page to artists tagged with that genre.
+    """
+    query = _artists_query(genre, Artist.id, Artist.name)
+    page = paginate(query, ARTIST_ORDER, after=after, before=before, per_page=per_page)
+    page['items'] = [{
+        'id': artist.id,
+        'name': artist.name
+    } for artist in page['items']]
+    return page
+
+
+def get_artists_page_fingerprint(genre=None, after=None, before=None, per_page=None):
+    """
+    The get_artists_page counterpart of get_venue_areas_fingerprint: the
+    (name, id, version) of each artist on the page.
+    """
+    query = _artists_query(genre, *ARTIST_ORDER, Artist.version)
+    return _listing_fingerprint(query, ARTIST_ORDER, after, before, per_page)
+
+
+def get_shows_page(after=None, before=None, per_page=None):
+    """
+    Loads one page of shows keyed on (start_time, id), with venue and artist
+    details joined in, shaped for pages/shows.html.
+    """
+    query = _shows_query(
+        Show.id,
+        Show.start_time,
+        Show.venue_id,
+        Venue.name.label('venue_name'),
+        Venue.version.label('venue_version'),
+        Show.artist_id,
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link'),
+        Artist.version.label('artist_version'))
+    page = paginate(query, SHOW_ORDER, after=after, before=before, per_page=per_page)
+    page['items'] = [{
+        'show_id': show.id,
+        'venue_id': show.venue_id,
+        'venue_name': show.venue_name,
+        'venue_version': show.venue_version,
+        'artist_id': show.artist_id,
+        'artist_version': show.artist_version,
+        'artist_name': show.artist_name,
+        'artist_image_link': show.artist_image_link,
+        'start_time': show.start_time
+    } for show in page['items']]
+    return page
+
+
+def get_shows_page_fingerprint(after=None, before=None, per_page=None):
+    """
+    Summarizes the page get_shows_page would return by the start time and id
+    of each show and the versions of its venue and artist. Shows themselves
+    are never edited, only added and deleted.
+    """
+    query = _shows_query(*SHOW_ORDER, Venue.version, Artist.version)
+    return _listing_fingerprint(query, SHOW_ORDER, after, before, per_page)
@@ -0,0 +1,123 @@
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import and_, or_
+
+from models import db, Venue, Artist, Show
+
+
+#----------------------------------------------------------------------------#
+# Booking conflicts.
+#
+# A show books its venue and its artist from start_time for duration
+# minutes. Two shows of the same venue or artist may not overlap; shows
+# that merely touch (one ends as the next starts) are fine. On Postgres the
+# shows table enforces this with exclusion constraints, the checks here let
+# the forms and the importer reject conflicts up front on every backend.
+# Like the constraints, they still see the shows of deleted venues and
+# artists until the purge removes them.
+#----------------------------------------------------------------------------#
+
+
+def end_of(start_time, duration):
+    return start_time + timedelta(minutes=duration or Show.DEFAULT_DURATION)
+
+
+def find_conflicts(venue_id, artist_id, start_time, duration):
+    """
+    @param: venue_id, artist_id, start_time, duration
+    Returns the shows a new booking would overlap, at the venue or for the
+    artist. Shows last at most Show.MAX_DURATION, so only shows starting in
+    [start_time - MAX_DURATION, end) can overlap; that window is a range
+    scan of the (venue_id, start_time) and (artist_id, start_time) indexes.
+    """
+    end_time = end_of(start_time, duration)
+    window = and_(Show.start_time > start_time - timedelta(minutes=Show.MAX_DURATION),
+                  Show.start_time < end_time)
+    candidates = Show.query.filter(
+        or_(Show.venue_id == venue_id, Show.artist_id == artist_id), window).all()
+    return [show for show in candidates if show.end_time > start_time]
+
+
+def find_overlaps(intervals):
+    """
+    @param: intervals
+    Returns every overlapping pair among (start, end, item) intervals as
+    (earlier item, later item) tuples. The intervals are swept in start order
+    with a heap of the ones still running, so n intervals with k overlaps
+    cost O(n log n + k).
+    """
+    running = []
+    overlaps = []
+    for index, (start, end, item) in enumerate(sorted(intervals, key=lambda interval: interval[:2])):
+        while running and running[0][0] <= start:
+            heapq.heappop(running)
+        overlaps.extend((other, item) for other_end, other_index, other in running)
+        heapq.heappush(running, (end, index, item))
+    return overlaps
+
+
+def validate_schedule(bookings):
+    """
+    @param: bookings
+    Finds the conflicts within a whole schedule at once. bookings are dicts
+    with venue_id, artist_id, start_time and duration; returns
+    (kind, owner_id, first, second) tuples for every overlapping pair at the
+    same venue (kind 'venue') or by the same artist (kind 'artist').
+    """
+    groups = defaultdict(list)
+    for booking in bookings:
+        interval = (booking['start_time'], end_of(booking['start_time'], booking['duration']), booking)
+        groups[('venue', booking['venue_id'])].append(interval)
+        groups[('artist', booking['artist_id'])].append(interval)
+    return [(kind, owner_id, first, second)
+            for (kind, owner_id), intervals in groups.items()
+            for first, second in find_overlaps(intervals)]
+
+
+def existing_bookings(venue_ids, artist_ids, start, end):
+    """
+    Loads the shows of the given venues and artists that may overlap the
+    period [start, end), as bookings for validate_schedule.
+    """
+    rows = db.session.query(
+        Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.duration
+    ).filter(
+        or_(Show.venue_id.in_(venue_ids), Show.artist_id.in_(artist_ids)),
+        Show.start_time > start - timedelta(minutes=Show.MAX_DURATION),
+        Show.start_time < end)
+    return [row._asdict() for row in rows]
+
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+
+schedule_cli = AppGroup('schedule', help='Check show bookings.')
+
+
+@schedule_cli.command('validate')
+@click.option('--limit', type=int, default=50, help='Conflicts to list (default 50).')
+def validate_command(limit):
+    """List shows that overlap at the same venue or by the same artist."""
+    bookings = [row._asdict() for row in db.session.query(
+        Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.duration)]
+    conflicts = validate_schedule(bookings)
+    names = {}
+    for kind, model in (('venue', Venue), ('artist', Artist)):
+        owner_ids = {owner_id for conflict_kind, owner_id, first, second in conflicts
+                     if conflict_kind == kind}
+        if owner_ids:
+            names.update(((kind, owner_id), name) for owner_id, name in
+                         db.session.query(model.id, model.name).filter(model.id.in_(owner_ids)))
+    for kind, owner_id, first, second in conflicts[:limit]:
+        click.echo(f"{kind} {names.get((kind, owner_id), owner_id)}: show {first['id']} "
+                   f"({first['start_time']}, {first['duration']} min) overlaps show "
+                   f"{second['id']} ({second['start_time']}, {second['duration']} min)")
+    click.echo(f'{len(conflicts)} conflicts among {len(bookings)} shows.')
+    if conflicts:
+        raise SystemExit(1)
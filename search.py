@@ -0,0 +1,198 @@
+from heapq import nsmallest
+from itertools import chain
+from threading import Lock
+from time import monotonic
+
+from flask import current_app
+from sqlalchemy import case, event, func
+from sqlalchemy.orm import Session
+
+from models import db, Venue, Artist, not_deleted
+
+
+SEARCHABLE = (Venue, Artist)
+
+
+#----------------------------------------------------------------------------#
+# In-process n-gram index.
+#----------------------------------------------------------------------------#
+
+
+class NGramIndex:
+    """
+    In-memory n-gram index over (id, name) pairs, used for partial,
+    case-insensitive name search on backends without pg_trgm (SQLite/dev).
+    """
+
+    def __init__(self, n=3):
+        self.n = n
+        self.names = {}
+        self.postings = {}
+        # See _get_index.
+        self.stamp = None
+        self.checked_at = 0
+
+    def _grams(self, text):
+        return {text[i:i + self.n] for i in range(len(text) - self.n + 1)}
+
+    def add(self, key, name):
+        folded = (name or '').lower()
+        self.names[key] = (folded, name)
+        for gram in self._grams(folded):
+            self.postings.setdefault(gram, set()).add(key)
+
+    def _candidates(self, term):
+        if len(term) < self.n:
+            return self.names.keys()
+        postings = sorted((self.postings.get(gram, set())
+                           for gram in self._grams(term)), key=len)
+        return set.intersection(*postings)
+
+    def search(self, term, limit):
+        """
+        Returns up to limit (id, name) pairs whose name contains term, ranked
+        exact match first, then prefix matches, then by name length and name.
+        """
+        term = term.lower()
+        hits = ((key, self.names[key]) for key in self._candidates(term)
+                if term in self.names[key][0])
+        ranked = nsmallest(limit, hits, key=lambda hit: (
+            hit[1][0] != term,
+            not hit[1][0].startswith(term),
+            len(hit[1][0]),
+            hit[1][0],
+            hit[0]
+        ))
+        return [(key, name) for key, (folded, name) in ranked]
+
+
+_indexes = {}
+_stale = set()
+_lock = Lock()
+
+
+def _stamp(model):
+    """
+    Sums up what the index of model depends on: the number of listed rows
+    and the latest updated_at, which every edit, insert and deletion moves
+    (counter updates leave it alone). Shared by all processes, unlike the
+    commit events below, which only see this process's writes.
+    """
+    return tuple(db.session.query(
+        func.sum(case([(not_deleted(model), 1)], else_=0)),
+        func.max(model.updated_at)
+    ).one())
+
+
+def _get_index(model):
+    """
+    Returns the n-gram index for model, rebuilt whenever the stamp of the
+    model's rows changed. The stamp is checked at most every
+    SEARCH_INDEX_CHECK_INTERVAL seconds, and right after this process
+    committed a write to the model.
+    """
+    interval = current_app.config.get('SEARCH_INDEX_CHECK_INTERVAL', 5)
+    with _lock:
+        index = _indexes.get(model)
+        now = monotonic()
+        if index is not None and model not in _stale and now < index.checked_at + interval:
+            return index
+        _stale.discard(model)
+        stamp = _stamp(model)
+        if index is None or stamp != index.stamp:
+            index = NGramIndex()
+            for key, name in db.session.query(model.id, model.name).filter(not_deleted(model)):
+                index.add(key, name)
+            index.stamp = stamp
+            _indexes[model] = index
+        index.checked_at = now
+        return index
+
+
+# Bulk updates and deletes aren't tracked: on venues and artists they only
+# move counters (see counters.py) or purge rows that were already left out,
+# and the stamp catches anything else.
+@event.listens_for(Session, 'after_flush')
+def _track_flush(session, flush_context):
+    touched = session.info.setdefault('search_touched', set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, SEARCHABLE):
+            touched.add(type(obj))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_indexes(session):
+    touched = session.info.pop('search_touched', None)
+    if touched:
+        with _lock:
+            _stale.update(touched)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_touched(session):
+    session.info.pop('search_touched', None)
+
+
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+
+
+def _escape_like(term):
+    return term.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+
+
+def _trigram_search(model, search_term, limit):
+    """
+    Partial, case-insensitive match served by the pg_trgm GIN index on name,
+    ranked by trigram similarity to the search term.
+    """
+    return db.session.query(model.id, model.name).filter(
+        model.name.ilike(f'%{_escape_like(search_term)}%', escape='!'),
+        not_deleted(model)
+    ).order_by(
+        func.similarity(model.name, search_term).desc(), model.name, model.id
+    ).limit(limit).all()
+
+
+def search(model, search_term, limit=None):
+    """
+    @param: model, search_term, limit
+    Returns up to limit ranked (id, name) pairs of model whose name contains
+    search_term. Postgres uses pg_trgm, other backends the in-process index.
+    """
+    if limit is None:
+        limit = current_app.config.get('SEARCH_RESULT_LIMIT', 50)
+    if db.engine.dialect.name == 'postgresql':
+        return _trigram_search(model, search_term, limit)
+    return _get_index(model).search(search_term, limit)
+
+
+def _search_response(model, search_term, limit):
+    results = search(model, search_term, limit)
+    upcoming = {}
+    if results:
+        upcoming = dict(db.session.query(model.id, model.upcoming_shows_count).filter(
+            model.id.in_([key for key, name in results])).all())
+    return {
+        "count": len(results),
+        "data": [{
+            "id": key,
+            "name": name,
+            "num_upcoming_shows": upcoming.get(key, 0),
+        } for key, name in results]
+    }
+
+
+def search_venues(search_term, limit=None):
+    """
+    Builds the search results structure expected by pages/search_venues.html.
+    """
+    return _search_response(Venue, search_term, limit)
+
+
+def search_artists(search_term, limit=None):
+    """
+    Builds the search results structure expected by pages/search_artists.html.
+    """
+    return _search_response(Artist, search_term, limit)
@@ -0,0 +1,119 @@
+from datetime import datetime
+from sys import exc_info
+
+from flask import (Blueprint, render_template, request, flash, redirect, url_for, abort,
+                   Response, stream_with_context)
+
+from models import db, Venue, Artist, Show
+from filters import format_datetime
+from queries import get_shows_page
+from pagination import page_args
+from cache import cache
+import counters
+
+
+show_pages = Blueprint('shows', __name__)
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@show_pages.route('/shows')
+@cache.cached(tags=['shows'])
+def shows():
+    """
+    Shows all shows ordered by start time, a page at a time.
+    """
+    page = get_shows_page(**page_args())
+    return render_template('pages/shows.html', shows=page['items'], page=page)
+
+
+@show_pages.route('/shows/export.<export_format>')
+def export_shows(export_format):
+    """
+    @param: export_format
+    Streams the whole show calendar as JSONL or CSV, in show id order. Pass
+    after_id (the last id of a previous export) to only get newer shows and
+    since (an ISO datetime) to skip shows starting earlier.
+    """
+    import exports
+    if export_format not in exports.FORMATS:
+        abort(404)
+    since = request.args.get('since')
+    try:
+        since = datetime.fromisoformat(since) if since else None
+    except ValueError:
+        abort(400)
+    rows = exports.iter_shows(after_id=request.args.get('after_id', type=int), since=since)
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(exports.export_lines(export_format, rows)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=shows.{export_format}'})
+
+
+@show_pages.route('/shows/create')
+def create_shows():
+    # renders form. do not touch.
+    from forms import ShowForm
+    form = ShowForm()
+    return render_template('forms/new_show.html', form=form)
+
+
+@show_pages.route('/shows/create', methods=['POST'])
+def create_show_submission():
+    from forms import ShowForm
+    import schedule
+    # Validated like `flask import shows` rows. The page carries no CSRF
+    # token, SECRET_KEY differs between workers.
+    form = ShowForm(request.form, meta={'csrf': False})
+    if not form.validate():
+        for name, errors in form.errors.items():
+            flash(f"Invalid {name.replace('_', ' ')}: {errors[0].rstrip('.')}. "
+                  'Show could not be listed.')
+        return redirect(url_for('shows.create_shows'))
+    data = {
+        'artist_id': form.artist_id.data,
+        'venue_id': form.venue_id.data,
+        'start_time': form.start_time.data,
+        # Left blank; out of range values were rejected above.
+        'duration': Show.DEFAULT_DURATION if form.duration.data is None else form.duration.data
+    }
+    try:
+        venue = Venue.get_listed(data['venue_id'])
+        artist = Artist.get_listed(data['artist_id'])
+        if venue is None or artist is None:
+            flash(f"No {'venue' if venue is None else 'artist'} with that ID is listed. "
+                  'Show could not be listed.')
+            return redirect(url_for('shows.create_shows'))
+        conflicts = schedule.find_conflicts(
+            data['venue_id'], data['artist_id'], data['start_time'], data['duration'])
+        if conflicts:
+            clash = conflicts[0]
+            booked = 'The venue' if str(clash.venue_id) == str(data['venue_id']) else 'The artist'
+            flash(f'{booked} is already booked from {format_datetime(clash.start_time, "short")} '
+                  f'to {format_datetime(clash.end_time, "short")}. Show could not be listed.')
+            return redirect(url_for('shows.create_shows'))
+        show = Show(
+            artist_id=data['artist_id'],
+            venue_id=data['venue_id'],
+            start_time=data['start_time'],
+            duration=data['duration']
+        )
+        db.session.add(show)
+        counters.show_added(show)
+        # Built before the commit, which expires the loaded names.
+        message = (f'Show by {artist.name} on {format_datetime(data["start_time"], "short")} '
+                   f'at {venue.name} has been listed successfully!')
+        db.session.commit()
+        cache.invalidate('shows', 'venues', f"venue:{data['venue_id']}",
+                         f"artist:{data['artist_id']}")
+        # on successful db insert, flash success
+        flash(message)
+    except:
+        flash('An error occurred. Show could not be listed.')
+        db.session.rollback()
+        print(exc_info())
+    finally:
+        db.session.close()
+    return redirect(url_for('index'))
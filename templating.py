@@ -0,0 +1,74 @@
+import os
+from time import perf_counter
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from jinja2 import FileSystemBytecodeCache, TemplateSyntaxError
+
+
+#----------------------------------------------------------------------------#
+# Template bytecode.
+#
+# Jinja compiles a template to Python code the first time a worker renders
+# it, so the first requests after every deploy or new worker paid for
+# parsing and compiling each page. The compiled code is kept in
+# JINJA_BYTECODE_CACHE_DIR instead, shared by all workers and restarts,
+# and `flask templates precompile` fills it as part of the build. The cache
+# is keyed on each template's path and checked against its source, so a
+# changed template is simply compiled again.
+#----------------------------------------------------------------------------#
+
+
+def init_bytecode_cache(app):
+    """
+    @param: app
+    Puts app.jinja_env's bytecode in JINJA_BYTECODE_CACHE_DIR, if set.
+    """
+    directory = app.config.get('JINJA_BYTECODE_CACHE_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+
+def precompile(env):
+    """
+    @param: env
+    Compiles every HTML template of env, which stores its bytecode. Returns
+    the names compiled and a list of (name, error) for the ones that failed.
+    """
+    names = env.list_templates(filter_func=lambda name: name.endswith('.html'))
+    errors = []
+    for name in names:
+        try:
+            env.get_template(name)
+        except TemplateSyntaxError as error:
+            errors.append((name, error))
+    return names, errors
+
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+
+templates_cli = AppGroup('templates', help='Compile the Jinja templates.')
+
+
+@templates_cli.command('precompile')
+@click.option('--clear', is_flag=True, help='Drop all cached bytecode first.')
+def precompile_command(clear):
+    """Compile every template into the bytecode cache."""
+    env = current_app.jinja_env
+    if env.bytecode_cache is None:
+        raise click.ClickException('JINJA_BYTECODE_CACHE_DIR is not set.')
+    if clear:
+        env.bytecode_cache.clear()
+    start = perf_counter()
+    names, errors = precompile(env)
+    for name, error in errors:
+        click.echo(f'{name}:{error.lineno}: {error.message}', err=True)
+    click.echo(f'Compiled {len(names) - len(errors)} templates in '
+               f'{(perf_counter() - start) * 1000:.0f} ms.')
+    if errors:
+        raise SystemExit(1)
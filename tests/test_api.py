@@ -0,0 +1,108 @@
+import json
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from app import create_app
+from models import db, Venue, Artist, Show
+import api
+import counters
+
+
+class InternalFieldsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        db.session.add_all([
+            Venue(id=1, name='Hall', city='SF', state='CA', address='1 st'),
+            Artist(id=1, name='Band', city='SF', state='CA'),
+            Show(venue_id=1, artist_id=1, start_time=datetime.now() + timedelta(days=1))
+        ])
+        db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def keys(self, value):
+        if isinstance(value, dict):
+            return set(value).union(*(self.keys(item) for item in value.values()))
+        if isinstance(value, list):
+            return set().union(*(self.keys(item) for item in value))
+        return set()
+
+    def test_payloads_leave_out_internal_fields(self):
+        for path in ('/api/v1/venues/1', '/api/v1/artists/1', '/api/v1/shows',
+                     '/api/v1/venues', '/api/v1/artists'):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200, path)
+            keys = self.keys(json.loads(response.data))
+            self.assertFalse(keys & api.INTERNAL_FIELDS, path)
+        self.assertIn('upcoming_shows', self.keys(json.loads(
+            self.client.get('/api/v1/venues/1').data)))
+
+    def test_internal_fields_cannot_be_selected(self):
+        response = self.client.get('/api/v1/shows?fields=show_id')
+        self.assertEqual(response.status_code, 400)
+
+
+class ListingEtagTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        db.session.add_all([
+            Venue(id=1, name='Hall', city='SF', state='CA', address='1 st'),
+            Artist(id=1, name='Band', city='SF', state='CA')
+        ])
+        db.session.flush()
+        self.add_show(days=1)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def add_show(self, days):
+        show = Show(venue_id=1, artist_id=1, start_time=datetime.now() + timedelta(days=days))
+        db.session.add(show)
+        counters.show_added(show)
+        db.session.commit()
+
+    def revalidate(self, path, etag):
+        return self.client.get(path, headers={'If-None-Match': etag})
+
+    def test_unchanged_listing_is_not_built(self):
+        for path, loader in (('/api/v1/shows', 'get_shows_page'),
+                             ('/api/v1/venues', 'get_venue_areas'),
+                             ('/api/v1/artists?genre=Jazz', 'get_artists_page')):
+            etag = self.client.get(path).headers['ETag'].strip('"')
+            with mock.patch(f'api.{loader}') as load:
+                response = self.revalidate(path, etag)
+            self.assertEqual(response.status_code, 304, path)
+            self.assertFalse(load.called, path)
+
+    def test_changes_on_the_page_change_the_etag(self):
+        etags = {path: self.client.get(path).headers['ETag'].strip('"')
+                 for path in ('/api/v1/shows', '/api/v1/venues', '/api/v1/artists')}
+        # A new show moves the venue counter, which leaves its version alone.
+        self.add_show(days=2)
+        Artist.query.get(1).name = 'Renamed'
+        db.session.commit()
+        for path, etag in etags.items():
+            response = self.revalidate(path, etag)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertNotEqual(response.headers['ETag'].strip('"'), etag, path)
+
+    def test_fields_and_pages_have_their_own_etags(self):
+        etag = self.client.get('/api/v1/shows').headers['ETag'].strip('"')
+        for path in ('/api/v1/shows?fields=venue_name', '/api/v1/shows?per_page=1'):
+            self.assertEqual(self.revalidate(path, etag).status_code, 200, path)
@@ -0,0 +1,31 @@
+import unittest
+
+from app import create_app
+import assets
+
+
+class SendAssetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True)
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            self.manifest = assets._manifest()
+
+    def test_bundles_are_immutable(self):
+        for filename in self.manifest.values():
+            response = self.client.get(f'/assets/{filename}')
+            self.assertEqual(response.status_code, 200, filename)
+            self.assertIn('immutable', response.headers['Cache-Control'])
+
+    def test_anything_else_is_not_found(self):
+        for filename in ('manifest.json', 'main.css', 'main.000000000000.css',
+                         self.manifest['main.css'] + '.gz'):
+            self.assertEqual(self.client.get(f'/assets/{filename}').status_code, 404, filename)
+
+    def test_brotli_then_gzip(self):
+        filename = self.manifest['main.css']
+        for accept, encoding in (('br, gzip', 'br'), ('gzip', 'gzip'), ('identity', None)):
+            response = self.client.get(f'/assets/{filename}',
+                                       headers={'Accept-Encoding': accept})
+            self.assertEqual(response.headers.get('Content-Encoding'), encoding, accept)
@@ -0,0 +1,73 @@
+import unittest
+from datetime import datetime
+
+from app import create_app
+from benchmarks.catalog import seed_catalog
+from benchmarks.load import find_saturation
+from benchmarks.routes import percentile, time_routes
+from models import db, Venue, Artist, Show, venue_genres
+
+
+class PercentileTest(unittest.TestCase):
+
+    def test_nearest_rank(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_saturation(self):
+        stages = [{'users': 1, 'throughput_rps': 100}, {'users': 2, 'throughput_rps': 190},
+                  {'users': 4, 'throughput_rps': 195}, {'users': 8, 'throughput_rps': 300}]
+        self.assertEqual(find_saturation(stages), 2)
+        self.assertIsNone(find_saturation(stages[:2]))
+
+
+class CatalogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True,
+                              CACHE_BACKEND=None)
+        self.context = self.app.app_context()
+        self.context.push()
+        self.now = datetime(2021, 3, 1, 12)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def snapshot(self):
+        return (
+            [(venue.name, venue.city, venue.upcoming_shows_count) for venue in Venue.query],
+            [(show.venue_id, show.artist_id, show.start_time) for show in Show.query],
+            db.session.query(venue_genres).count()
+        )
+
+    def test_same_seed_same_catalog(self):
+        seed_catalog(20, 30, 200, seed=7, now=self.now)
+        first = self.snapshot()
+        seed_catalog(20, 30, 200, seed=7, now=self.now)
+        self.assertEqual(self.snapshot(), first)
+        seed_catalog(20, 30, 200, seed=8, now=self.now)
+        self.assertNotEqual(self.snapshot(), first)
+
+    def test_catalog_shape(self):
+        seed_catalog(20, 30, 200, past_ratio=0.25, seed=7, now=self.now)
+        self.assertEqual((Venue.query.count(), Artist.query.count(), Show.query.count()),
+                         (20, 30, 200))
+        past = Show.query.filter(Show.start_time <= self.now).count()
+        self.assertTrue(30 <= past <= 70, past)
+        # Counters were repaired against the same now.
+        self.assertEqual(sum(venue.upcoming_shows_count for venue in Venue.query), 200 - past)
+
+    def test_time_routes(self):
+        seed_catalog(5, 5, 20, seed=7, now=self.now)
+        results = time_routes(self.app, 5, 5, requests=3, warmup=0,
+                              only=['venues', 'venue_detail', 'shows_deep_page'])
+        self.assertEqual(sorted(results), ['shows_deep_page', 'venue_detail', 'venues'])
+        for name, result in results.items():
+            self.assertEqual(result['statuses'], [200], name)
+            self.assertEqual(result['requests'], 3)
+            self.assertGreater(result['queries'], 0)
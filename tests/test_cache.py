@@ -0,0 +1,103 @@
+import sys
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from app import create_app
+from models import db, Venue, Artist, Show
+import cache
+
+
+class RedisBackendTest(unittest.TestCase):
+
+    def test_missing_package_fails_at_startup(self):
+        with mock.patch.dict(sys.modules, {'redis': None}):
+            with self.assertRaisesRegex(RuntimeError, 'requires the redis package'):
+                create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True,
+                           CACHE_BACKEND='redis')
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def test_disabling_drops_the_previous_backend(self):
+        create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True)
+        self.assertIsInstance(cache.cache.backend, cache.LRUBackend)
+        create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True, CACHE_BACKEND=None)
+        self.assertIsNone(cache.cache.backend)
+
+
+class LRUBackendTest(unittest.TestCase):
+
+    def test_invalidate_drops_tagged_entries(self):
+        backend = cache.LRUBackend(max_entries=10)
+        backend.set('venues', 1, 60, ['venues'])
+        backend.set('venue:1', 2, 60, ['venue', 'venue:1'])
+        backend.invalidate(['venue:1'])
+        self.assertIsNone(backend.get('venue:1'))
+        self.assertEqual(backend.get('venues'), 1)
+        self.assertEqual(backend.tags, {'venues': {'venues'}})
+
+    def test_evicts_least_recently_used(self):
+        backend = cache.LRUBackend(max_entries=2)
+        backend.set('a', 1, 60)
+        backend.set('b', 2, 60)
+        backend.get('a')
+        backend.set('c', 3, 60)
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual((backend.get('a'), backend.get('c')), (1, 3))
+        self.assertEqual(backend.evictions, 1)
+
+    def test_expired_entries_are_dropped(self):
+        backend = cache.LRUBackend()
+        with mock.patch('cache.monotonic', return_value=0):
+            backend.set('a', 1, 60)
+        with mock.patch('cache.monotonic', return_value=61):
+            self.assertIsNone(backend.get('a'))
+        self.assertEqual(backend.entries, {})
+
+
+class FragmentCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        # The response cache is off, so pages render every time.
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True,
+                              CACHE_BACKEND=None)
+        self.renders = []
+
+    def render(self, source, **context):
+        with self.app.app_context():
+            return self.app.jinja_env.from_string(source).render(
+                render=lambda value: self.renders.append(value) or value, **context)
+
+    def test_body_rendered_once_per_key(self):
+        source = "{% cache ['tile', id, version] %}{{ render(name) }}{% endcache %}"
+        self.assertEqual(self.render(source, id=1, version=1, name='Band'), 'Band')
+        self.assertEqual(self.render(source, id=1, version=1, name='Renamed'), 'Band')
+        self.assertEqual(self.render(source, id=1, version=2, name='Renamed'), 'Renamed')
+        self.assertEqual(self.renders, ['Band', 'Renamed'])
+
+    def test_disabled_cache_renders_every_time(self):
+        self.app.jinja_env.fragment_cache = None
+        source = "{% cache 'tile' %}{{ render(name) }}{% endcache %}"
+        self.render(source, name='Band')
+        self.render(source, name='Band')
+        self.assertEqual(self.renders, ['Band', 'Band'])
+
+    def test_edited_artist_shows_on_cached_tiles(self):
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                Venue(id=1, name='Hall', city='SF', state='CA', address='1 st'),
+                Artist(id=1, name='Band', city='SF', state='CA'),
+                Show(venue_id=1, artist_id=1, start_time=datetime.now() + timedelta(days=1))
+            ])
+            db.session.commit()
+            client = self.app.test_client()
+            self.assertIn(b'Band', client.get('/shows').data)
+            Artist.query.get(1).name = 'Renamed'
+            db.session.commit()
+            page = client.get('/shows').data
+            self.assertIn(b'Renamed', page)
+            self.assertNotIn(b'Band', page)
+            db.session.remove()
+            db.drop_all()
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+import unittest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(command, *args):
+    env = dict(os.environ, FLASK_APP='app')
+    return subprocess.run(command + list(args), cwd=ROOT, env=env,
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          universal_newlines=True)
+
+
+class FlaskDbCommandTest(unittest.TestCase):
+
+    def test_db_command_through_python_m_flask(self):
+        result = run([sys.executable, '-m', 'flask'], 'db', 'heads')
+        self.assertEqual(result.returncode, 0, result.stdout)
+        self.assertIn('(head)', result.stdout)
+
+    def test_db_command_through_flask_script(self):
+        script = os.path.join(os.path.dirname(sys.executable), 'flask')
+        if not os.path.exists(script):
+            self.skipTest('no flask script next to the interpreter')
+        result = run([script], 'db', 'heads')
+        self.assertEqual(result.returncode, 0, result.stdout)
+        self.assertIn('(head)', result.stdout)
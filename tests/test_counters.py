@@ -0,0 +1,115 @@
+import unittest
+from datetime import datetime, timedelta
+
+from app import create_app
+from models import db, Venue, Artist, Show
+import counters
+
+
+class CountersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True,
+                              JOBS_IN_PROCESS=False)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        self.now = datetime(2021, 3, 1, 12)
+        db.session.add_all([
+            Venue(id=1, name='Hall', city='SF', state='CA', address='1 st'),
+            Venue(id=2, name='Club', city='SF', state='CA', address='2 st'),
+            Artist(id=1, name='Band', city='SF', state='CA'),
+            Artist(id=2, name='Duo', city='SF', state='CA')
+        ])
+        db.session.commit()
+        counters.repair(self.now)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def add_show(self, venue_id, artist_id, start_time):
+        show = Show(venue_id=venue_id, artist_id=artist_id, start_time=start_time)
+        db.session.add(show)
+        counters.show_added(show)
+        db.session.commit()
+        return show
+
+    def counts(self, model, owner_id):
+        db.session.expire_all()
+        owner = model.query.get(owner_id)
+        return owner.upcoming_shows_count, owner.past_shows_count
+
+    def test_show_added_counts_upcoming_or_past(self):
+        self.add_show(1, 1, self.now + timedelta(days=1))
+        self.add_show(1, 2, self.now - timedelta(days=1))
+        self.assertEqual(self.counts(Venue, 1), (1, 1))
+        self.assertEqual(self.counts(Artist, 1), (1, 0))
+        self.assertEqual(self.counts(Artist, 2), (0, 1))
+
+    def test_shows_added_in_bulk(self):
+        counters.shows_added([
+            {'venue_id': 1, 'artist_id': 1, 'start_time': self.now + timedelta(days=1)},
+            {'venue_id': 1, 'artist_id': 1, 'start_time': self.now + timedelta(days=2)},
+            {'venue_id': 2, 'artist_id': 1, 'start_time': self.now - timedelta(days=1)}
+        ])
+        db.session.commit()
+        self.assertEqual(self.counts(Venue, 1), (2, 0))
+        self.assertEqual(self.counts(Venue, 2), (0, 1))
+        self.assertEqual(self.counts(Artist, 1), (2, 1))
+
+    def test_booking_through_the_form(self):
+        client = self.app.test_client()
+        start_time = datetime.now() + timedelta(days=30)
+        client.post('/shows/create', data={
+            'venue_id': 2, 'artist_id': 2, 'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S')})
+        self.assertEqual(self.counts(Venue, 2), (1, 0))
+        self.assertEqual(self.counts(Artist, 2), (1, 0))
+
+    def test_deleting_an_owner_takes_its_shows_off_the_other_side(self):
+        self.add_show(1, 1, self.now + timedelta(days=1))
+        self.add_show(1, 2, self.now + timedelta(days=2))
+        self.add_show(2, 1, self.now - timedelta(days=1))
+        counters.artist_shows_removed(1)
+        Artist.query.get(1).soft_delete()
+        db.session.commit()
+        self.assertEqual(self.counts(Venue, 1), (1, 0))
+        self.assertEqual(self.counts(Venue, 2), (0, 0))
+        counters.venue_shows_removed(1)
+        Venue.query.get(1).soft_delete()
+        db.session.commit()
+        self.assertEqual(self.counts(Artist, 2), (0, 0))
+
+    def test_repair_recounts_everything(self):
+        self.add_show(1, 1, self.now + timedelta(days=1))
+        self.add_show(1, 2, self.now - timedelta(days=1))
+        self.add_show(2, 2, self.now + timedelta(days=1))
+        Artist.query.get(1).deleted_at = self.now
+        db.session.query(Venue).update({Venue.upcoming_shows_count: 9, Venue.past_shows_count: 9})
+        db.session.commit()
+        counters.repair(self.now)
+        self.assertEqual(self.counts(Venue, 1), (0, 1))
+        self.assertEqual(self.counts(Venue, 2), (1, 0))
+        self.assertEqual(self.counts(Artist, 2), (1, 1))
+
+    def test_counter_updates_are_not_edits(self):
+        edited = Venue.query.get(1).updated_at
+        self.add_show(1, 1, self.now + timedelta(days=1))
+        counters.repair(self.now)
+        db.session.expire_all()
+        self.assertEqual(Venue.query.get(1).updated_at, edited)
+
+    def test_rollover_moves_started_shows(self):
+        self.add_show(1, 1, self.now + timedelta(hours=1))
+        self.add_show(2, 1, self.now + timedelta(hours=2))
+        self.add_show(2, 2, self.now + timedelta(days=1))
+        moved = counters.rollover(self.now + timedelta(hours=3))
+        self.assertEqual(moved, {'venues': 2, 'artists': 2})
+        self.assertEqual(self.counts(Venue, 1), (0, 1))
+        self.assertEqual(self.counts(Venue, 2), (1, 1))
+        self.assertEqual(self.counts(Artist, 1), (0, 2))
+        self.assertEqual(self.counts(Artist, 2), (1, 0))
+        # Nothing new started since.
+        self.assertEqual(counters.rollover(self.now + timedelta(hours=3)),
+                         {'venues': 0, 'artists': 0})
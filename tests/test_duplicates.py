@@ -0,0 +1,123 @@
+import unittest
+
+from app import create_app
+from models import db, Venue
+import duplicates
+
+
+class DuplicatesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True,
+                              JOBS_IN_PROCESS=False)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        db.session.add_all([
+            Venue(id=1, name='The Musical Hop', city='San Francisco', state='CA', address='1 st'),
+            Venue(id=2, name='Musical Hop', city='San Francisco', state='CA', address='2 st'),
+            Venue(id=3, name='Dueling Pianos Bar', city='New York', state='NY', address='3 st'),
+            Venue(id=4, name='Dueling Pianos Pub', city='New York', state='NY', address='4 st'),
+            Venue(id=5, name='Dueling Pianos Bar', city='Boston', state='MA', address='5 st'),
+            Venue(id=6, name='Hop', city='San Francisco', state='CA', address='6 st'),
+            Venue(id=7, name='Hops', city='San Francisco', state='CA', address='7 st')
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def pairs(self, **options):
+        return [(candidate['score'],) + tuple(venue['id'] for venue in candidate['venues'])
+                for candidate in duplicates.find_duplicates(**options)]
+
+    def test_canonical_name(self):
+        self.assertEqual(duplicates.canonical_name('The Musical Hop'), 'musical hop')
+        self.assertEqual(duplicates.canonical_name('Park Square Live Music & Coffee'),
+                         duplicates.canonical_name('Park Square Live Music and Coffee'))
+        self.assertEqual(duplicates.canonical_name(None), '')
+
+    def test_trigrams_are_padded(self):
+        self.assertEqual(duplicates.trigrams('hop'), {'  h', ' ho', 'hop', 'op '})
+
+    def test_threshold(self):
+        # Dueling Pianos Bar / Pub share 15 of 22 trigrams, Hop / Hops 3 of 6.
+        self.assertEqual(self.pairs(), [(1.0, 1, 2), (0.682, 3, 4)])
+        self.assertEqual(self.pairs(threshold=0.68), [(1.0, 1, 2), (0.682, 3, 4)])
+        self.assertEqual(self.pairs(threshold=0.69), [(1.0, 1, 2)])
+        self.assertEqual(self.pairs(threshold=0.5), [(1.0, 1, 2), (0.682, 3, 4), (0.5, 6, 7)])
+
+    def test_deleted_venues_are_skipped(self):
+        Venue.query.get(2).soft_delete()
+        db.session.commit()
+        self.assertEqual(self.pairs(), [(0.682, 3, 4)])
+
+    def test_exact_includes_deleted_venues(self):
+        # Rows the unique index would reject, as found before the migration adding it.
+        db.session.execute('DROP INDEX uq_venues_name_city_state')
+        db.session.add_all([
+            Venue(id=8, name=' dueling pianos bar', city='New York ', state='NY', address='8 st'),
+            Venue(id=9, name='Dueling Pianos Bar', city='New York', state='NY', address='9 st')
+        ])
+        db.session.commit()
+        Venue.query.get(3).soft_delete()
+        db.session.commit()
+        self.assertEqual(self.pairs(exact=True), [(1.0, 3, 8), (1.0, 3, 9)])
+        self.assertNotIn(3, {venue_id for score, *ids in self.pairs() for venue_id in ids})
+
+    def test_command(self):
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=['venues', 'duplicates', '--limit', '1'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(result.output.splitlines(), [
+            '1.00  #1 The Musical Hop  |  #2 Musical Hop  (San Francisco, CA)',
+            '2 merge candidates.'
+        ])
+        result = runner.invoke(args=['venues', 'duplicates', '--exact'])
+        self.assertEqual(result.output.splitlines(), ['0 merge candidates.'])
+
+
+class InsertUnlessListedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True,
+                              JOBS_IN_PROCESS=False)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def insert(self, name, city='San Francisco', state='CA', **values):
+        venue_id = Venue.insert_unless_listed(name=name, city=city, state=state,
+                                              address='1 st', **values)
+        db.session.commit()
+        return venue_id
+
+    def test_same_venue_is_listed_once(self):
+        venue_id = self.insert('The Musical Hop', genres=['Jazz', 'Swing'])
+        self.assertIsNotNone(venue_id)
+        self.assertIsNone(self.insert(' the musical hop', city='san francisco '))
+        self.assertEqual(Venue.query.count(), 1)
+        self.assertEqual(Venue.query.get(venue_id).genre_names, ['Jazz', 'Swing'])
+
+    def test_other_city_or_state_is_another_venue(self):
+        self.assertIsNotNone(self.insert('The Musical Hop'))
+        self.assertIsNotNone(self.insert('The Musical Hop', city='Oakland'))
+        self.assertIsNotNone(self.insert('The Musical Hop', state='NY'))
+        self.assertEqual(Venue.query.count(), 3)
+
+    def test_deleted_venue_still_collides(self):
+        venue_id = self.insert('The Musical Hop')
+        Venue.query.get(venue_id).soft_delete()
+        db.session.commit()
+        self.assertIsNone(self.insert('The Musical Hop'))
+
+
+if __name__ == '__main__':
+    unittest.main()
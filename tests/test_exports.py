@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+from app import create_app
+from models import db, Venue, Artist, Show
+import exports
+
+
+class ExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        db.session.add_all([
+            Venue(id=1, name='Hall, The', city='SF', state='CA', address='1 st'),
+            Artist(id=1, name='Band', city='SF', state='CA'),
+            Artist(id=2, name='Gone', city='SF', state='CA', deleted_at=datetime(2021, 1, 1))
+        ])
+        for show_id, day, artist_id in ((1, 3, 1), (2, 1, 1), (3, 2, 2), (4, 5, 1)):
+            db.session.add(Show(id=show_id, venue_id=1, artist_id=artist_id,
+                                start_time=datetime(2021, 3, day, 20)))
+        db.session.commit()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def test_rows_in_id_order_a_batch_at_a_time(self):
+        rows = list(exports.iter_shows(batch_size=1))
+        self.assertEqual([row['id'] for row in rows], [1, 2, 4])
+        self.assertEqual(rows[0]['start_time'], '2021-03-03T20:00:00')
+        self.assertEqual(rows[0]['venue_name'], 'Hall, The')
+        self.assertEqual(set(rows[0]), set(exports.FIELDS))
+
+    def test_after_id_and_since(self):
+        self.assertEqual([row['id'] for row in exports.iter_shows(after_id=1)], [2, 4])
+        since = datetime(2021, 3, 3, 20)
+        self.assertEqual([row['id'] for row in exports.iter_shows(since=since)], [1, 4])
+
+    def test_formats(self):
+        rows = list(exports.iter_shows())
+        text = ''.join(exports.export_lines('csv', rows))
+        records = list(csv.DictReader(io.StringIO(text)))
+        self.assertEqual([record['id'] for record in records], ['1', '2', '4'])
+        self.assertEqual(records[0]['venue_name'], 'Hall, The')
+        lines = list(exports.export_lines('jsonl', rows))
+        self.assertEqual([json.loads(line)['id'] for line in lines], [1, 2, 4])
+
+    def test_route(self):
+        client = self.app.test_client()
+        response = client.get('/shows/export.csv?after_id=1')
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertIn('filename=shows.csv', response.headers['Content-Disposition'])
+        self.assertEqual(len(response.data.decode().splitlines()), 3)
+        response = client.get('/shows/export.jsonl?since=2021-03-04')
+        self.assertEqual([json.loads(line)['id'] for line in response.data.splitlines()], [4])
+        self.assertEqual(client.get('/shows/export.xml').status_code, 404)
+        self.assertEqual(client.get('/shows/export.csv?since=soon').status_code, 400)
+
+    def test_watermark_file(self):
+        output = os.path.join(self.directory, 'shows.jsonl')
+        watermark = os.path.join(self.directory, 'watermark')
+        runner = self.app.test_cli_runner(mix_stderr=False)
+
+        def export():
+            result = runner.invoke(args=['export', 'shows', '-o', output,
+                                         '--watermark-file', watermark])
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(output) as f:
+                return [json.loads(line)['id'] for line in f]
+        self.assertEqual(export(), [1, 2, 4])
+        self.assertEqual(export(), [])
+        db.session.add(Show(id=5, venue_id=1, artist_id=1, start_time=datetime(2021, 3, 9)))
+        db.session.commit()
+        self.assertEqual(export(), [5])
+        with open(watermark) as f:
+            self.assertEqual(f.read(), '5\n')
@@ -0,0 +1,51 @@
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import babel.dates
+
+from app import create_app
+from filters import FORMATS, _format, format_datetime
+
+
+class FormatDatetimeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.value = datetime(2028, 2, 17, 20, 5)
+
+    def test_matches_babel(self):
+        for name, pattern in FORMATS.items():
+            self.assertEqual(format_datetime(self.value, name),
+                             babel.dates.format_datetime(self.value, pattern, locale='en_US'))
+        self.assertEqual(format_datetime(self.value, 'y-MM'), '2028-02')
+
+    def test_short_is_the_old_strftime(self):
+        self.assertEqual(format_datetime(self.value, 'short'), self.value.strftime('%d/%m/%Y, %H:%M'))
+
+    @unittest.skipIf(sys.version_info >= (3, 10),
+                     'python-dateutil 2.6.0 uses collections.Callable, gone in Python 3.10')
+    def test_strings_are_parsed(self):
+        self.assertEqual(format_datetime('2028-02-17T20:05:00', 'short'), '17/02/2028, 20:05')
+
+    def test_none(self):
+        self.assertEqual(format_datetime(None), '')
+
+    def test_aware_values_keep_their_wall_clock(self):
+        aware = self.value.replace(tzinfo=timezone(timedelta(hours=-8)))
+        self.assertEqual(format_datetime(aware, 'short'), '17/02/2028, 20:05')
+
+    def test_repeated_values_come_from_the_cache(self):
+        value = datetime(2031, 1, 1, 12)
+        format_datetime(value, 'full')
+        hits = _format.cache_info().hits
+        format_datetime(value, 'full')
+        self.assertEqual(_format.cache_info().hits, hits + 1)
+
+    def test_locale_setting(self):
+        app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True,
+                         DATETIME_LOCALE='de_DE')
+        with app.app_context():
+            self.assertEqual(format_datetime(self.value, 'EEEE'), 'Donnerstag')
+        self.assertEqual(format_datetime(self.value, 'EEEE', 'fr_FR'), 'jeudi')
+        self.assertEqual(format_datetime(self.value, 'EEEE'), 'Thursday')
+        self.assertEqual(app.jinja_env.filters['datetime'], format_datetime)
@@ -0,0 +1,62 @@
+import unittest
+
+from app import create_app
+from models import db, Venue, Artist, Genre
+import queries
+
+
+class GenreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        db.session.add_all([
+            Venue(id=1, name='Blue', city='SF', state='CA', address='1 st',
+                  genres=Genre.resolve(['Jazz', 'Blues'])),
+            Venue(id=2, name='Loud', city='SF', state='CA', address='2 st'),
+            Artist(id=1, name='Band', city='SF', state='CA')
+        ])
+        db.session.commit()
+        Venue.query.get(2).genres = Genre.resolve(['Rock n Roll', 'Jazz'])
+        Artist.query.get(1).genres = Genre.resolve(['Jazz'])
+        db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def test_resolve_reuses_and_creates(self):
+        jazz = Genre.query.filter_by(name='Jazz').one()
+        genres = Genre.resolve([' Jazz', 'Folk', 'Jazz', '', 'Folk '])
+        self.assertEqual([genre.name for genre in genres], ['Jazz', 'Folk'])
+        self.assertIs(genres[0], jazz)
+        self.assertIsNone(genres[1].id)
+        self.assertEqual(Genre.resolve(None), [])
+
+    def test_genre_names_are_sorted(self):
+        self.assertEqual(Venue.query.get(1).genre_names, ['Blues', 'Jazz'])
+        self.assertEqual(Genre.query.count(), 3)
+
+    def test_listings_filter_by_genre(self):
+        def venue_ids(genre):
+            return [venue['id'] for area in queries.get_venue_areas(genre=genre)['items']
+                    for venue in area['venues']]
+        self.assertEqual(venue_ids('Jazz'), [1, 2])
+        self.assertEqual(venue_ids('Rock n Roll'), [2])
+        self.assertEqual(venue_ids('Polka'), [])
+        self.assertEqual(len(queries.get_artists_page(genre='Jazz')['items']), 1)
+        self.assertEqual(queries.get_artists_page(genre='Blues')['items'], [])
+        page = self.client.get('/venues?genre=Rock+n+Roll').data
+        self.assertIn(b'href="/venues/2"', page)
+        self.assertNotIn(b'href="/venues/1"', page)
+
+    def test_genre_changes_bump_the_version(self):
+        venue = Venue.query.get(1)
+        version = venue.version
+        venue.genres = Genre.resolve(['Folk'])
+        db.session.commit()
+        self.assertEqual(Venue.query.get(1).version, version + 1)
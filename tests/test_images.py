@@ -0,0 +1,165 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+from PIL import Image
+
+from app import create_app
+from models import db, Venue, Artist
+import images
+
+
+def _png(size, color=(200, 30, 30)):
+    output = BytesIO()
+    Image.new('RGB', size, color).save(output, 'PNG')
+    return output.getvalue()
+
+
+class Origin(BaseHTTPRequestHandler):
+    """
+    Stands in for the sites image links point to: /photo.png is a 1600x900
+    picture, /page.html isn't a picture at all, /slow answers after the fetch
+    timeout, anything else is a 404.
+    """
+    photo = _png((1600, 900))
+    hits = []
+
+    def do_GET(self):
+        self.hits.append(self.path)
+        if self.path == '/photo.png':
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(self.photo)))
+            self.end_headers()
+            self.wfile.write(self.photo)
+        elif self.path == '/page.html':
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.end_headers()
+            self.wfile.write(b'<html></html>')
+        elif self.path == '/slow':
+            time.sleep(1)
+            self.send_response(200)
+            self.end_headers()
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class ThumbnailTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.origin = ThreadingHTTPServer(('127.0.0.1', 0), Origin)
+        threading.Thread(target=cls.origin.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.origin.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.origin.shutdown()
+        cls.origin.server_close()
+
+    def setUp(self):
+        Origin.hits.clear()
+        self.directory = tempfile.mkdtemp()
+        self.app = create_app(
+            SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True, IMAGE_CACHE_DIR=self.directory,
+            IMAGE_ALLOW_PRIVATE_HOSTS=True, IMAGE_FETCH_TIMEOUT=0.2)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        db.session.add_all([
+            Artist(id=1, name='Photo', city='SF', state='CA', image_link=f'{self.base}/photo.png'),
+            Venue(id=1, name='Missing', city='SF', state='CA', address='1 st',
+                  image_link=f'{self.base}/missing.png'),
+            Venue(id=2, name='Slow', city='SF', state='CA', address='2 st',
+                  image_link=f'{self.base}/slow'),
+            Venue(id=3, name='Page', city='SF', state='CA', address='3 st',
+                  image_link=f'{self.base}/page.html')
+        ])
+        db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+        shutil.rmtree(self.directory)
+
+    def test_resizes_and_caches(self):
+        response = self.client.get('/img/artist/1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'image/jpeg')
+        self.assertEqual(Image.open(BytesIO(response.data)).size, images.SIZES['tile'])
+        response = self.client.get('/img/artist/1?size=page')
+        self.assertEqual(Image.open(BytesIO(response.data)).size, images.SIZES['page'])
+        self.client.get('/img/artist/1')
+        self.assertEqual(Origin.hits, ['/photo.png', '/photo.png'])
+
+    def test_version_makes_it_immutable(self):
+        response = self.client.get('/img/artist/1?v=1')
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        response = self.client.get('/img/artist/1')
+        self.assertNotIn('immutable', response.headers['Cache-Control'])
+
+    def test_if_none_match(self):
+        etag = self.client.get('/img/artist/1').headers['ETag']
+        response = self.client.get('/img/artist/1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+    def test_origin_not_found_redirects(self):
+        response = self.client.get('/img/venue/1')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.location, f'{self.base}/missing.png')
+
+    def test_origin_timeout_redirects(self):
+        response = self.client.get('/img/venue/2')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.location, f'{self.base}/slow')
+
+    def test_not_a_picture_redirects(self):
+        response = self.client.get('/img/venue/3')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.location, f'{self.base}/page.html')
+
+    def test_unknown_kind_size_or_owner(self):
+        for path in ('/img/show/1', '/img/artist/1?size=huge', '/img/artist/9'):
+            self.assertEqual(self.client.get(path).status_code, 404, path)
+
+
+class DiskCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_evicts_least_recently_read(self):
+        cache = images.DiskCache(self.directory, max_bytes=3500)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, b'x' * 1000)
+        # Reading a makes b the least recently used.
+        past = time.time() - 60
+        for age, key in enumerate(('a', 'b', 'c')):
+            os.utime(cache.path(key), (past + age, past + age))
+        cache.get('a')
+        cache.set('d', b'x' * 1000)
+        self.assertIsNone(cache.get('b'))
+        for key in ('a', 'c', 'd'):
+            self.assertIsNotNone(cache.get(key), key)
+        self.assertEqual(cache.size, 3000)
+
+    def test_missing_key(self):
+        cache = images.DiskCache(self.directory, max_bytes=3000)
+        self.assertIsNone(cache.get('a'))
+        self.assertTrue(cache.set('a', b'x').startswith(self.directory))
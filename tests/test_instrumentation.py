@@ -0,0 +1,73 @@
+import json
+import logging
+import unittest
+
+from flask import Flask
+
+from app import create_app
+from instrumentation import QueryInspector, QueryStats
+from models import db, Artist
+
+
+class QueryStatsTest(unittest.TestCase):
+
+    def test_repeated_statements(self):
+        stats = QueryStats()
+        for statement in ['SELECT a'] * 3 + ['SELECT b'] * 5 + ['SELECT c']:
+            stats.record(statement, 0.001)
+        self.assertEqual(stats.count, 9)
+        self.assertAlmostEqual(stats.duration, 0.009)
+        self.assertEqual(stats.repeated(3), [('SELECT b', 5), ('SELECT a', 3)])
+        self.assertEqual(stats.repeated(6), [])
+
+
+class QueryInspectorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True,
+                              N_PLUS_ONE_THRESHOLD=3, CACHE_BACKEND=None)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        db.session.add_all([Artist(id=i, name=f'Act {i}', city='SF', state='CA')
+                            for i in range(1, 6)])
+        db.session.commit()
+
+        @self.app.route('/one-by-one')
+        def one_by_one():
+            # The N+1 shape: one query per row.
+            return ','.join(Artist.query.get(i).name for i in range(1, 6))
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def test_debug_headers(self):
+        self.app.debug = True
+        response = self.client.get('/artists')
+        self.assertGreaterEqual(int(response.headers['X-Query-Count']), 1)
+        self.assertIn('db;dur=', response.headers['Server-Timing'])
+        self.assertNotIn('X-N-Plus-One', response.headers)
+        response = self.client.get('/one-by-one')
+        self.assertTrue(response.headers['X-N-Plus-One'].startswith('5x SELECT'))
+
+    def test_log_lines_without_debug(self):
+        self.app.debug = False
+        with self.assertLogs('fyyur.queries', logging.INFO) as logs:
+            self.client.get('/artists')
+            self.client.get('/one-by-one')
+        listing, one_by_one = (json.loads(record.getMessage()) for record in logs.records)
+        self.assertEqual(logs.records[0].levelno, logging.INFO)
+        self.assertEqual((listing['endpoint'], listing['n_plus_one']), ('artists.artists', []))
+        self.assertEqual(logs.records[1].levelno, logging.WARNING)
+        self.assertEqual(one_by_one['n_plus_one'][0]['count'], 5)
+        self.assertGreaterEqual(one_by_one['queries'], 5)
+
+    def test_disabled(self):
+        app = Flask(__name__)
+        app.config['QUERY_INSPECTOR_ENABLED'] = False
+        QueryInspector(app)
+        self.assertNotIn('query_inspector', app.extensions)
@@ -0,0 +1,176 @@
+import json
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+
+from app import create_app
+from models import db, Job
+import jobs
+
+
+CALLS = []
+
+
+@jobs.task('tests.record')
+def record(value):
+    CALLS.append(value)
+
+
+@jobs.task('tests.fail', max_attempts=3)
+def fail(value):
+    raise ValueError(f'Cannot handle {value}')
+
+
+class JobsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True,
+                              JOBS_IN_PROCESS=False, JOB_RETRY_DELAY=10, JOB_RETRY_MAX=60)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        self.runner = self.app.extensions['jobs']
+        del CALLS[:]
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def run_due(self):
+        # What the dispatcher does, on this thread.
+        claimed = self.runner._claim(self.runner.threads)
+        for job in claimed:
+            self.runner.running += 1
+            self.runner._execute(*job)
+        return [job_id for job_id, name, payload in claimed]
+
+    def run_failing(self):
+        with self.assertLogs('fyyur.jobs', 'WARNING'):
+            return self.run_due()
+
+    def make_due(self, job_id):
+        Job.query.filter(Job.id == job_id).update({Job.run_at: datetime.utcnow()})
+        db.session.commit()
+
+    def test_job_is_queued_with_the_commit(self):
+        jobs.enqueue('tests.record', value=1)
+        db.session.rollback()
+        self.assertEqual(Job.query.count(), 0)
+        job = jobs.enqueue('tests.record', value=2)
+        db.session.commit()
+        self.assertEqual((job.status, job.max_attempts, json.loads(job.payload)),
+                         ('queued', 5, {'value': 2}))
+        job_id = job.id
+        self.assertEqual(self.run_due(), [job_id])
+        self.assertEqual(CALLS, [2])
+        self.assertEqual(Job.query.get(job_id).status, 'done')
+        self.assertEqual(self.run_due(), [])
+        self.assertRaises(KeyError, jobs.enqueue, 'tests.missing')
+
+    def test_delayed_job_waits(self):
+        job = jobs.enqueue('tests.record', delay=60, value=1)
+        db.session.commit()
+        job_id = job.id
+        self.assertEqual(self.run_due(), [])
+        self.make_due(job_id)
+        self.assertEqual(self.run_due(), [job_id])
+
+    def test_claim_skips_locked_rows(self):
+        locking = []
+
+        @event.listens_for(Query, 'before_compile', retval=True)
+        def capture(query):
+            if query._for_update_arg is not None:
+                locking.append(query)
+            return query
+        try:
+            self.runner._claim(1)
+        finally:
+            event.remove(Query, 'before_compile', capture)
+        statements = [str(query.statement.compile(dialect=postgresql.dialect()))
+                      for query in locking]
+        self.assertEqual(len(statements), 1)
+        self.assertIn('ORDER BY jobs.run_at, jobs.id', statements[0])
+        self.assertTrue(statements[0].endswith('FOR UPDATE SKIP LOCKED'), statements[0])
+
+    def test_claimed_job_is_not_claimed_twice(self):
+        job = jobs.enqueue('tests.record', value=1)
+        db.session.commit()
+        self.assertEqual([job_id for job_id, name, payload in self.runner._claim(2)], [job.id])
+        self.assertEqual(self.runner._claim(2), [])
+        job = Job.query.get(job.id)
+        self.assertEqual((job.status, job.attempts, job.locked_by),
+                         ('running', 1, self.runner.worker_id))
+
+    def test_failed_job_is_retried_then_fails(self):
+        job = jobs.enqueue('tests.fail', value=1)
+        db.session.commit()
+        job_id = job.id
+        for attempt in (1, 2):
+            before = datetime.utcnow()
+            self.assertEqual(self.run_failing(), [job_id])
+            job = Job.query.get(job_id)
+            self.assertEqual((job.status, job.attempts, job.locked_by), ('queued', attempt, None))
+            self.assertIn('ValueError: Cannot handle 1', job.last_error)
+            delay = 10 * 2 ** (attempt - 1)
+            self.assertGreaterEqual(job.run_at, before + timedelta(seconds=delay / 2))
+            self.assertLessEqual(job.run_at, datetime.utcnow() + timedelta(seconds=delay))
+            self.assertEqual(self.run_due(), [])
+            self.make_due(job_id)
+        self.assertEqual(self.run_failing(), [job_id])
+        job = Job.query.get(job_id)
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+        self.assertEqual(self.run_due(), [])
+
+    def test_backoff_doubles_up_to_the_maximum(self):
+        for attempts, delay in ((1, 10), (2, 20), (3, 40), (4, 60), (10, 60)):
+            for _ in range(20):
+                backoff = self.runner.backoff(attempts)
+                self.assertGreaterEqual(backoff, delay / 2)
+                self.assertLessEqual(backoff, delay)
+
+    def test_housekeeping(self):
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=self.runner.lock_timeout + 1)
+        old = now - timedelta(seconds=self.runner.retention + 1)
+        db.session.add_all([
+            Job(id=1, name='tests.record', status='running', attempts=1, max_attempts=2,
+                locked_at=stale, locked_by='gone:1'),
+            Job(id=2, name='tests.record', status='running', attempts=2, max_attempts=2,
+                locked_at=stale, locked_by='gone:1'),
+            Job(id=3, name='tests.record', status='running', attempts=1, max_attempts=2,
+                locked_at=now, locked_by='busy:1'),
+            Job(id=4, name='tests.record', status='done', max_attempts=2, updated_at=old),
+            Job(id=5, name='tests.record', status='queued', max_attempts=2, updated_at=old)
+        ])
+        db.session.commit()
+        self.runner._housekeeping()
+        db.session.expire_all()
+        self.assertEqual([(job.id, job.status, job.locked_by) for job in Job.query.order_by(Job.id)],
+                         [(1, 'queued', None), (2, 'failed', None), (3, 'running', 'busy:1'),
+                          (5, 'queued', None)])
+        self.assertEqual(Job.query.get(1).last_error, 'Timed out')
+
+    def test_retry_command(self):
+        job = jobs.enqueue('tests.fail', max_attempts=1, value=1)
+        db.session.commit()
+        job_id = job.id
+        self.run_failing()
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=['jobs', 'list', '--status', 'failed'])
+        self.assertIn(f'#{job_id} tests.fail failed, attempt 1/1', result.output)
+        self.assertIn('ValueError: Cannot handle 1', result.output)
+        result = runner.invoke(args=['jobs', 'retry', str(job_id)])
+        self.assertEqual(result.output, f'Job #{job_id} queued.\n')
+        job = Job.query.get(job_id)
+        self.assertEqual((job.status, job.attempts), ('queued', 0))
+        result = runner.invoke(args=['jobs', 'retry', str(job_id)])
+        self.assertEqual(result.exit_code, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import random
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+from werkzeug.serving import make_server
+
+from app import create_app
+from models import db, Venue, Artist, Show
+from benchmarks.load import Recorder, VirtualUser
+
+
+class CreateShowStepTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        self.booked = (datetime.now() + timedelta(days=7)).replace(microsecond=0)
+        db.session.add_all([
+            Venue(id=1, name='Hall', city='SF', state='CA', address='1 st'),
+            Artist(id=1, name='Band', city='SF', state='CA'),
+            Show(venue_id=1, artist_id=1, start_time=self.booked)
+        ])
+        db.session.commit()
+        self.server = make_server('127.0.0.1', 0, self.app, threaded=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.recorder = Recorder()
+        self.user = VirtualUser(f'http://127.0.0.1:{self.server.server_port}',
+                                self.recorder, random.Random(0), 1, 10)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def book(self, start_time, venue_id=1):
+        self.user.request('create_show', '/shows/create', {
+            'venue_id': venue_id,
+            'artist_id': 1,
+            'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S')
+        }, landing='/')
+        return self.recorder.samples[-1][2]
+
+    def test_listed_show_is_ok(self):
+        self.assertTrue(self.book(self.booked + timedelta(days=1)))
+        self.assertEqual(Show.query.count(), 2)
+
+    def test_rejected_bookings_are_errors(self):
+        # A clash and an unknown venue both redirect to a 200 page.
+        self.assertFalse(self.book(self.booked))
+        self.assertFalse(self.book(self.booked + timedelta(days=1), venue_id=9))
+        self.assertEqual(Show.query.count(), 1)
@@ -0,0 +1,87 @@
+import glob
+import os
+import unittest
+from importlib.util import module_from_spec, spec_from_file_location
+
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from models import db
+
+
+VERSIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'migrations', 'versions')
+
+
+def load_migration(revision):
+    path, = glob.glob(os.path.join(VERSIONS, f'{revision}_*.py'))
+    spec = spec_from_file_location(f'migration_{revision}', path)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class NormalizeGenresTest(unittest.TestCase):
+
+    def setUp(self):
+        self.migration = load_migration('4a8d0e6b9c13')
+
+    def test_parse_array_literals(self):
+        parse = self.migration.parse_genres
+        self.assertEqual(parse('{Jazz,Blues}'), ['Jazz', 'Blues'])
+        self.assertEqual(parse('{"Rock, Pop",Jazz}'), ['Rock, Pop', 'Jazz'])
+        self.assertEqual(parse('{}'), [])
+        self.assertEqual(parse(None), [])
+
+    def test_format_round_trips(self):
+        names = ['Jazz', 'Rock, Pop', 'Say "hi"', 'Back\\slash']
+        self.assertEqual(self.migration.parse_genres(self.migration.format_genres(names)), names)
+
+
+class AccessPathIndexesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.migration = load_migration('b7c3e2a91d84')
+        self.engine = sa.create_engine('sqlite://')
+        db.metadata.create_all(self.engine)
+        self.connection = self.engine.connect()
+        # The models declare the indexes too; start from before the migration.
+        for name, table, columns in self.migration.INDEXES:
+            self.connection.execute(f'DROP INDEX IF EXISTS {name}')
+
+    def tearDown(self):
+        self.connection.close()
+        self.engine.dispose()
+
+    def run_migration(self, step):
+        with Operations.context(MigrationContext.configure(self.connection)):
+            step()
+
+    def indexes(self):
+        # The inspector leaves out expression indexes such as lower(name).
+        return {name for name, in self.connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+    def plan(self, statement):
+        return ' '.join(row[-1] for row in self.connection.execute(
+            f'EXPLAIN QUERY PLAN {statement}'))
+
+    def test_upgrade_and_downgrade(self):
+        names = {name for name, table, columns in self.migration.INDEXES}
+        self.run_migration(self.migration.upgrade)
+        self.assertLessEqual(names, self.indexes())
+        self.run_migration(self.migration.downgrade)
+        self.assertFalse(names & self.indexes())
+
+    def test_show_windows_use_the_indexes(self):
+        self.run_migration(self.migration.upgrade)
+        self.assertIn('ix_shows_venue_id_start_time', self.plan(
+            "SELECT id FROM shows WHERE venue_id = 1 AND start_time > '2021-01-01'"))
+        self.assertIn('ix_shows_artist_id_start_time', self.plan(
+            "SELECT id FROM shows WHERE artist_id = 1 ORDER BY start_time"))
+        self.assertIn('ix_shows_start_time_id', self.plan(
+            "SELECT id FROM shows WHERE (start_time, id) > ('2021-01-01', 5) "
+            "ORDER BY start_time, id LIMIT 20"))
+        self.assertIn('ix_venues_city_state', self.plan(
+            'SELECT id FROM venues ORDER BY city, state, name, id LIMIT 20'))
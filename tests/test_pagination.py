@@ -0,0 +1,78 @@
+import unittest
+from datetime import datetime, timedelta
+
+from werkzeug.exceptions import BadRequest
+
+from app import create_app
+from models import db, Venue, Artist, Show
+from pagination import decode_cursor, encode_cursor, page_size
+import queries
+
+
+class CursorTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        values = [datetime(2021, 3, 1, 20, 30), 'Hall', 7]
+        self.assertEqual(decode_cursor(encode_cursor(values)), values)
+
+    def test_tampered_cursors_are_bad_requests(self):
+        for cursor in ('not a cursor', encode_cursor([1])[:-2] + '!!', 'eyJhIjogMX0'):
+            with self.assertRaises(BadRequest, msg=cursor):
+                decode_cursor(cursor)
+
+
+class KeysetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True,
+                              PAGE_SIZE=2, MAX_PAGE_SIZE=3)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        db.session.add_all([
+            Venue(id=1, name='Hall', city='SF', state='CA', address='1 st'),
+            Artist(id=1, name='Band', city='SF', state='CA')
+        ])
+        start = datetime(2021, 3, 1, 20)
+        # Shows 2 and 3 start together; the id breaks the tie.
+        for show_id, hours in ((1, 0), (2, 1), (3, 1), (4, 2), (5, 3)):
+            db.session.add(Show(id=show_id, venue_id=1, artist_id=1,
+                                start_time=start + timedelta(hours=hours)))
+        db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def ids(self, page):
+        return [show['show_id'] for show in page['items']]
+
+    def test_next_and_prev_round_trip(self):
+        pages = [queries.get_shows_page()]
+        while pages[-1]['next']:
+            pages.append(queries.get_shows_page(after=pages[-1]['next']))
+        self.assertEqual([self.ids(page) for page in pages], [[1, 2], [3, 4], [5]])
+        self.assertIsNone(pages[0]['prev'])
+        back = queries.get_shows_page(before=pages[2]['prev'])
+        self.assertEqual(self.ids(back), [3, 4])
+        self.assertEqual(self.ids(queries.get_shows_page(before=back['prev'])), [1, 2])
+        self.assertIsNone(queries.get_shows_page(before=back['prev'])['prev'])
+
+    def test_page_size_is_clamped(self):
+        self.assertEqual(page_size(None), 2)
+        self.assertEqual(page_size(0), 2)
+        self.assertEqual(page_size(50), 3)
+        self.assertEqual(len(queries.get_shows_page(per_page=50)['items']), 3)
+
+    def test_bad_cursors_are_400(self):
+        wrong_length = encode_cursor([1])
+        for path in ('/shows?after=garbage', f'/shows?before={wrong_length}',
+                     '/artists?after=garbage', '/venues?before=garbage',
+                     '/api/v1/shows?after=garbage'):
+            self.assertEqual(self.client.get(path).status_code, 400, path)
+
+    def test_listing_links(self):
+        page = self.client.get('/shows?per_page=2').data.decode()
+        self.assertIn(f"after={queries.get_shows_page()['next']}", page)
@@ -0,0 +1,49 @@
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from app import create_app
+from models import db, Venue, Artist, Show
+import counters
+import purge
+
+
+class PurgeLastModifiedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True,
+                              JOBS_IN_PROCESS=False)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        db.session.add_all([
+            Venue(id=1, name='Hall', city='SF', state='CA', address='1 st'),
+            Artist(id=1, name='Staying', city='SF', state='CA'),
+            Artist(id=2, name='Leaving', city='SF', state='CA')
+        ])
+        db.session.flush()
+        for artist_id in (1, 2):
+            show = Show(venue_id=1, artist_id=artist_id,
+                        start_time=datetime.now() + timedelta(days=artist_id))
+            db.session.add(show)
+            counters.show_added(show)
+        db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def test_deleted_artist_stays_modified_after_purge(self):
+        before = self.client.get('/venues/1')
+        self.assertIn(b'Leaving', before.data)
+        # Last-Modified has a one second resolution.
+        time.sleep(1.1)
+        self.client.delete('/artists/2')
+        purge.purge()
+        after = self.client.get(
+            '/venues/1', headers={'If-Modified-Since': before.headers['Last-Modified']})
+        self.assertEqual(after.status_code, 200)
+        self.assertNotIn(b'Leaving', after.data)
+        self.assertIsNone(Artist.query.get(2))
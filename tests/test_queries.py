@@ -0,0 +1,208 @@
+import os
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from app import create_app
+from benchmarks.routes import count_queries
+from models import db, Venue, Artist, Show
+import queries
+
+
+class DetailTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        self.now = datetime(2021, 3, 1, 12)
+        db.session.add_all([
+            Venue(id=1, name='Hall', city='SF', state='CA', address='1 st'),
+            Venue(id=2, name='Gone', city='SF', state='CA', address='2 st',
+                  deleted_at=datetime(2021, 1, 1)),
+            Artist(id=1, name='Band', city='SF', state='CA', image_link='http://band/1.png'),
+            Artist(id=2, name='Gone', city='SF', state='CA', deleted_at=datetime(2021, 1, 1))
+        ])
+        db.session.add_all([
+            Show(id=1, venue_id=1, artist_id=1, start_time=self.now - timedelta(days=1)),
+            Show(id=2, venue_id=1, artist_id=1, start_time=self.now + timedelta(days=2)),
+            Show(id=3, venue_id=1, artist_id=1, start_time=self.now + timedelta(days=1)),
+            Show(id=4, venue_id=1, artist_id=2, start_time=self.now + timedelta(days=3)),
+            Show(id=5, venue_id=2, artist_id=1, start_time=self.now + timedelta(days=3))
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def test_venue_shows_split_at_now(self):
+        venue = queries.get_venue_detail(1, self.now)
+        self.assertEqual([show['show_id'] for show in venue['past_shows']], [1])
+        # Ordered by start time; the deleted artist's show is left out.
+        self.assertEqual([show['show_id'] for show in venue['upcoming_shows']], [3, 2])
+        self.assertEqual((venue['past_shows_count'], venue['upcoming_shows_count']), (1, 2))
+        self.assertEqual(venue['upcoming_shows'][0]['artist_name'], 'Band')
+        self.assertEqual(venue['upcoming_shows'][0]['artist_image_link'], 'http://band/1.png')
+
+    def test_artist_shows_leave_out_deleted_venues(self):
+        artist = queries.get_artist_detail(1, self.now)
+        self.assertEqual([show['show_id'] for show in artist['upcoming_shows']], [3, 2])
+        self.assertEqual(artist['upcoming_shows'][0]['venue_name'], 'Hall')
+
+    def test_unknown_or_deleted(self):
+        for load in (queries.get_venue_detail, queries.get_artist_detail):
+            self.assertIsNone(load(2, self.now))
+            self.assertIsNone(load(9, self.now))
+
+    def test_query_count_does_not_grow_with_shows(self):
+        with count_queries() as few:
+            queries.get_venue_detail(1, self.now)
+        for day in range(10):
+            artist = Artist(name=f'Act {day}', city='SF', state='CA')
+            db.session.add(artist)
+            db.session.flush()
+            db.session.add(Show(venue_id=1, artist_id=artist.id,
+                                start_time=self.now + timedelta(days=10 + day)))
+        db.session.commit()
+        db.session.expire_all()
+        with count_queries() as many:
+            venue = queries.get_venue_detail(1, self.now)
+        self.assertEqual(venue['upcoming_shows_count'], 12)
+        self.assertEqual(many['queries'], few['queries'])
+
+
+class LastModifiedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tz = os.environ.get('TZ')
+        os.environ['TZ'] = 'Europe/Berlin'
+        time.tzset()
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        edited = datetime(2020, 1, 1)
+        db.session.add_all([
+            Venue(id=1, name='Hall', city='SF', state='CA', address='1 st', updated_at=edited),
+            Artist(id=1, name='Band', city='SF', state='CA', updated_at=edited)
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+        if self.tz is None:
+            del os.environ['TZ']
+        else:
+            os.environ['TZ'] = self.tz
+        time.tzset()
+
+    def test_past_show_start_in_utc_across_dst(self):
+        # Berlin is UTC+1 in winter and UTC+2 in summer, whatever the date today.
+        for start_time, expected in ((datetime(2021, 1, 15, 20), datetime(2021, 1, 15, 19)),
+                                     (datetime(2021, 7, 15, 20), datetime(2021, 7, 15, 18))):
+            Show.query.delete()
+            db.session.add(Show(venue_id=1, artist_id=1, start_time=start_time,
+                                updated_at=datetime(2020, 1, 1)))
+            db.session.commit()
+            self.assertEqual(queries.get_venue_last_modified(1), expected, start_time)
+            self.assertEqual(queries.get_artist_last_modified(1), expected, start_time)
+
+
+class VenueAreasTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        db.session.add_all([
+            Venue(id=1, name='Blue', city='San Francisco', state='CA', address='1 st',
+                  upcoming_shows_count=2),
+            Venue(id=2, name='Attic', city='San Francisco', state='CA', address='2 st'),
+            Venue(id=3, name='Park', city='New York', state='NY', address='3 st',
+                  upcoming_shows_count=1),
+            Venue(id=4, name='Gone', city='New York', state='NY', address='4 st',
+                  deleted_at=datetime(2021, 1, 1)),
+            Venue(id=5, name='Alley', city='Austin', state='TX', address='5 st')
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def test_grouped_by_city_and_state(self):
+        with count_queries() as counter:
+            page = queries.get_venue_areas()
+        self.assertEqual(counter['queries'], 1)
+        self.assertEqual(page['items'], [
+            {'city': 'Austin', 'state': 'TX', 'venues': [
+                {'id': 5, 'name': 'Alley', 'num_upcoming_shows': 0}]},
+            {'city': 'New York', 'state': 'NY', 'venues': [
+                {'id': 3, 'name': 'Park', 'num_upcoming_shows': 1}]},
+            {'city': 'San Francisco', 'state': 'CA', 'venues': [
+                {'id': 2, 'name': 'Attic', 'num_upcoming_shows': 0},
+                {'id': 1, 'name': 'Blue', 'num_upcoming_shows': 2}]}
+        ])
+
+    def test_area_split_across_pages(self):
+        first = queries.get_venue_areas(per_page=3)
+        self.assertEqual([area['city'] for area in first['items']],
+                         ['Austin', 'New York', 'San Francisco'])
+        second = queries.get_venue_areas(after=first['next'], per_page=3)
+        self.assertEqual(second['items'], [{'city': 'San Francisco', 'state': 'CA', 'venues': [
+            {'id': 1, 'name': 'Blue', 'num_upcoming_shows': 2}]}])
+        self.assertIsNone(second['next'])
+
+
+class LastModifiedRouteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True,
+                              DETAIL_CACHE_MAX_AGE=30)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        edited = datetime.utcnow() - timedelta(days=1)
+        db.session.add_all([
+            Venue(id=1, name='Hall', city='SF', state='CA', address='1 st', updated_at=edited),
+            Artist(id=1, name='Band', city='SF', state='CA', updated_at=edited)
+        ])
+        db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def revalidate(self, path, response):
+        return self.client.get(path, headers={'If-Modified-Since': response.headers['Last-Modified']})
+
+    def test_unchanged_page_is_304(self):
+        for path in ('/venues/1', '/artists/1'):
+            response = self.client.get(path)
+            self.assertEqual(response.headers['Cache-Control'], 'public, max-age=30')
+            again = self.revalidate(path, response)
+            self.assertEqual(again.status_code, 304, path)
+            self.assertEqual(again.data, b'')
+
+    def test_edits_and_new_shows_move_it(self):
+        response = self.client.get('/venues/1')
+        Venue.query.get(1).phone = '555'
+        db.session.commit()
+        self.assertEqual(self.revalidate('/venues/1', response).status_code, 200)
+        response = self.client.get('/artists/1')
+        db.session.add(Show(venue_id=1, artist_id=1, start_time=datetime.now() + timedelta(days=1)))
+        db.session.commit()
+        self.assertEqual(self.revalidate('/artists/1', response).status_code, 200)
+
+    def test_unknown_page_is_404(self):
+        self.assertEqual(self.client.get('/venues/9').status_code, 404)
+        self.assertNotIn('Last-Modified', self.client.get('/venues/9').headers)
@@ -0,0 +1,103 @@
+import unittest
+from datetime import datetime, timedelta
+
+from app import create_app
+from models import db, Venue, Artist, Show
+import schedule
+
+
+class ScheduleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True,
+                              JOBS_IN_PROCESS=False)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        self.start = datetime.now().replace(microsecond=0) + timedelta(days=30)
+        db.session.add_all([
+            Venue(id=1, name='Hall', city='SF', state='CA', address='1 st'),
+            Venue(id=2, name='Club', city='SF', state='CA', address='2 st'),
+            Artist(id=1, name='Band', city='SF', state='CA'),
+            Artist(id=2, name='Duo', city='SF', state='CA'),
+            # 120 minutes at Hall by Band.
+            Show(id=1, venue_id=1, artist_id=1, start_time=self.start, duration=120)
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def conflicts(self, venue_id, artist_id, minutes, duration):
+        return [show.id for show in schedule.find_conflicts(
+            venue_id, artist_id, self.start + timedelta(minutes=minutes), duration)]
+
+    def test_touching_bookings_do_not_conflict(self):
+        self.assertEqual(self.conflicts(1, 2, 120, 60), [])
+        self.assertEqual(self.conflicts(1, 2, -60, 60), [])
+        self.assertEqual(self.conflicts(2, 1, 120, 60), [])
+        self.assertEqual(self.conflicts(2, 1, -60, 60), [])
+
+    def test_overlapping_bookings_conflict(self):
+        self.assertEqual(self.conflicts(1, 2, 119, 60), [1])
+        self.assertEqual(self.conflicts(1, 2, -59, 60), [1])
+        self.assertEqual(self.conflicts(2, 1, 30, 10), [1])
+        self.assertEqual(self.conflicts(2, 1, -60, 300), [1])
+
+    def test_other_venue_and_artist_never_conflict(self):
+        self.assertEqual(self.conflicts(2, 2, 0, 120), [])
+
+    def test_longest_show_is_still_found(self):
+        db.session.add(Show(id=2, venue_id=2, artist_id=2, start_time=self.start + timedelta(days=1),
+                            duration=Show.MAX_DURATION))
+        db.session.commit()
+        self.assertEqual(self.conflicts(2, 1, 24 * 60 + Show.MAX_DURATION - 1, 60), [2])
+        self.assertEqual(self.conflicts(2, 1, 24 * 60 + Show.MAX_DURATION, 60), [])
+
+    def test_missing_duration_uses_the_default(self):
+        self.assertEqual(self.conflicts(1, 2, -Show.DEFAULT_DURATION, None), [])
+        self.assertEqual(self.conflicts(1, 2, -Show.DEFAULT_DURATION + 1, None), [1])
+
+    def test_validate_schedule(self):
+        def booking(booking_id, venue_id, artist_id, minutes, duration):
+            return {'id': booking_id, 'venue_id': venue_id, 'artist_id': artist_id,
+                    'start_time': self.start + timedelta(minutes=minutes), 'duration': duration}
+        bookings = [booking(1, 1, 1, 0, 60), booking(2, 1, 2, 60, 60),
+                    booking(3, 2, 2, 90, 60), booking(4, 2, 1, 30, 60)]
+        conflicts = [(kind, owner_id, first['id'], second['id'])
+                     for kind, owner_id, first, second in schedule.validate_schedule(bookings)]
+        self.assertEqual(sorted(conflicts), [('artist', 1, 1, 4), ('artist', 2, 2, 3)])
+
+    def test_form_rejects_a_conflict(self):
+        client = self.app.test_client()
+        start_time = (self.start + timedelta(minutes=60)).strftime('%Y-%m-%d %H:%M:%S')
+        response = client.post('/shows/create', data={
+            'venue_id': 1, 'artist_id': 2, 'start_time': start_time}, follow_redirects=True)
+        self.assertIn(b'The venue is already booked', response.data)
+        self.assertEqual(Show.query.count(), 1)
+        client.post('/shows/create', data={
+            'venue_id': 2, 'artist_id': 2, 'start_time': start_time, 'duration': 30})
+        self.assertEqual(Show.query.count(), 2)
+        client.post('/shows/create', data={
+            'venue_id': 2, 'artist_id': 2, 'start_time': start_time,
+            'duration': Show.MAX_DURATION + 1})
+        self.assertEqual(Show.query.count(), 2)
+
+    def test_validate_command(self):
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=['schedule', 'validate'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('0 conflicts among 1 shows.', result.output)
+        db.session.add(Show(id=2, venue_id=2, artist_id=1,
+                            start_time=self.start + timedelta(minutes=60), duration=60))
+        db.session.commit()
+        result = runner.invoke(args=['schedule', 'validate'])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('artist Band: show 1', result.output)
+        self.assertIn('1 conflicts among 2 shows.', result.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
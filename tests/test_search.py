@@ -0,0 +1,89 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from app import create_app
+from models import db, Venue, Artist, Show
+import counters
+import search
+
+
+class NGramIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = search.NGramIndex()
+        for key, name in enumerate(['The Musical Hop', 'Hop', 'Park Square Live Music',
+                                    "Hopper's", 'Dueling Pianos'], 1):
+            self.index.add(key, name)
+
+    def test_exact_then_prefix_then_shortest(self):
+        self.assertEqual(self.index.search('HOP', 10),
+                         [(2, 'Hop'), (4, "Hopper's"), (1, 'The Musical Hop')])
+
+    def test_short_terms_scan_every_name(self):
+        self.assertEqual([key for key, name in self.index.search('ic', 10)], [1, 3])
+        self.assertEqual(self.index.search('music', 1), [(1, 'The Musical Hop')])
+
+    def test_no_match(self):
+        self.assertEqual(self.index.search('jazz', 10), [])
+
+
+class IndexStalenessTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True,
+                              SEARCH_INDEX_CHECK_INTERVAL=5)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        db.session.add_all([
+            Venue(id=1, name='Blue Hall', city='SF', state='CA', address='1 st'),
+            Artist(id=1, name='Band', city='SF', state='CA')
+        ])
+        db.session.commit()
+        search._indexes.clear()
+        search._stale.clear()
+        self.clock = mock.patch('search.monotonic', return_value=1000)
+        self.now = self.clock.start()
+
+    def tearDown(self):
+        self.clock.stop()
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def names(self, term):
+        return [name for key, name in search.search(Venue, term)]
+
+    def test_own_commits_are_seen_right_away(self):
+        self.assertEqual(self.names('hall'), ['Blue Hall'])
+        db.session.add(Venue(id=2, name='Red Hall', city='SF', state='CA', address='2 st'))
+        db.session.commit()
+        self.assertEqual(self.names('hall'), ['Red Hall', 'Blue Hall'])
+
+    def test_other_processes_are_seen_after_the_interval(self):
+        self.assertEqual(self.names('hall'), ['Blue Hall'])
+        # Written around the session, as another process would.
+        db.engine.execute(
+            "UPDATE venues SET name = 'Green Hall', updated_at = ? WHERE id = 1",
+            datetime.utcnow() + timedelta(seconds=1))
+        self.now.return_value = 1004
+        self.assertEqual(self.names('hall'), ['Blue Hall'])
+        self.now.return_value = 1006
+        self.assertEqual(self.names('hall'), ['Green Hall'])
+
+    def test_counter_updates_keep_the_index(self):
+        index = search._get_index(Venue)
+        show = Show(venue_id=1, artist_id=1, start_time=datetime.now() + timedelta(days=1))
+        db.session.add(show)
+        counters.show_added(show)
+        db.session.commit()
+        self.now.return_value = 1010
+        self.assertIs(search._get_index(Venue), index)
+        self.assertIs(search._get_index(Artist), search._get_index(Artist))
+
+    def test_deleted_rows_drop_out(self):
+        self.assertEqual(self.names('hall'), ['Blue Hall'])
+        Venue.query.get(1).soft_delete()
+        db.session.commit()
+        self.assertEqual(self.names('hall'), [])
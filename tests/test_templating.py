@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from jinja2 import DictLoader, Environment, FileSystemBytecodeCache
+
+from app import create_app
+from models import db
+import templating
+
+
+class BytecodeCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = os.path.join(tempfile.mkdtemp(), 'jinja')
+        self.app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True,
+                              JINJA_BYTECODE_CACHE_DIR=self.directory)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.directory))
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def cached(self):
+        return os.listdir(self.directory)
+
+    def test_cache_directory_is_created(self):
+        self.assertIsInstance(self.app.jinja_env.bytecode_cache, FileSystemBytecodeCache)
+        self.assertEqual(self.cached(), [])
+        self.app.test_client().get('/')
+        self.assertTrue(self.cached())
+
+    def test_no_directory_no_cache(self):
+        app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True,
+                         JINJA_BYTECODE_CACHE_DIR=None)
+        self.assertIsNone(app.jinja_env.bytecode_cache)
+
+    def test_precompile_command(self):
+        runner = self.app.test_cli_runner(mix_stderr=False)
+        result = runner.invoke(args=['templates', 'precompile'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        names = self.app.jinja_env.list_templates(filter_func=lambda name: name.endswith('.html'))
+        self.assertRegex(result.output, rf'^Compiled {len(names)} templates in \d+ ms\.$')
+        self.assertEqual(len(self.cached()), len(names))
+        stale = '__jinja2_removed.cache'
+        with open(os.path.join(self.directory, stale), 'w') as f:
+            f.write('')
+        # A new process, as each flask command is, with nothing compiled in memory.
+        app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True,
+                         JINJA_BYTECODE_CACHE_DIR=self.directory)
+        result = app.test_cli_runner().invoke(args=['templates', 'precompile', '--clear'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(len(self.cached()), len(names))
+        self.assertNotIn(stale, self.cached())
+
+    def test_precompile_needs_the_cache(self):
+        app = create_app(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True,
+                         JINJA_BYTECODE_CACHE_DIR=None)
+        result = app.test_cli_runner().invoke(args=['templates', 'precompile'])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('JINJA_BYTECODE_CACHE_DIR is not set.', result.output)
+
+    def test_precompile_reports_syntax_errors(self):
+        env = Environment(loader=DictLoader({
+            'good.html': '{{ name }}',
+            'bad.html': '\n{% if name %}',
+            'macros.txt': '{% broken'
+        }), bytecode_cache=FileSystemBytecodeCache(self.directory))
+        names, errors = templating.precompile(env)
+        self.assertEqual(names, ['bad.html', 'good.html'])
+        self.assertEqual([(name, error.lineno) for name, error in errors], [('bad.html', 2)])
+        self.assertEqual(len(self.cached()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+from sys import exc_info
+
+from flask import Blueprint, render_template, request, flash, redirect, url_for, abort
+
+from models import db, Venue, Genre
+from queries import get_venue_detail, get_venue_areas, get_venue_last_modified
+from pagination import page_args
+from cache import cache, last_modified
+import counters
+import jobs
+import search
+
+
+venue_pages = Blueprint('venues', __name__)
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@venue_pages.route('/venues')
+@cache.cached(tags=['venues'])
+def venues():
+    """
+    Renders venues page with appropriate data and data structure. Venues are grouped
+    by city and state and listed a page at a time, optionally filtered by ?genre=.
+    """
+    page = get_venue_areas(genre=request.args.get('genre'), **page_args())
+    return render_template('pages/venues.html', areas=page['items'], page=page)
+
+
+@venue_pages.route('/venues/search', methods=['POST'])
+def search_venues():
+    """
+    Implements search for venues, supporting partial, case-insensitive searches.
+    Results are ranked and capped at SEARCH_RESULT_LIMIT.
+    """
+    search_term = request.form.get('search_term', '')
+    response = search.search_venues(search_term)
+    return render_template('pages/search_venues.html', results=response, search_term=search_term)
+
+
+@venue_pages.route('/venues/<int:venue_id>')
+@last_modified(get_venue_last_modified)
+@cache.cached(tags=lambda venue_id: ['venue', f'venue:{venue_id}'])
+def show_venue(venue_id):
+    """
+    @param: venue_id
+    Shows a specific venue by venue_id. The data structure given was considered in implementation.
+    """
+    data = get_venue_detail(venue_id)
+    if data is None:
+        abort(404)
+    return render_template('pages/show_venue.html', venue=data)
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+
+@venue_pages.route('/venues/create', methods=['GET'])
+def create_venue_form():
+    # Forms pull in WTForms, which the CLI and the read only pages never need.
+    from forms import VenueForm
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@venue_pages.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+    """
+    Handles the creation of a new venue.
+    """
+    from forms import VenueForm
+    form = VenueForm(request.form)
+    # A dict that holds form data
+    data = {
+        'name': form.name.data,
+        'genres': form.genres.data,
+        'address': form.address.data,
+        'city': form.city.data,
+        'state': form.state.data,
+        'phone': form.phone.data,
+        'image_link': form.image_link.data,
+        'facebook_link': form.facebook_link.data,
+        'seeking_talent': form.seeking_talent.data,
+        'seeking_description': form.seeking_description.data,
+        'website': form.website.data
+    }
+    # Venue creation and addition to the db, with any exceptions handled.
+    try:
+        venue_id = Venue.insert_unless_listed(
+            name=data['name'],
+            genres=data['genres'],
+            address=data['address'],
+            city=data['city'],
+            state=data['state'],
+            phone=data['phone'],
+            image_link=data['image_link'],
+            facebook_link=data['facebook_link'],
+            seeking_talent=data['seeking_talent'],
+            seeking_description=data['seeking_description'],
+            website=data['website']
+        )
+        if venue_id is not None:
+            db.session.commit()
+            cache.invalidate('venues')
+            # on successful db insert, flash success
+            flash('Venue ' + data['name'] + ' was successfully listed!')
+        else:
+            flash('Venue ' + data['name'] + ' already exists')
+    except:
+        flash('An error occurred. Venue ' +
+              data['name'] + ' could not be listed.')
+        db.session.rollback()
+        print(exc_info())
+    finally:
+        db.session.close()
+    return redirect(url_for('index'))
+
+
+@venue_pages.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+    """
+    @param: venue_id
+    Handles the deletion of any venue. AJAX UI support was implemented in the appropriate
+    show_venue template. The venue is only marked deleted here, its shows and
+    the row itself are removed by a purge job (see purge.py).
+    """
+    venue = Venue.get_listed(venue_id)
+    if venue is None:
+        abort(404)
+    try:
+        counters.venue_shows_removed(venue.id)
+        venue.soft_delete()
+        jobs.enqueue('purge')
+        db.session.commit()
+        # The venue's shows were listed on /shows and on its artists' pages.
+        cache.invalidate('venues', f'venue:{venue_id}', 'shows', 'artist')
+    except:
+        db.session.rollback()
+        print(exc_info())
+    finally:
+        db.session.close()
+    return render_template('pages/home.html')
+
+#  Update
+#  ----------------------------------------------------------------
+
+
+@venue_pages.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+    from forms import VenueForm
+    venue = Venue.get_listed(venue_id)
+    if venue is None:
+        abort(404)
+    form = VenueForm(obj=venue)
+    form.genres.data = venue.genre_names
+
+    return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+
+@venue_pages.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+    from forms import VenueForm
+    try:
+        form = VenueForm(request.form)
+        venue = Venue.get_listed(venue_id)
+        venue.name = form.name.data
+        venue.city = form.city.data
+        venue.state = form.state.data
+        venue.address = form.address.data
+        venue.genres = Genre.resolve(form.genres.data)
+        venue.phone = form.phone.data
+        venue.image_link = form.image_link.data
+        venue.facebook_link = form.facebook_link.data
+        venue.website = form.website.data
+        venue.seeking_talent = form.seeking_talent.data
+        venue.seeking_description = form.seeking_description.data
+        db.session.commit()
+        cache.invalidate('venues', f'venue:{venue_id}', 'shows', 'artist')
+    except:
+        db.session.rollback()
+        print(exc_info())
+    finally:
+        db.session.close()
+    return redirect(url_for('venues.show_venue', venue_id=venue_id))